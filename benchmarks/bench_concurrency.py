@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the /chat endpoint.
+
+Starts a fake OpenAI chat-completions server with a fixed latency, points
+LLMClient at it, serves web_api.app with uvicorn and fires N parallel /chat
+requests. With a non-blocking transport the wall time of the batch stays close
+to the latency of a single call instead of growing linearly with N.
+
+Usage:
+    python benchmarks/bench_concurrency.py --concurrency 20 --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_fake_openai_app(latency: float) -> web.Application:
+    """Minimal chat-completions endpoint that sleeps before answering."""
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def run_benchmark(concurrency: int, latency: float, upstream_port: int, api_port: int) -> None:
+    # Configure the app before importing it so Config picks up the overrides
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ["CHROMA_DB_PATH"] = tempfile.mkdtemp(prefix="eraai-bench-")
+
+    import logging
+    import uvicorn
+    from web_api import app
+
+    # web_api configures INFO logging; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    runner = web.AppRunner(make_fake_openai_app(latency))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", upstream_port).start()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=api_port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{api_port}/chat"
+    payload = {"message": "ping", "use_rag": False, "use_functions": False}
+
+    async def one_call(session: aiohttp.ClientSession) -> float:
+        started = time.perf_counter()
+        async with session.post(url, json=payload) as resp:
+            await resp.read()
+            resp.raise_for_status()
+        return time.perf_counter() - started
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            single = await one_call(session)
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[one_call(session) for _ in range(concurrency)])
+            wall = time.perf_counter() - started
+
+            # Event loop responsiveness while completions are in flight
+            pending = [asyncio.create_task(one_call(session)) for _ in range(concurrency)]
+            await asyncio.sleep(latency / 4)
+            probe_started = time.perf_counter()
+            async with session.get(f"http://127.0.0.1:{api_port}/health") as resp:
+                await resp.read()
+            health_latency = time.perf_counter() - probe_started
+            await asyncio.gather(*pending)
+    finally:
+        server.should_exit = True
+        await server_task
+        await runner.cleanup()
+
+    print(f"Upstream latency:           {latency:.2f}s")
+    print(f"Single /chat call:          {single:.3f}s")
+    print(f"{concurrency} parallel /chat calls:  {wall:.3f}s wall (max {max(latencies):.3f}s per call)")
+    print(f"Serialization factor:       {wall / single:.2f}x (1.0 = fully concurrent, {concurrency} = serial)")
+    print(f"/health under load:         {health_latency * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent /chat throughput")
+    parser.add_argument("--concurrency", "-n", type=int, default=20, help="Parallel /chat calls (default: 20)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake upstream latency in seconds (default: 1.0)")
+    parser.add_argument("--upstream-port", type=int, default=18081)
+    parser.add_argument("--api-port", type=int, default=18080)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.concurrency, args.latency, args.upstream_port, args.api_port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Context compression benchmark: RAG prompts with and without extractive compression.
+
+Indexes the translation benchmark passages, each padded with unrelated
+filler sentences the way real PDF chunks are, into a throwaway Chroma
+collection. Every question is then answered with CONTEXT_COMPRESSION off
+and on. For each variant it reports the packed context size in tokens, the
+compression ratio, whether the passage's key sentence survived into the
+context, the retrieval (+ compression) latency and, unless --no-chat, the
+prompt tokens and end-to-end /chat latency through AIAssistant.
+
+The key-sentence check and the prefill saving are only meaningful with a
+real backend: run it against OpenAI or EMBEDDING_BACKEND=local. With
+--emulator, vectors are arbitrary and completion latency does not depend
+on prompt size, so only the compression overhead is measured.
+
+Usage:
+    EMBEDDING_BACKEND=local python benchmarks/compression_benchmark.py
+    python benchmarks/compression_benchmark.py --emulator --keep-ratio 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from translation_benchmark import CORPUS, percentile  # noqa: E402
+
+QUESTIONS = {
+    "halving": "How often is the Bitcoin block subsidy cut in half?",
+    "stock_to_flow": "What does the stock-to-flow ratio measure?",
+    "sound_money": "What is sound money?",
+    "time_preference": "How does hard money affect time preference?",
+    "fiat_inflation": "Why does expanding the fiat money supply hurt savers?",
+    "proof_of_work": "Why do miners spend electricity in proof of work?",
+    "difficulty": "How does the network keep blocks arriving every ten minutes?",
+    "gold_standard": "How did the classical gold standard limit money issuance?",
+    "lightning": "How does the Lightning Network make small payments cheap?",
+    "self_custody": "Why keep coins on your own hardware wallet?",
+    "keynes": "Why do Austrian economists criticise Keynesian economics?",
+    "supply_cap": "What is the maximum number of bitcoins?",
+}
+
+FILLER = [
+    "The report was prepared for internal circulation and has not been peer reviewed.",
+    "Figures in the appendix are rounded to the nearest whole unit.",
+    "Readers are encouraged to consult the original sources listed at the end of the chapter.",
+    "This section was revised after comments from several reviewers.",
+    "Historical exchange rates are quoted from contemporary newspapers.",
+    "The author thanks the editors for their patience during the drafting process.",
+    "Some terminology has been simplified for a general audience.",
+    "Further reading on this topic is suggested in the bibliography.",
+]
+
+
+def padded_passage(index: int, passage: str) -> str:
+    """The passage surrounded by filler, as it would appear inside a longer page."""
+    filler = [FILLER[(index + i) % len(FILLER)] for i in range(6)]
+    return " ".join(filler[:3] + [passage] + filler[3:])
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+    retrieval = [r["retrieval_sec"] for r in runs]
+    chat = [r["chat_sec"] for r in runs if r.get("chat_sec") is not None]
+    prompt_tokens = [r["prompt_tokens"] for r in runs if r.get("prompt_tokens") is not None]
+    ratios = [r["ratio"] for r in runs if r["ratio"] is not None]
+    return {
+        "queries": len(runs),
+        "key_sentence_kept": round(sum(r["kept"] for r in runs) / len(runs), 3) if runs else 0.0,
+        "context_tokens_avg": round(sum(r["context_tokens"] for r in runs) / len(runs), 1) if runs else 0.0,
+        "compression_ratio_avg": round(sum(ratios) / len(ratios), 3) if ratios else None,
+        "retrieval_ms": {"p50": ms(percentile(retrieval, 50)), "p95": ms(percentile(retrieval, 95))},
+        "prompt_tokens_avg": round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else None,
+        "chat_ms": {"p50": ms(percentile(chat, 50)), "p95": ms(percentile(chat, 95))} if chat else None,
+    }
+
+
+async def run_variant(assistant, compress: bool, k: int, repeat: int, chat: bool) -> List[Dict[str, Any]]:
+    from src.config import config
+
+    # RAGSystem reads the flag per request
+    config.CONTEXT_COMPRESSION_ENABLED = compress
+    runs = []
+    for _ in range(repeat):
+        for passage_id, passage, _ in CORPUS:
+            question = QUESTIONS[passage_id]
+            started = time.perf_counter()
+            packed = await assistant.rag_system.pack_relevant_context(question, k=k)
+            run = {
+                "passage": passage_id,
+                "kept": passage.split(". ")[0] in packed.text,
+                "context_tokens": packed.tokens,
+                "ratio": packed.compression["ratio"] if packed.compression else None,
+                "retrieval_sec": time.perf_counter() - started,
+            }
+            if chat:
+                assistant.clear_conversation_history()
+                chat_started = time.perf_counter()
+                result = await assistant.chat(question, use_rag=True, use_functions=False)
+                run["chat_sec"] = time.perf_counter() - chat_started
+                run["prompt_tokens"] = (result.get("usage") or {}).get("prompt_tokens")
+            runs.append(run)
+    return runs
+
+
+async def main_async(args) -> Dict[str, Any]:
+    from src.ai_assistant import AIAssistant
+    from src.config import config
+
+    config.CONTEXT_COMPRESSION_KEEP_RATIO = args.keep_ratio
+    assistant = AIAssistant()
+    try:
+        await assistant.rag_system.add_texts(
+            [padded_passage(i, passage) for i, (_, passage, _) in enumerate(CORPUS)],
+            [{"passage": passage_id, "source": "compression_benchmark"} for passage_id, _, _ in CORPUS]
+        )
+        results = {}
+        for name, compress in (("full", False), ("compressed", True)):
+            results[name] = summarize(await run_variant(assistant, compress, args.k, args.repeat, not args.no_chat))
+        return {
+            "embedding_model": assistant.rag_system.embeddings.model_id,
+            "keep_ratio": args.keep_ratio,
+            "k": args.k,
+            "results": results,
+        }
+    finally:
+        await assistant.cleanup()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"embedding model {report['embedding_model']}, keep ratio {report['keep_ratio']}, k={report['k']}")
+    header = f"{'variant':<12}{'kept':>7}{'ctx tok':>9}{'ratio':>7}{'retr50':>8}{'retr95':>8}{'prompt':>8}{'chat p50':>10}{'chat p95':>10}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda v, spec=".0f": format(v, spec) if v is not None else "-"  # noqa: E731
+    for name, block in report["results"].items():
+        chat = block["chat_ms"] or {"p50": None, "p95": None}
+        print(
+            f"{name:<12}{block['key_sentence_kept']:>7.2f}{block['context_tokens_avg']:>9.0f}"
+            f"{fmt(block['compression_ratio_avg'], '.2f'):>7}{fmt(block['retrieval_ms']['p50']):>8}"
+            f"{fmt(block['retrieval_ms']['p95']):>8}{fmt(block['prompt_tokens_avg']):>8}"
+            f"{fmt(chat['p50']):>10}{fmt(chat['p95']):>10}"
+        )
+    print("(latencies in ms; kept = share of questions whose key sentence reached the context)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare RAG prompts with and without extractive compression")
+    parser.add_argument("--k", type=int, default=3, help="Documents retrieved per query")
+    parser.add_argument("--keep-ratio", type=float, default=0.4, help="Share of each chunk's sentences kept")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the question set per variant")
+    parser.add_argument("--no-chat", action="store_true", help="Skip the end-to-end chat measurement")
+    parser.add_argument("--emulator", action="store_true", help="Run against a local upstream_emulator.py")
+    parser.add_argument("--emulator-port", type=int, default=19291)
+    parser.add_argument("--openai-latency", default="lognormal:0.6,0.4", help="Emulated completion latency")
+    parser.add_argument("--output", "-o", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    # Configure before importing src so Config sees a throwaway store and no answer caches
+    os.environ["CHROMA_DB_PATH"] = tempfile.mkdtemp(prefix="eraai-compression-")
+    os.environ["COMPLETION_CACHE_ENABLED"] = "false"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+    emulator = None
+    if args.emulator:
+        os.environ["UPSTREAM_EMULATOR_URL"] = f"http://127.0.0.1:{args.emulator_port}"
+        emulator = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "upstream_emulator.py"), "--port", str(args.emulator_port),
+             "--openai-latency", args.openai_latency, "--token-interval", "0"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        time.sleep(2.0)
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait(timeout=10)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Load generator for the FastAPI service.
+
+Replays a weighted mix of /chat, /chat/stream, /quick_actions and
+/related_questions requests, either from a fixed number of concurrent users
+(closed loop, --concurrency) or at a target arrival rate (open loop, --rate,
+Poisson arrivals). Reports p50/p95/p99 latency, time to first byte,
+throughput and error rates per endpoint, plus the server's event-loop lag
+during the run (from /metrics), and optionally saves them as JSON so runs
+can be compared across commits.
+
+By default everything runs locally: upstream_emulator.py stands in for
+OpenAI, LunarCrush and RSS, and web_api.py is served by uvicorn pointed at
+it (both in subprocesses, so the load generator does not share their event
+loop). Use --target to hit an already running server instead.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 20 --duration 30 --output results.json
+    python benchmarks/load_test.py --rate 5 --duration 60 --mix chat=0.6,quick_actions=0.2,related_questions=0.2
+    python benchmarks/load_test.py --compare baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Server-side histogram from src/loop_monitor.py, scraped from /metrics around the run
+LOOP_LAG_METRIC = "eraai_event_loop_lag_seconds"
+
+CHAT_MESSAGES = [
+    "Что происходит с биткоином сегодня?",
+    "Расскажи про стейкинг эфира",
+    "Какие риски у DeFi протоколов?",
+    "Сравни Solana и Ethereum",
+    "Что такое халвинг и как он влияет на цену?",
+    "Какие новости по крипторынку?",
+    "Объясни, что такое ликвидность на бирже",
+    "Кто самые влиятельные авторы по теме bitcoin?",
+]
+
+ENDPOINTS = {
+    # name: (method, path)
+    "chat": ("POST", "/chat"),
+    "chat_stream": ("POST", "/chat/stream"),
+    "quick_actions": ("POST", "/quick_actions"),
+    "related_questions": ("POST", "/related_questions"),
+}
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    started: float
+    latency: float
+    ttfb: Optional[float]
+    status: int
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadPlan:
+    mix: Dict[str, float]
+    concurrency: int = 0
+    rate: float = 0.0
+    duration: float = 30.0
+    max_requests: int = 0
+    warmup: int = 0
+    use_rag: bool = True
+    use_functions: bool = True
+    timeout: float = 120.0
+    seed: int = 0
+    samples: List[Sample] = field(default_factory=list)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name!r} (expected one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Mix weights must sum to a positive number")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def send_request(session: aiohttp.ClientSession, base_url: str, endpoint: str, plan: LoadPlan, rng: random.Random) -> Sample:
+    method, path = ENDPOINTS[endpoint]
+    payload = None
+    if endpoint in ("chat", "chat_stream"):
+        payload = {
+            "message": rng.choice(CHAT_MESSAGES),
+            "use_rag": plan.use_rag,
+            "use_functions": plan.use_functions,
+        }
+    started = time.perf_counter()
+    ttfb = None
+    try:
+        async with session.request(method, base_url + path, json=payload) as resp:
+            # First body bytes; for SSE this is the first event
+            first = await resp.content.readany()
+            ttfb = time.perf_counter() - started
+            if first:
+                await resp.read()
+            error = None if resp.status < 400 else f"HTTP {resp.status}"
+            return Sample(endpoint, started, time.perf_counter() - started, ttfb, resp.status, error)
+    except Exception as e:
+        return Sample(endpoint, started, time.perf_counter() - started, ttfb, 0, type(e).__name__)
+
+
+async def run_load(base_url: str, plan: LoadPlan) -> float:
+    """Run the plan and return the measured wall time (excluding warmup)."""
+    rng = random.Random(plan.seed)
+    names = list(plan.mix)
+    weights = [plan.mix[name] for name in names]
+    timeout = aiohttp.ClientTimeout(total=plan.timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        for _ in range(plan.warmup):
+            await send_request(session, base_url, rng.choices(names, weights)[0], plan, rng)
+
+        started = time.perf_counter()
+        deadline = started + plan.duration
+        issued = 0
+
+        def more() -> bool:
+            if plan.max_requests and issued >= plan.max_requests:
+                return False
+            return time.perf_counter() < deadline
+
+        async def one() -> None:
+            plan.samples.append(await send_request(session, base_url, rng.choices(names, weights)[0], plan, rng))
+
+        if plan.rate > 0:
+            # Open loop: Poisson arrivals regardless of how fast the server answers
+            tasks = []
+            next_at = started
+            while more():
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                issued += 1
+                tasks.append(asyncio.create_task(one()))
+                next_at += rng.expovariate(plan.rate)
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: each virtual user sends its next request when the previous one finishes
+            async def user() -> None:
+                nonlocal issued
+                while more():
+                    issued += 1
+                    await one()
+
+            await asyncio.gather(*[user() for _ in range(max(1, plan.concurrency))])
+        return time.perf_counter() - started
+
+
+def summarize(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    def block(group: List[Sample]) -> Dict[str, Any]:
+        latencies = sorted(s.latency for s in group)
+        ttfbs = sorted(s.ttfb for s in group if s.ttfb is not None)
+        errors: Dict[str, int] = {}
+        for s in group:
+            if s.error:
+                errors[s.error] = errors.get(s.error, 0) + 1
+        ok = len(group) - sum(errors.values())
+        ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+        return {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": round(sum(errors.values()) / len(group), 4) if group else 0.0,
+            "throughput_rps": round(len(group) / wall, 3) if wall else 0.0,
+            "goodput_rps": round(ok / wall, 3) if wall else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1] if latencies else None),
+                "mean": ms(sum(latencies) / len(latencies) if latencies else None),
+            },
+            "ttfb_ms": {
+                "p50": ms(percentile(ttfbs, 50)),
+                "p95": ms(percentile(ttfbs, 95)),
+                "p99": ms(percentile(ttfbs, 99)),
+            },
+        }
+
+    endpoints = sorted({s.endpoint for s in samples})
+    return {
+        "wall_sec": round(wall, 3),
+        "overall": block(samples),
+        "endpoints": {name: block([s for s in samples if s.endpoint == name]) for name in endpoints},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'endpoint':<18}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfb50':>9}{'ttfb95':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["results"]["endpoints"].items()) + [("overall", report["results"]["overall"])]
+    for name, block in rows:
+        lat, ttfb = block["latency_ms"], block["ttfb_ms"]
+        fmt = lambda v: f"{v:.0f}" if v is not None else "-"  # noqa: E731
+        print(
+            f"{name:<18}{block['requests']:>7}{block['error_rate'] * 100:>6.1f}%{block['throughput_rps']:>8.2f}"
+            f"{fmt(lat['p50']):>9}{fmt(lat['p95']):>9}{fmt(lat['p99']):>9}{fmt(ttfb['p50']):>9}{fmt(ttfb['p95']):>9}"
+        )
+    print(f"(latencies in ms; wall time {report['results']['wall_sec']}s)")
+    for name, block in rows:
+        if block["errors"]:
+            print(f"{name} errors: {block['errors']}")
+    lag = report.get("event_loop")
+    if lag:
+        print(
+            f"server event-loop lag: mean {lag['mean_ms']}ms, p50 <= {lag['p50_le_ms']}ms, "
+            f"p99 <= {lag['p99_le_ms']}ms, {lag['over_50ms_ratio'] * 100:.1f}% of samples over 50ms"
+        )
+
+
+def compare_reports(baseline_path: str, current_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    print(f"baseline {baseline.get('git_commit', '?')[:10]} vs current {current.get('git_commit', '?')[:10]}")
+    names = sorted(set(baseline["results"]["endpoints"]) | set(current["results"]["endpoints"])) + ["overall"]
+    for name in names:
+        old = baseline["results"]["overall"] if name == "overall" else baseline["results"]["endpoints"].get(name)
+        new = current["results"]["overall"] if name == "overall" else current["results"]["endpoints"].get(name)
+        if not old or not new:
+            continue
+        parts = []
+        for key in ("p50", "p95", "p99"):
+            a, b = old["latency_ms"][key], new["latency_ms"][key]
+            if a and b is not None:
+                parts.append(f"{key} {a:.0f}->{b:.0f}ms ({(b - a) / a * 100:+.0f}%)")
+        parts.append(f"rps {old['throughput_rps']}->{new['throughput_rps']}")
+        parts.append(f"err {old['error_rate'] * 100:.1f}%->{new['error_rate'] * 100:.1f}%")
+        print(f"{name:<18}" + ", ".join(parts))
+    old_lag, new_lag = baseline.get("event_loop"), current.get("event_loop")
+    if old_lag and new_lag:
+        print(
+            f"{'event loop lag':<18}mean {old_lag['mean_ms']}->{new_lag['mean_ms']}ms, "
+            f"p99 <= {old_lag['p99_le_ms']}->{new_lag['p99_le_ms']}ms, "
+            f">50ms {old_lag['over_50ms_ratio'] * 100:.1f}%->{new_lag['over_50ms_ratio'] * 100:.1f}%"
+        )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+async def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as resp:
+                    if resp.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_local_stack(args) -> List[subprocess.Popen]:
+    """Start the upstream emulator and web_api (pointed at it) as subprocesses."""
+    emulator_url = f"http://127.0.0.1:{args.emulator_port}"
+    emulator = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "upstream_emulator.py"),
+            "--port", str(args.emulator_port),
+            "--openai-latency", args.openai_latency,
+            "--token-interval", str(args.token_interval),
+            "--embeddings-latency", args.embeddings_latency,
+            "--lunarcrush-latency", args.lunarcrush_latency,
+            "--rss-latency", args.rss_latency,
+            "--error-rate", str(args.error_rate),
+            "--rate-limit-rate", str(args.rate_limit_rate),
+            "--seed", str(args.seed),
+        ],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    env = dict(os.environ)
+    # Explicit upstream settings from the environment would bypass the emulator
+    for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "LUNARCRUSH_API_BASE_URL", "LUNARCRUSH_API_KEY", "RSS_FEED_URLS"):
+        env.pop(name, None)
+    env["UPSTREAM_EMULATOR_URL"] = emulator_url
+    env.setdefault("CHROMA_DB_PATH", tempfile.mkdtemp(prefix="eraai-load-"))
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "web_api:app", "--host", "127.0.0.1", "--port", str(args.api_port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    return [emulator, api]
+
+
+async def fetch_json(url: str) -> Optional[Dict[str, Any]]:
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                return await resp.json()
+    except Exception:
+        return None
+
+
+async def fetch_text(url: str) -> Optional[str]:
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                return await resp.text() if resp.status == 200 else None
+    except Exception:
+        return None
+
+
+def parse_histogram(text: Optional[str], name: str) -> Optional[Dict[str, Any]]:
+    """Read an unlabelled histogram from Prometheus text: cumulative buckets, sum and count."""
+    if not text:
+        return None
+    buckets: List[Tuple[float, float]] = []
+    total = count = None
+    for line in text.splitlines():
+        if line.startswith(f"{name}_bucket{{"):
+            bound = line.split('le="', 1)[1].split('"', 1)[0]
+            buckets.append((float("inf") if bound == "+Inf" else float(bound), float(line.rsplit(" ", 1)[1])))
+        elif line.startswith(f"{name}_sum "):
+            total = float(line.rsplit(" ", 1)[1])
+        elif line.startswith(f"{name}_count "):
+            count = float(line.rsplit(" ", 1)[1])
+    if not buckets or count is None:
+        return None
+    return {"buckets": buckets, "sum": total or 0.0, "count": count}
+
+
+def loop_lag_delta(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Event-loop lag observed by the server during the run (bucket upper bounds for percentiles)."""
+    if after is None:
+        return None
+    if before is None:
+        before = {"buckets": [(bound, 0.0) for bound, _ in after["buckets"]], "sum": 0.0, "count": 0.0}
+    count = after["count"] - before["count"]
+    if count <= 0:
+        return None
+    cumulative = [(bound, a - b) for (bound, a), (_, b) in zip(after["buckets"], before["buckets"])]
+
+    def bucket_percentile(q: float) -> Optional[float]:
+        for bound, seen in cumulative:
+            if seen >= count * q / 100:
+                return None if bound == float("inf") else round(bound * 1000, 1)
+        return None
+
+    over_50ms = count - next((seen for bound, seen in cumulative if bound >= 0.05), count)
+    return {
+        "samples": int(count),
+        "mean_ms": round((after["sum"] - before["sum"]) / count * 1000, 2),
+        "p50_le_ms": bucket_percentile(50),
+        "p99_le_ms": bucket_percentile(99),
+        "over_50ms_ratio": round(over_50ms / count, 4),
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    processes: List[subprocess.Popen] = []
+    base_url = args.target.rstrip("/") if args.target else f"http://127.0.0.1:{args.api_port}"
+    try:
+        if not args.target:
+            processes = start_local_stack(args)
+            await wait_until_up(f"http://127.0.0.1:{args.emulator_port}/_emulator/stats")
+        await wait_until_up(f"{base_url}/health")
+
+        plan = LoadPlan(
+            mix=parse_mix(args.mix),
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            max_requests=args.requests,
+            warmup=args.warmup,
+            use_rag=not args.no_rag,
+            use_functions=not args.no_functions,
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+        lag_before = parse_histogram(await fetch_text(f"{base_url}/metrics"), LOOP_LAG_METRIC)
+        wall = await run_load(base_url, plan)
+        lag_after = parse_histogram(await fetch_text(f"{base_url}/metrics"), LOOP_LAG_METRIC)
+        upstream = None if args.target else await fetch_json(f"http://127.0.0.1:{args.emulator_port}/_emulator/stats")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "target": base_url,
+        "config": {
+            "mode": "open_loop" if args.rate > 0 else "closed_loop",
+            "concurrency": args.concurrency,
+            "rate_rps": args.rate,
+            "duration_sec": args.duration,
+            "max_requests": args.requests,
+            "mix": plan.mix,
+            "use_rag": plan.use_rag,
+            "use_functions": plan.use_functions,
+            "emulator": None if args.target else {
+                "openai_latency": args.openai_latency,
+                "token_interval": args.token_interval,
+                "embeddings_latency": args.embeddings_latency,
+                "lunarcrush_latency": args.lunarcrush_latency,
+                "rss_latency": args.rss_latency,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+            },
+        },
+        "results": summarize(plan.samples, wall),
+        "event_loop": loop_lag_delta(lag_before, lag_after),
+        "upstream": upstream,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the EraAI API against locally emulated upstreams")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two saved JSON reports and exit")
+    load = parser.add_argument_group("load")
+    load.add_argument("--mix", default="chat=0.6,quick_actions=0.2,related_questions=0.2",
+                      help="Weighted endpoint mix (chat, chat_stream, quick_actions, related_questions)")
+    load.add_argument("--concurrency", "-c", type=int, default=10, help="Concurrent users in closed-loop mode")
+    load.add_argument("--rate", type=float, default=0.0, help="Arrival rate in requests/s (open loop; overrides --concurrency)")
+    load.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    load.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only)")
+    load.add_argument("--warmup", type=int, default=2, help="Requests sent before measuring")
+    load.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    load.add_argument("--no-rag", action="store_true", help="Send use_rag=false in chat requests")
+    load.add_argument("--no-functions", action="store_true", help="Send use_functions=false in chat requests")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--output", "-o", help="Write the JSON report here")
+    stack = parser.add_argument_group("local stack (ignored with --target)")
+    stack.add_argument("--target", help="Base URL of an already running API instead of the local stack")
+    stack.add_argument("--api-port", type=int, default=18090)
+    stack.add_argument("--emulator-port", type=int, default=19190)
+    stack.add_argument("--openai-latency", default="lognormal:0.6,0.4")
+    stack.add_argument("--token-interval", type=float, default=0.01)
+    stack.add_argument("--embeddings-latency", default="uniform:0.03,0.08")
+    stack.add_argument("--lunarcrush-latency", default="uniform:0.05,0.2")
+    stack.add_argument("--rss-latency", default="uniform:0.05,0.3")
+    stack.add_argument("--error-rate", type=float, default=0.0)
+    stack.add_argument("--rate-limit-rate", type=float, default=0.0)
+    stack.add_argument("--verbose", action="store_true", help="Show the API server's stderr")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark: Russian queries with and without LLM translation.
+
+Indexes a small English corpus into a throwaway Chroma collection, then
+answers Russian questions two ways: translated to English by the LLM before
+retrieval (the classic path) and embedded directly (multilingual retrieval).
+For each it reports recall@k and MRR against the passage each question was
+written for, plus query-preparation + retrieval latency and, unless
+--no-chat, end-to-end /chat latency through AIAssistant.
+
+Recall is only meaningful with real embeddings: run it against OpenAI or
+EMBEDDING_BACKEND=local. With --emulator the upstream emulator answers
+every call, which measures latency but yields arbitrary vectors.
+
+Usage:
+    EMBEDDING_BACKEND=local python benchmarks/translation_benchmark.py --k 3
+    python benchmarks/translation_benchmark.py --emulator --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (passage id, English passage, Russian question answered by it)
+CORPUS = [
+    ("halving", "Every 210,000 blocks, roughly every four years, the Bitcoin block subsidy is cut in half. "
+                "This event, the halving, slows the issuance of new coins until the 21 million cap is reached.",
+     "Что такое халвинг биткоина и как часто он происходит?"),
+    ("stock_to_flow", "The stock-to-flow ratio divides the existing stockpile of a good by its annual new production. "
+                      "A high ratio means new supply cannot easily dilute existing holders, which is why gold kept its value.",
+     "Что показывает соотношение запасов к приросту?"),
+    ("sound_money", "Sound money is money whose value is set by the market rather than by government decree; "
+                    "its supply is hard to increase, so it preserves purchasing power over time.",
+     "Что такое твёрдые деньги?"),
+    ("time_preference", "Low time preference means valuing the future more highly relative to the present. "
+                        "Hard money encourages saving and long-term investment by lowering time preference.",
+     "Как надёжные деньги влияют на временные предпочтения людей?"),
+    ("fiat_inflation", "Fiat currencies can be created at will by central banks. Expanding the money supply "
+                       "transfers wealth from savers to those who receive the new money first.",
+     "Почему инфляция фиатных валют вредит сберегателям?"),
+    ("proof_of_work", "Proof of work requires miners to spend electricity to find a valid block hash. "
+                      "Rewriting history would require redoing that work, which secures the ledger.",
+     "Зачем майнерам тратить электричество в доказательстве работы?"),
+    ("difficulty", "The difficulty adjustment retargets every 2,016 blocks so that blocks keep arriving about "
+                   "every ten minutes no matter how much hash power joins or leaves the network.",
+     "Как сеть поддерживает интервал между блоками около десяти минут?"),
+    ("gold_standard", "Under the classical gold standard, national currencies were redeemable for fixed weights of gold, "
+                      "which limited how much money governments could issue.",
+     "Как работал классический золотой стандарт?"),
+    ("lightning", "The Lightning Network opens payment channels off-chain and settles only the opening and closing "
+                  "transactions on the blockchain, enabling fast, cheap small payments.",
+     "Как Lightning Network ускоряет небольшие платежи?"),
+    ("self_custody", "Holding your own private keys in a hardware wallet removes counterparty risk: "
+                     "an exchange failure cannot take coins it never controlled.",
+     "Почему стоит хранить биткоины на собственном аппаратном кошельке?"),
+    ("keynes", "Keynesian economics favours government spending and low interest rates to stimulate demand, "
+               "an approach Austrian economists criticise for distorting the structure of production.",
+     "За что австрийская школа критикует кейнсианскую экономику?"),
+    ("supply_cap", "Bitcoin's total supply is capped at 21 million coins by the consensus rules, "
+                   "making it the first digital asset with verifiable absolute scarcity.",
+     "Сколько всего будет биткоинов и кто это гарантирует?"),
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+    prepare = [r["prepare_sec"] for r in runs]
+    retrieval = [r["retrieval_sec"] for r in runs]
+    total = [p + q for p, q in zip(prepare, retrieval)]
+    chat = [r["chat_sec"] for r in runs if r.get("chat_sec") is not None]
+    return {
+        "queries": len(runs),
+        "recall_at_k": round(sum(r["hit"] for r in runs) / len(runs), 3) if runs else 0.0,
+        "mrr": round(sum(r["reciprocal_rank"] for r in runs) / len(runs), 3) if runs else 0.0,
+        "translation_ms_p50": ms(percentile(prepare, 50)),
+        "retrieval_ms_p50": ms(percentile(retrieval, 50)),
+        "query_to_context_ms": {"p50": ms(percentile(total, 50)), "p95": ms(percentile(total, 95))},
+        "chat_ms": {"p50": ms(percentile(chat, 50)), "p95": ms(percentile(chat, 95))} if chat else None,
+    }
+
+
+async def run_variant(assistant, translate: bool, k: int, repeat: int, chat: bool) -> List[Dict[str, Any]]:
+    from src.config import config
+
+    # The assistant reads the policy per request; "always"/"never" pins the path under test
+    config.QUERY_TRANSLATION = "always" if translate else "never"
+    runs = []
+    for _ in range(repeat):
+        for passage_id, _, question in CORPUS:
+            started = time.perf_counter()
+            query = await assistant._translate_to_english(question) if translate else question
+            prepared = time.perf_counter()
+            documents = await assistant.rag_system.search_similar(query, k=k)
+            retrieved = time.perf_counter()
+            ranked = [doc.metadata.get("passage") for doc in documents]
+            rank = ranked.index(passage_id) + 1 if passage_id in ranked else None
+            run = {
+                "passage": passage_id,
+                "query": query,
+                "hit": rank is not None,
+                "reciprocal_rank": 1.0 / rank if rank else 0.0,
+                "prepare_sec": prepared - started,
+                "retrieval_sec": retrieved - prepared,
+            }
+            if chat:
+                assistant.clear_conversation_history()
+                chat_started = time.perf_counter()
+                await assistant.chat(question, use_rag=True, use_functions=False)
+                run["chat_sec"] = time.perf_counter() - chat_started
+            runs.append(run)
+    return runs
+
+
+async def main_async(args) -> Dict[str, Any]:
+    from src.ai_assistant import AIAssistant
+    from src.config import config
+
+    assistant = AIAssistant()
+    try:
+        await assistant.rag_system.add_texts(
+            [passage for _, passage, _ in CORPUS],
+            [{"passage": passage_id, "source": "translation_benchmark"} for passage_id, _, _ in CORPUS]
+        )
+        embeddings = assistant.rag_system.embeddings
+        results = {}
+        for name, translate in (("translated", True), ("direct", False)):
+            runs = await run_variant(assistant, translate, args.k, args.repeat, not args.no_chat)
+            results[name] = summarize(runs)
+            if args.verbose:
+                for run in runs[:len(CORPUS)]:
+                    print(f"[{name}] {run['passage']:<16} hit={run['hit']!s:<5} {run['query'][:70]}")
+        return {
+            "embedding_model": embeddings.model_id,
+            "multilingual": embeddings.multilingual,
+            "retrieval_mode": config.RETRIEVAL_MODE,
+            "k": args.k,
+            "results": results,
+        }
+    finally:
+        await assistant.cleanup()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"embedding model {report['embedding_model']} (multilingual={report['multilingual']}), "
+          f"retrieval {report['retrieval_mode']}, k={report['k']}")
+    header = f"{'variant':<12}{'recall@k':>10}{'MRR':>7}{'transl50':>10}{'retr50':>9}{'ctx p50':>9}{'ctx p95':>9}{'chat p50':>10}{'chat p95':>10}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda v: f"{v:.0f}" if v is not None else "-"  # noqa: E731
+    for name, block in report["results"].items():
+        chat = block["chat_ms"] or {"p50": None, "p95": None}
+        print(
+            f"{name:<12}{block['recall_at_k']:>10.3f}{block['mrr']:>7.3f}{fmt(block['translation_ms_p50']):>10}"
+            f"{fmt(block['retrieval_ms_p50']):>9}{fmt(block['query_to_context_ms']['p50']):>9}"
+            f"{fmt(block['query_to_context_ms']['p95']):>9}{fmt(chat['p50']):>10}{fmt(chat['p95']):>10}"
+        )
+    print("(latencies in ms; ctx = query preparation + retrieval)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Russian retrieval with and without query translation")
+    parser.add_argument("--k", type=int, default=3, help="Documents retrieved per query")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the question set per variant")
+    parser.add_argument("--no-chat", action="store_true", help="Skip the end-to-end chat measurement")
+    parser.add_argument("--emulator", action="store_true", help="Run against a local upstream_emulator.py")
+    parser.add_argument("--emulator-port", type=int, default=19290)
+    parser.add_argument("--openai-latency", default="lognormal:0.6,0.4", help="Emulated completion latency")
+    parser.add_argument("--output", "-o", help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="Print per-question hits of the first pass")
+    args = parser.parse_args()
+
+    # Configure before importing src so Config sees a throwaway store and no caches
+    os.environ["CHROMA_DB_PATH"] = tempfile.mkdtemp(prefix="eraai-translation-")
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ["COMPLETION_CACHE_ENABLED"] = "false"
+    emulator = None
+    if args.emulator:
+        os.environ["UPSTREAM_EMULATOR_URL"] = f"http://127.0.0.1:{args.emulator_port}"
+        emulator = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "upstream_emulator.py"), "--port", str(args.emulator_port),
+             "--openai-latency", args.openai_latency, "--token-interval", "0"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        time.sleep(2.0)
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait(timeout=10)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -864,7 +864,8 @@ async function sendMessage() {
         return;
     }
     
-    // Track conversation state
+    // Track conversation state; only an opening message may be answered from the server's answer cache
+    const newConversation = !conversationStarted;
     if (!conversationStarted) {
         conversationStarted = true;
         // Make header compact after first message
@@ -895,28 +896,45 @@ async function sendMessage() {
     showLoading();
     
     try {
-        const response = await fetch(`${API_BASE}/chat`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ 
-                message: message,
-                use_rag: true,
-                use_functions: true,
-                temperature: 0.7
-            }),
-            signal: currentGenerationController.signal
-        });
+        const requestStart = performance.now();
+        let streamed = null;
+        let streamError = null;
         
-        const data = await response.json();
+        await streamChat(message, newConversation, {
+            onTool: (event) => {
+                // Show which live data source is being queried while tools run
+                const thinkingText = document.querySelector('.loading-indicator .thinking-text');
+                if (thinkingText) {
+                    thinkingText.textContent = `Получаем данные: ${event.name}`;
+                }
+            },
+            onReset: () => {
+                // Text streamed before a tool call is discarded by the server; drop it here too
+                if (streamed) {
+                    streamed.reset();
+                }
+            },
+            onToken: (token) => {
+                if (!streamed) {
+                    console.log('Time to first token:', Math.round(performance.now() - requestStart), 'ms');
+                    hideLoading(); // First token arrived: replace the spinner with the message
+                    streamed = createStreamingMessage();
+                }
+                streamed.append(token);
+            },
+            onError: (error) => {
+                streamError = error;
+            }
+        }, currentGenerationController.signal);
         
-        if (data.error) {
+        if (streamed) {
+            streamed.finish();
+        }
+        
+        if (streamError) {
             hideLoading();
-            addMessage('error', `Error: ${data.error.message || 'Unknown error'}`);
-        } else if (data.result && data.result.content) {
-            const assistantMessage = data.result.content[0].text;
-            hideLoading(); // Hide loading before starting typing animation
-            await addMessage('assistant', assistantMessage, true); // Enable typing animation
-            
+            addMessage('error', `Error: ${streamError || 'Unknown error'}`);
+        } else if (streamed) {
             // Fetch related questions after assistant responds
             if (conversationStarted) {
                 try {
@@ -959,6 +977,101 @@ async function sendMessage() {
     }
 }
 
+// Stream /chat/stream Server-Sent Events and dispatch them to callbacks
+async function streamChat(message, newConversation, handlers, signal) {
+    const response = await fetch(`${API_BASE}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ 
+            message: message,
+            use_rag: true,
+            use_functions: true,
+            temperature: 0.7,
+            new_conversation: newConversation
+        }),
+        signal: signal
+    });
+    
+    if (!response.ok || !response.body) {
+        handlers.onError(`HTTP ${response.status}`);
+        return;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const data = frame.split('\n')
+                .filter(line => line.startsWith('data:'))
+                .map(line => line.slice(5).trimStart())
+                .join('\n');
+            if (!data) continue;
+            
+            const event = JSON.parse(data);
+            if (event.type === 'token') {
+                handlers.onToken(event.content);
+            } else if (event.type === 'reset') {
+                handlers.onReset();
+            } else if (event.type === 'tool_call') {
+                handlers.onTool(event);
+            } else if (event.type === 'error') {
+                handlers.onError(event.error);
+            }
+        }
+    }
+}
+
+// Assistant message that renders streamed tokens as they arrive
+function createStreamingMessage() {
+    addMessage('assistant', '');
+    const messages = document.getElementById('messages');
+    const element = messages.lastElementChild.querySelector('.message-content');
+    let text = '';
+    let renderScheduled = false;
+    
+    function render(withCursor) {
+        element.innerHTML = parseMarkdown(text) + (withCursor ? '<span class="typing-cursor">|</span>' : '');
+    }
+    
+    return {
+        append(token) {
+            text += token;
+            // Re-render at most once per animation frame
+            if (!renderScheduled) {
+                renderScheduled = true;
+                requestAnimationFrame(() => {
+                    renderScheduled = false;
+                    if (!isGenerating) return;
+                    render(true);
+                    const now = Date.now();
+                    if (now - lastScrollTs > SCROLL_THROTTLE_MS) {
+                        scrollToBottom(true);
+                        lastScrollTs = now;
+                    }
+                });
+            }
+        },
+        reset() {
+            text = '';
+            render(true);
+        },
+        finish() {
+            render(false);
+            scrollToBottom(true);
+        }
+    };
+}
+
 function handleKeyDown(event) {
     if (event.key === 'Enter' && !event.shiftKey) {
         event.preventDefault();
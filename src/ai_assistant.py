@@ -1,16 +1,30 @@
+import asyncio
+import importlib.util
 import io
 import logging
 import json
+import time
 from typing import List, Dict, Any, Optional
 
+from src import metrics
+from src.completion_cache import get_shared_translation_cache, make_cache_key, normalize_query
+from src.context_packer import PackedContext
 from src.llm_client import LLMClient
+from src.loop_monitor import get_shared_loop_monitor
 from src.rag_system import RAGSystem
+from src.semantic_cache import SemanticCacheHit, get_shared_semantic_cache
 from src.function_caller import FunctionCaller
+from src.prompt_builder import build_prompt_messages
+from src.single_flight import SingleFlight
+from src.token_counter import trim_messages_to_budget, truncate_text_to_tokens
 from src.config import config
 
 
 logger = logging.getLogger(__name__)
 
+# Concurrent translations of the same normalized query share one LLM call
+_translation_flight = SingleFlight()
+
 class AIAssistant:
     def __init__(self):
         self.llm_client = LLMClient()
@@ -19,6 +33,10 @@ class AIAssistant:
         self.conversation_history: List[Dict[str, str]] = []
         self.system_prompt = config.SYSTEM_PROMPT
         self._summary: str = ""
+        # Normalized query -> English translation (None when disabled)
+        self.translation_cache = get_shared_translation_cache()
+        # Question embedding -> answer for near-duplicate questions (None when disabled)
+        self.semantic_cache = get_shared_semantic_cache()
     
     async def _ensure_function_caller(self):
         """Ensure function caller is initialized with async context."""
@@ -31,52 +49,37 @@ class AIAssistant:
         if self.function_caller:
             await self.function_caller.__aexit__(None, None, None)
             self.function_caller = None
+        self.rag_system.close()
     
-    async def chat(self, user_message: str, use_rag: bool = True, use_functions: bool = True, temperature: float = 0.7, translate_queries: bool = True) -> Dict[str, Any]:
+    async def chat(
+        self,
+        user_message: str,
+        use_rag: bool = True,
+        use_functions: bool = True,
+        temperature: float = 0.7,
+        translate_queries: bool = True,
+        first_turn: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Answer a message, with optional RAG context and tool calls.
+        
+        `first_turn` tells whether the message opens the caller's conversation
+        (only then may the semantic cache answer it); when None, it is taken
+        from this assistant's own history.
+        """
+        started = time.perf_counter()
         try:
+            cache_scope, question_vector, hit = await self._lookup_semantic_cache(
+                user_message, use_rag, use_functions, first_turn
+            )
+            if hit is not None:
+                return self._answer_from_semantic_cache(user_message, hit)
+            
             # Ensure function caller is initialized
             if use_functions:
                 await self._ensure_function_caller()
             
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            messages = self.conversation_history.copy()
-            
-            system_content = self._build_system_prompt()
-            if not messages or messages[0]["role"] != "system":
-                messages.insert(0, {
-                    "role": "system",
-                    "content": system_content
-                })
-            else:
-                messages[0]["content"] = system_content
-            
-            context = ""
-            if use_rag:
-                search_query = user_message
-                if translate_queries and self._is_russian_text(user_message):
-                    translated_query = await self._translate_to_english(user_message)
-                    if translated_query:
-                        search_query = translated_query
-                        logger.info(f"Translated query: '{user_message}' → '{translated_query}'")
-                
-                context = await self.rag_system.get_relevant_context(search_query)
-                if context:
-                    # Truncate context to avoid exceeding prompt limits
-                    if len(context) > config.RAG_CONTEXT_MAX_CHARS:
-                        context = context[:config.RAG_CONTEXT_MAX_CHARS]
-                    enhanced_message = f"Context:\n{context}\n\nUser question: {user_message}"
-                    messages[-1]["content"] = enhanced_message
-
-            # Optional: inject concise summary as context carrier if we have one
-            if self._summary:
-                messages.insert(1, {"role": "system", "content": f"Running summary of prior conversation (for context preservation):\n{self._summary}"})
-
-            # Trim conversation history to stay within limits (prefers newest + context)
-            messages = self._trim_messages(messages)
+            messages, context = await self._prepare_messages(user_message, use_rag, translate_queries, question_vector)
             
             functions = None
             if use_functions:
@@ -95,43 +98,22 @@ class AIAssistant:
                 )
             
             function_results = []
-            if response.get("function_call"):
-                function_call = response["function_call"]
-                if hasattr(function_call, 'name'):
-                    function_call_dict = {
-                        "name": function_call.name,
-                        "arguments": function_call.arguments
-                    }
-                else:
-                    function_call_dict = function_call
-                
-                function_result = await self.function_caller.execute_function_call(
-                    function_call_dict
-                )
-                function_results.append(function_result)
-                
-                messages.append({
-                    "role": "assistant",
-                    "content": None,
-                    "function_call": function_call_dict
-                })
-                
-                messages.append({
-                    "role": "function",
-                    "name": function_result["function_name"],
-                    "content": json.dumps(function_result["result"])
-                })
-                
-                # Re-trim messages after adding function result
-                messages = self._trim_messages(messages)
-                final_response = await self.llm_client.chat_completion(
+            step = 0
+            while response.get("tool_calls") and step < config.TOOL_MAX_STEPS:
+                step += 1
+                # Run every requested tool concurrently within the step deadline
+                step_results = await self._execute_tool_calls(response["tool_calls"])
+                function_results.extend(step_results)
+                messages = self._append_tool_round(messages, response, step_results)
+                # Offer tools again until the step budget is spent, then force an answer
+                response = await self.llm_client.chat_completion(
                     messages=messages,
-                    temperature=temperature
+                    temperature=temperature,
+                    functions=functions,
+                    tool_choice="auto" if step < config.TOOL_MAX_STEPS else "none"
                 )
-                
-                assistant_message = final_response["content"]
-            else:
-                assistant_message = response["content"]
+            
+            assistant_message = response["content"]
             
             self.conversation_history.append({
                 "role": "assistant",
@@ -140,10 +122,17 @@ class AIAssistant:
             # Update rolling summary to preserve long-term context
             self._update_summary(user_message, assistant_message)
             
+            self._store_semantic_answer(
+                question_vector, cache_scope, assistant_message, bool(function_results),
+                started, response.get("model"), context
+            )
+            
             return {
                 "response": assistant_message,
                 "function_calls": function_results,
-                "context_used": bool(context),
+                "context_used": bool(context.text),
+                "sources": context.sources,
+                "compression": context.compression,
                 "usage": response.get("usage"),
                 "model": response.get("model")
             }
@@ -155,58 +144,241 @@ class AIAssistant:
                 "error": str(e)
             }
 
+    async def _lookup_semantic_cache(
+        self,
+        user_message: str,
+        use_rag: bool,
+        use_functions: bool,
+        first_turn: Optional[bool]
+    ) -> tuple[str, Optional[List[float]], Optional[SemanticCacheHit]]:
+        """
+        Look the question up in the semantic cache.
+        
+        Near-duplicates of answered questions skip translation, retrieval and the
+        LLM entirely. Only opening questions qualify: a follow-up ("tell me more")
+        depends on the history and summary, which the question embedding does not
+        capture. Returns the cache scope, the question embedding (None when the
+        cache does not apply) and the hit, if any.
+        """
+        cache_scope = f"rag={use_rag},tools={use_functions}"
+        if first_turn is None:
+            first_turn = not self.conversation_history
+        if not first_turn:
+            return cache_scope, None, None
+        question_vector = await self._embed_for_semantic_cache(user_message)
+        if question_vector is None:
+            return cache_scope, None, None
+        hit = self.semantic_cache.lookup(question_vector, cache_scope)
+        metrics.CACHE_REQUESTS.labels("semantic", "hit" if hit is not None else "miss").inc()
+        if hit is not None:
+            metrics.CACHE_SAVED_SECONDS.labels("semantic").inc(hit.saved_latency_ms / 1000)
+        return cache_scope, question_vector, hit
+
+    def _store_semantic_answer(
+        self,
+        question_vector: Optional[List[float]],
+        cache_scope: str,
+        answer: str,
+        used_tools: bool,
+        started: float,
+        model: Optional[str],
+        context: PackedContext
+    ) -> None:
+        if question_vector is None or not answer:
+            return
+        # Answers built from live tool data expire sooner (or are not cached at all)
+        self.semantic_cache.store(
+            question_vector,
+            cache_scope,
+            answer,
+            ttl_sec=config.SEMANTIC_CACHE_TOOL_TTL_SEC if used_tools else config.SEMANTIC_CACHE_TTL_SEC,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            payload={"model": model, "context_used": bool(context.text), "sources": context.sources}
+        )
+
+    async def _embed_for_semantic_cache(self, user_message: str) -> Optional[List[float]]:
+        if self.semantic_cache is None:
+            return None
+        try:
+            return await self.rag_system.embeddings.aembed_query(user_message)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup skipped: {str(e)}")
+            return None
+
+    def _answer_from_semantic_cache(self, user_message: str, hit: SemanticCacheHit) -> Dict[str, Any]:
+        """Record the turn and return a cached answer in the shape of a normal chat result."""
+        logger.info(f"Semantic cache hit (similarity {hit.similarity:.3f}, saved {hit.saved_latency_ms:.0f}ms)")
+        self.conversation_history.append({"role": "user", "content": user_message})
+        self.conversation_history.append({"role": "assistant", "content": hit.answer})
+        self._update_summary(user_message, hit.answer)
+        return {
+            "response": hit.answer,
+            "function_calls": [],
+            "context_used": hit.payload.get("context_used", False),
+            "sources": hit.payload.get("sources", []),
+            "usage": {
+                "cache_hit": True,
+                "semantic_similarity": round(hit.similarity, 4),
+                "saved_latency_ms": round(hit.saved_latency_ms, 1)
+            },
+            "model": hit.payload.get("model")
+        }
+
+    async def _prepare_messages(
+        self,
+        user_message: str,
+        use_rag: bool,
+        translate_queries: bool,
+        query_embedding: Optional[List[float]] = None
+    ) -> tuple[List[Dict[str, Any]], PackedContext]:
+        """
+        Record the user turn and build the trimmed prompt (system prompt, RAG context, summary).
+        
+        `query_embedding` is the embedding of `user_message` if it was already
+        computed; retrieval reuses it unless the query was translated. The
+        packed context is returned alongside so callers can report its sources.
+        """
+        # Prior turns exactly as stored, so the prompt prefix stays stable between turns
+        history = self.conversation_history.copy()
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        context = PackedContext()
+        if use_rag:
+            search_query = user_message
+            if self._should_translate_query(user_message, translate_queries):
+                with metrics.STAGE_LATENCY.labels("translation").time():
+                    translated_query = await self._translate_to_english(user_message)
+                if translated_query:
+                    search_query = translated_query
+                    logger.info(f"Translated query: '{user_message}' → '{translated_query}'")
+            
+            with metrics.STAGE_LATENCY.labels("retrieval").time():
+                # Already fitted to the RAG token budget; no further truncation needed
+                context = await self.rag_system.pack_relevant_context(
+                    search_query,
+                    query_embedding=query_embedding if search_query == user_message else None
+                )
+
+        # Stable instructions first; summary and retrieved context ride on the last user turn
+        messages = build_prompt_messages(
+            instructions=self._build_system_prompt(),
+            history=history,
+            question=user_message,
+            summary=self._summary,
+            context=context.text
+        )
+
+        # Trim conversation history to stay within limits (prefers newest + context)
+        return self._trim_messages(messages), context
+
+    def _append_tool_round(self, messages: List[Dict[str, Any]], response: Dict[str, Any], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append the assistant tool-call turn and one tool message per result, then re-trim."""
+        messages = messages + [{
+            "role": "assistant",
+            "content": response.get("content"),
+            "tool_calls": response["tool_calls"]
+        }]
+        for tool_call, function_result in zip(response["tool_calls"], results):
+            content = json.dumps(function_result["result"], ensure_ascii=False, default=str)
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                # Large results (e.g. every coin from get_coin_metrics) must not crowd out the question
+                "content": truncate_text_to_tokens(content, config.TOOL_RESULT_MAX_TOKENS, config.OPENAI_MODEL)
+            })
+        return self._trim_messages(messages)
+
+    async def _execute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Execute tool calls concurrently; calls still running at the step deadline become errors."""
+        tasks = [
+            asyncio.create_task(self.function_caller.execute_function_call(tool_call["function"]))
+            for tool_call in tool_calls
+        ]
+        with metrics.STAGE_LATENCY.labels("tools").time():
+            done, pending = await asyncio.wait(tasks, timeout=config.TOOL_STEP_TIMEOUT_SEC)
+        for task in pending:
+            task.cancel()
+        
+        results = []
+        for tool_call, task in zip(tool_calls, tasks):
+            if task in done and task.exception() is None:
+                results.append(task.result())
+            else:
+                error = "timed out" if task in pending else str(task.exception())
+                logger.warning(f"Tool call {tool_call['function']['name']} failed: {error}")
+                results.append({
+                    "function_name": tool_call["function"]["name"],
+                    "result": f"Error: {error}",
+                    "status": "error"
+                })
+            metrics.TOOL_CALLS.labels(tool_call["function"]["name"], results[-1].get("status", "success")).inc()
+        return results
+
+    async def complete(self, prompt: str, temperature: float = 0.7, purpose: str = "chat") -> Dict[str, Any]:
+        """One-off completion with the system prompt that does not touch conversation history."""
+        try:
+            messages = [
+                {"role": "system", "content": self._build_system_prompt()},
+                {"role": "user", "content": prompt}
+            ]
+            response = await self.llm_client.chat_completion(
+                messages=messages,
+                temperature=temperature,
+                purpose=purpose
+            )
+            return {
+                "response": response["content"],
+                "usage": response.get("usage"),
+                "model": response.get("model")
+            }
+        except Exception as e:
+            logger.error(f"Error in completion: {str(e)}")
+            return {
+                "response": f"I apologize, but I encountered an error: {str(e)}",
+                "error": str(e)
+            }
+
+    def _should_translate_query(self, text: str, translate_queries: bool) -> bool:
+        """Translate Russian search queries unless disabled or the embeddings are multilingual."""
+        if not translate_queries or config.QUERY_TRANSLATION == "never" or not self._is_russian_text(text):
+            return False
+        if config.QUERY_TRANSLATION == "auto":
+            return not self.rag_system.embeddings.multilingual
+        return True
+
     def _is_russian_text(self, text: str) -> bool:
         russian_chars = set('абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
         return any(char in russian_chars for char in text)
 
     def _trim_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Trim messages preferring the most recent turns; keep system and latest user/context fully when possible."""
-        if not messages:
-            return messages
-        max_history = max(1, config.MAX_HISTORY_MESSAGES)
-        system_msg = messages[0] if messages and messages[0].get("role") == "system" else None
-        history = messages[1:] if system_msg else messages[:]
-        # First, cap by number of messages (keep most recent)
-        recent_history = history[-max_history:]
-        # Now enforce soft char budget preferring newest messages
-        budget = config.MAX_PROMPT_CHARS
-        kept_reversed: List[Dict[str, Any]] = []
-        used = 0
-        for msg in reversed(recent_history):
-            content_text = msg.get("content") or ""
-            content_len = len(content_text)
-            if used + content_len <= budget:
-                kept_reversed.append(msg)
-                used += content_len
-            else:
-                # Always keep at least part of the newest message if nothing kept yet
-                if not kept_reversed and content_len > 0:
-                    part = max(0, budget)
-                    new_msg = dict(msg)
-                    new_msg["content"] = content_text[:part]
-                    kept_reversed.append(new_msg)
-                    used += len(new_msg["content"]) 
-                # Otherwise stop; older messages are dropped first
-                break
-        kept_history = list(reversed(kept_reversed))
-        # Prepend system message, truncated if needed
-        if system_msg:
-            remaining = max(0, budget - sum(len((m.get("content") or "")) for m in kept_history))
-            sys_content = system_msg.get("content") or ""
-            if len(sys_content) > remaining and remaining > 0:
-                sys_copy = dict(system_msg)
-                sys_copy["content"] = sys_content[:remaining]
-                return [sys_copy] + kept_history
-            elif remaining <= 0:
-                # No room; still include a very short system prefix to keep role context
-                sys_copy = dict(system_msg)
-                sys_copy["content"] = sys_content[:128]
-                return [sys_copy] + kept_history
-            else:
-                return [system_msg] + kept_history
-        return kept_history
+        """Trim messages to the prompt budget; the current question and its tool round always survive."""
+        return trim_messages_to_budget(
+            messages,
+            budget_tokens=config.MAX_PROMPT_TOKENS,
+            model=config.OPENAI_MODEL,
+            max_history=config.MAX_HISTORY_MESSAGES,
+        )
 
     async def _translate_to_english(self, text: str) -> str:
+        """Translate a search query, served from the translation cache when a normalized copy was seen."""
+        key = make_cache_key({
+            "purpose": "translation",
+            "model": self.llm_client.router.resolve("translation").model,
+            "query": normalize_query(text),
+        })
+        if self.translation_cache is not None:
+            cached = self.translation_cache.get(key)
+            metrics.CACHE_REQUESTS.labels("translation", "hit" if cached is not None else "miss").inc()
+            if cached is not None:
+                metrics.CACHE_SAVED_SECONDS.labels("translation").inc(cached["usage"]["saved_latency_ms"] / 1000)
+                return cached["content"]
+        translated = await _translation_flight.do(key, lambda: self._translate_uncached(text, key))
+        return translated or text
+
+    async def _translate_uncached(self, text: str, key: str) -> Optional[str]:
         try:
             translation_prompt = f"""
             Imagine that you are one of the best professional translators in the world of economics, finance, and cryptocurrencies, working with the world's top corporations and publications. Translate the following text from Russian to English, maintaining the original accuracy and professionalism of the information.
@@ -215,16 +387,25 @@ class AIAssistant:
             English:
             """
         
-            response = await self.llm_client.chat_completion([{"role": "user", "content": translation_prompt}], temperature=0.1)
+            started = time.perf_counter()
+            response = await self.llm_client.chat_completion(
+                [{"role": "user", "content": translation_prompt}],
+                temperature=0.1,
+                purpose="translation"
+            )
             
-            if response and "content" in response:
-                return response["content"].strip()
+            if response and response.get("content"):
+                translated = response["content"].strip()
+                # Failed translations fall back to the original text and are not cached
+                if self.translation_cache is not None:
+                    self.translation_cache.set(key, {"content": translated}, (time.perf_counter() - started) * 1000)
+                return translated
             else:
-                return text
+                return None
                 
         except Exception as e:
             logger.warning(f"Translation failed: {str(e)}")
-            return text
+            return None
     
     async def add_knowledge(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
 
@@ -246,9 +427,8 @@ class AIAssistant:
     async def add_pdf_content(self, pdf_content: bytes, filename: str) -> Dict[str, Any]:
 
         try:
-            try:
-                import PyPDF2
-            except ImportError:
+            # Only check availability here; _extract_pdf_texts imports it on the worker thread
+            if importlib.util.find_spec("PyPDF2") is None:
                 logger.error("PyPDF2 not installed. Please install it with: pip install PyPDF2")
                 return {
                     "status": "error",
@@ -256,32 +436,10 @@ class AIAssistant:
                     "message": "Please install PyPDF2: pip install PyPDF2"
                 }
             
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            pages_processed = len(pdf_reader.pages)
-            
-            texts = []
-            metadatas = []
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    text = page.extract_text()
-                    if text.strip():  # Only add non-empty pages
-                        # Split large pages into smaller chunks
-                        page_chunks = self._split_large_text(text, max_chunk_size=8000)
-                        
-                        for chunk_num, chunk in enumerate(page_chunks, 1):
-                            texts.append(chunk)
-                            metadatas.append({
-                                "source": filename,
-                                "page": page_num,
-                                "chunk": chunk_num,
-                                "total_chunks": len(page_chunks),
-                                "type": "pdf"
-                            })
-                            
-                except Exception as e:
-                    logger.warning(f"Error extracting text from page {page_num}: {str(e)}")
-                    continue
+            # PDF parsing is CPU-bound; keep it off the event loop so chat traffic is not stalled
+            pages_processed, texts, metadatas = await asyncio.to_thread(
+                self._extract_pdf_texts, pdf_content, filename
+            )
             
             if not texts:
                 return {
@@ -290,26 +448,15 @@ class AIAssistant:
                     "message": "The PDF appears to be empty or unreadable"
                 }
             
-            # Process texts in batches to avoid token limits
-            batch_size = 50  # Process 50 chunks at a time
-            total_chunks_added = 0
-            
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                batch_metadatas = metadatas[i:i + batch_size]
-                
-                try:
-                    await self.rag_system.add_texts(batch_texts, batch_metadatas)
-                    total_chunks_added += len(batch_texts)
-                    logger.info(f"Added batch {i//batch_size + 1}: {len(batch_texts)} chunks")
-                except Exception as e:
-                    logger.error(f"Error adding batch {i//batch_size + 1}: {str(e)}")
-                    continue
+            # The ingestion pipeline batches, embeds and writes the chunks concurrently
+            ingestion = await self.rag_system.add_texts(texts, metadatas)
+            total_chunks_added = ingestion["chunks_written"]
             
             return {
                 "status": "success",
                 "pages_processed": pages_processed,
                 "chunks_added": total_chunks_added,
+                "ingestion": ingestion,
                 "message": f"Successfully processed {filename}: {pages_processed} pages, {total_chunks_added} text chunks added"
             }
             
@@ -321,6 +468,38 @@ class AIAssistant:
                 "message": f"Error processing PDF: {str(e)}"
             }
 
+    def _extract_pdf_texts(self, pdf_content: bytes, filename: str) -> tuple[int, List[str], List[Dict[str, Any]]]:
+        import PyPDF2
+
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+        pages_processed = len(pdf_reader.pages)
+        
+        texts = []
+        metadatas = []
+        
+        for page_num, page in enumerate(pdf_reader.pages, 1):
+            try:
+                text = page.extract_text()
+                if text.strip():  # Only add non-empty pages
+                    # Split large pages into smaller chunks
+                    page_chunks = self._split_large_text(text, max_chunk_size=8000)
+                    
+                    for chunk_num, chunk in enumerate(page_chunks, 1):
+                        texts.append(chunk)
+                        metadatas.append({
+                            "source": filename,
+                            "page": page_num,
+                            "chunk": chunk_num,
+                            "total_chunks": len(page_chunks),
+                            "type": "pdf"
+                        })
+                        
+            except Exception as e:
+                logger.warning(f"Error extracting text from page {page_num}: {str(e)}")
+                continue
+        
+        return pages_processed, texts, metadatas
+
     def _split_large_text(self, text: str, max_chunk_size: int = 8000) -> List[str]:
         if len(text) <= max_chunk_size:
             return [text]
@@ -438,12 +617,10 @@ class AIAssistant:
         НЕ ГОВОРИ, что у тебя нет доступа к данным - у тебя есть функции для их получения!
         """
         
-        # Suppress repetitive greetings on continued turns
-        if len(self.conversation_history) >= 2:
-            suppress = "Не приветствуй и не представляйся снова; продолжай разговор кратко."
-            return f"{russian_instruction}\n{base}\n\n{suppress}" if base else f"{russian_instruction}\n{suppress}"
-        
-        return f"{russian_instruction}\n{base}" if base else russian_instruction
+        # Suppress repetitive greetings on continued turns. Phrased conditionally so the
+        # system prompt is identical on every turn and stays cacheable upstream.
+        suppress = "Если в диалоге уже были сообщения, не приветствуй и не представляйся снова; продолжай разговор кратко."
+        return f"{russian_instruction}\n{base}\n\n{suppress}" if base else f"{russian_instruction}\n{suppress}"
 
     def _update_summary(self, user: str, assistant: str) -> None:
         """Maintain a very concise rolling summary to carry context without large history."""
@@ -458,10 +635,12 @@ class AIAssistant:
     
     async def get_system_info(self) -> Dict[str, Any]:
         try:
+            await self._ensure_function_caller()
             rag_stats = await self.rag_system.get_collection_stats()
             
             return {
                 "model": config.OPENAI_MODEL,
+                "routing": self.llm_client.router.get_stats(),
                 "rag_system": {
                     "total_documents": rag_stats.get("total_documents", 0),
                     "collection_name": rag_stats.get("collection_name", "documents")
@@ -472,45 +651,122 @@ class AIAssistant:
                 },
                 "conversation": {
                     "history_length": len(self.conversation_history)
-                }
+                },
+                "rate_limiter": self.llm_client.rate_limiter.get_stats(),
+                "completion_cache": self.llm_client.completion_cache.get_stats() if self.llm_client.completion_cache else None,
+                "single_flight": self.llm_client.single_flight.get_stats() if self.llm_client.single_flight else None,
+                "semantic_cache": self.semantic_cache.get_stats() if self.semantic_cache else None,
+                "translation_cache": {
+                    **(self.translation_cache.get_stats() if self.translation_cache else {}),
+                    "coalesced": _translation_flight.coalesced
+                },
+                "circuit_breaker": self.llm_client.circuit_breaker.get_stats(),
+                "event_loop": get_shared_loop_monitor().get_stats()
             }
         except Exception as e:
             logger.error(f"Error getting system info: {str(e)}")
             return {"error": str(e)}
     
-    async def stream_chat(self, user_message: str, use_rag: bool = True, temperature: float = 0.7):
-
+    async def stream_chat(
+        self,
+        user_message: str,
+        use_rag: bool = True,
+        use_functions: bool = True,
+        temperature: float = 0.7,
+        translate_queries: bool = True,
+        first_turn: Optional[bool] = None
+    ):
+        """
+        Same pipeline as `chat`, streamed as events.
+        
+        A semantic cache hit is sent as a single token event.
+        
+        Yields:
+            {"type": "tool_call", ...} for every executed tool, {"type": "token", "content": str}
+            for answer deltas, {"type": "reset"} when the tokens streamed so far were a preamble
+            to tool calls and must be discarded, then {"type": "done", ...} or {"type": "error", "error": str}
+        """
+        started = time.perf_counter()
         try:
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            messages = self.conversation_history.copy()
+            cache_scope, question_vector, hit = await self._lookup_semantic_cache(
+                user_message, use_rag, use_functions, first_turn
+            )
+            if hit is not None:
+                result = self._answer_from_semantic_cache(user_message, hit)
+                yield {"type": "token", "content": result.pop("response")}
+                yield {"type": "done", **result}
+                return
             
-            if not messages or messages[0]["role"] != "system":
-                messages.insert(0, {
-                    "role": "system",
-                    "content": self.system_prompt
-                })
+            if use_functions:
+                await self._ensure_function_caller()
             
-            # Get relevant context if RAG is enabled
-            if use_rag:
-                context = await self.rag_system.get_relevant_context(user_message)
-                if context:
-                    enhanced_message = f"Context:\n{context}\n\nUser question: {user_message}"
-                    messages[-1]["content"] = enhanced_message
+            messages, context = await self._prepare_messages(user_message, use_rag, translate_queries, question_vector)
+            functions = self.function_caller.get_function_definitions() if use_functions else None
             
             full_response = ""
-            async for chunk in self.llm_client.stream_chat(messages, temperature):
-                full_response += chunk
-                yield chunk
+            function_results = []
+            usage = None
+            model = None
+            step = 0
+            while True:
+                tool_choice = None
+                if functions:
+                    tool_choice = "auto" if step < config.TOOL_MAX_STEPS else "none"
+                tool_calls = None
+                async for event in self.llm_client.stream_completion(
+                    messages,
+                    temperature=temperature,
+                    functions=functions,
+                    tool_choice=tool_choice
+                ):
+                    if event["type"] == "token":
+                        full_response += event["content"]
+                        yield event
+                    elif event["type"] == "tool_calls":
+                        tool_calls = event["tool_calls"]
+                    elif event["type"] == "usage":
+                        usage, model = event["usage"], event["model"]
+                
+                if not tool_calls or step >= config.TOOL_MAX_STEPS:
+                    break
+                if full_response:
+                    # Text streamed before the tool calls is not part of the final answer
+                    yield {"type": "reset"}
+                step += 1
+                step_results = await self._execute_tool_calls(tool_calls)
+                function_results.extend(step_results)
+                for function_result in step_results:
+                    yield {
+                        "type": "tool_call",
+                        "name": function_result["function_name"],
+                        "status": function_result["status"]
+                    }
+                messages = self._append_tool_round(
+                    messages, {"content": full_response or None, "tool_calls": tool_calls}, step_results
+                )
+                full_response = ""
             
             self.conversation_history.append({
                 "role": "assistant",
                 "content": full_response
             })
+            self._update_summary(user_message, full_response)
+            self._store_semantic_answer(
+                question_vector, cache_scope, full_response, bool(function_results), started, model, context
+            )
+            
+            yield {
+                "type": "done",
+                "function_calls": [
+                    {"function_name": r["function_name"], "status": r["status"]} for r in function_results
+                ],
+                "context_used": bool(context.text),
+                "sources": context.sources,
+                "compression": context.compression,
+                "usage": usage,
+                "model": model
+            }
             
         except Exception as e:
             logger.error(f"Error in stream chat: {str(e)}")
-            yield f"Error: {str(e)}"
+            yield {"type": "error", "error": str(e)}
@@ -0,0 +1,222 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+# The disk table may exceed max_entries by this share before the oldest rows are trimmed
+DISK_TRIM_MARGIN = 0.1
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_cache_key(params: Dict[str, Any]) -> str:
+    """Canonical sha256 of request parameters (dict order does not matter)."""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def normalize_query(text: str) -> str:
+    """Case-, whitespace- and punctuation-insensitive form of a user query ("Что такое биткоин?!" == "что такое  биткоин")."""
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text)).strip()
+
+
+class CompletionCache:
+    """
+    LRU + TTL cache for chat completion responses.
+
+    Entries live in an in-memory OrderedDict; when `disk_path` is set they are
+    also written to a small SQLite file so they survive restarts. Writes go
+    through a single background thread so `set` never blocks the event loop,
+    and the table is trimmed back to `max_entries` only once it outgrows it
+    by DISK_TRIM_MARGIN rather than on every insert.
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float, disk_path: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_sec = ttl_sec
+        # key -> (stored_at, latency_ms, value)
+        self._entries: "OrderedDict[str, Tuple[float, float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # Guards the connection, which the writer thread and lookups share
+        self._db_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._disk_rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.saved_latency_ms = 0.0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, stored_at REAL, latency_ms REAL, value TEXT)"
+            )
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="completion-cache")
+        except Exception as e:
+            logger.warning(f"Completion cache disk backend disabled: {str(e)}")
+            self._db = None
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return self.ttl_sec <= 0 or time.time() - stored_at < self.ttl_sec
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Returns:
+            A copy of the cached response with hit details in `usage`, or None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and not self._is_fresh(entry[0]):
+            del self._entries[key]
+            entry = None
+        if entry is None and self._db is not None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        _stored_at, latency_ms, value = entry
+        response = copy.deepcopy(value)
+        usage = dict(response.get("usage") or {})
+        saved_tokens = int(usage.get("total_tokens") or 0)
+        self.saved_tokens += saved_tokens
+        self.saved_latency_ms += latency_ms
+        usage.update({
+            "cache_hit": True,
+            "saved_tokens": saved_tokens,
+            "saved_latency_ms": round(latency_ms, 1),
+        })
+        response["usage"] = usage
+        return response
+
+    def set(self, key: str, value: Dict[str, Any], latency_ms: float) -> None:
+        """Store a response together with the latency it took to produce."""
+        entry = (time.time(), latency_ms, copy.deepcopy(value))
+        self._remember(key, entry)
+        if self._writer is not None:
+            self._writer.submit(self._persist, key, entry)
+
+    def _persist(self, key: str, entry: Tuple[float, float, Dict[str, Any]]) -> None:
+        """Write one entry to disk (runs on the writer thread)."""
+        stored_at, latency_ms, value = entry
+        try:
+            payload = json.dumps(value, ensure_ascii=False, default=str)
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions (key, stored_at, latency_ms, value) VALUES (?, ?, ?, ?)",
+                    (key, stored_at, latency_ms, payload),
+                )
+                # Upper bound: replaced keys are counted too, which only brings the next trim forward
+                self._disk_rows += 1
+                if self._disk_rows > self.max_entries * (1 + DISK_TRIM_MARGIN):
+                    # Bound the disk store the same way as memory: drop the oldest rows
+                    self._db.execute(
+                        "DELETE FROM completions WHERE key NOT IN "
+                        "(SELECT key FROM completions ORDER BY stored_at DESC LIMIT ?)",
+                        (self.max_entries,),
+                    )
+                    self._disk_rows = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+                self._db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to persist completion cache entry: {str(e)}")
+
+    def _remember(self, key: str, entry: Tuple[float, float, Dict[str, Any]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> Optional[Tuple[float, float, Dict[str, Any]]]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT stored_at, latency_ms, value FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+        except Exception as e:
+            logger.warning(f"Failed to read completion cache entry: {str(e)}")
+            return None
+        if row is None:
+            return None
+        stored_at, latency_ms, value = row
+        if not self._is_fresh(stored_at):
+            # Expired rows are removed by the next trim; deleting here would block the loop on a commit
+            return None
+        return stored_at, latency_ms, json.loads(value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and savings."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "saved_latency_ms": round(self.saved_latency_ms, 1),
+            "persistent": self._db is not None,
+        }
+
+
+# Process-wide cache shared by every LLMClient instance
+_shared_completion_cache: Optional[CompletionCache] = None
+
+
+def get_shared_completion_cache() -> Optional[CompletionCache]:
+    """Return the process-wide completion cache, or None when it is disabled."""
+    global _shared_completion_cache
+    if not config.COMPLETION_CACHE_ENABLED:
+        return None
+    if _shared_completion_cache is None:
+        _shared_completion_cache = CompletionCache(
+            max_entries=config.COMPLETION_CACHE_MAX_ENTRIES,
+            ttl_sec=config.COMPLETION_CACHE_TTL_SEC,
+            disk_path=config.COMPLETION_CACHE_PATH or None,
+        )
+    return _shared_completion_cache
+
+
+# Process-wide cache of query translations (separate bounds from the completion cache)
+_shared_translation_cache: Optional[CompletionCache] = None
+
+
+def get_shared_translation_cache() -> Optional[CompletionCache]:
+    """Return the process-wide query translation cache, or None when it is disabled."""
+    global _shared_translation_cache
+    if not config.TRANSLATION_CACHE_ENABLED:
+        return None
+    if _shared_translation_cache is None:
+        _shared_translation_cache = CompletionCache(
+            max_entries=config.TRANSLATION_CACHE_MAX_ENTRIES,
+            ttl_sec=config.TRANSLATION_CACHE_TTL_SEC,
+            disk_path=config.TRANSLATION_CACHE_PATH or None,
+        )
+    return _shared_translation_cache
@@ -4,25 +4,140 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
+    # Local upstream emulator (upstream_emulator.py). When set, OpenAI, LunarCrush and RSS
+    # endpoints default to it; explicit OPENAI_BASE_URL / LUNARCRUSH_API_BASE_URL / RSS_FEED_URLS win.
+    UPSTREAM_EMULATOR_URL: str = os.getenv("UPSTREAM_EMULATOR_URL", "").rstrip("/")
+
     # OpenAI Configuration
-    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY") or ("sk-emulator" if UPSTREAM_EMULATOR_URL else "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o")
+    # Optional override of the OpenAI API endpoint (empty uses the SDK default)
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL") or (f"{UPSTREAM_EMULATOR_URL}/v1" if UPSTREAM_EMULATOR_URL else "")
+
+    # Embedding backend: "openai" (API) or "local" (sentence-transformers, in process)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "openai")
+    # Texts per embedding call and size of the worker pool the calls run on
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "2"))
+
+    # OpenAI embeddings model; the context-length check tokenizes locally with tiktoken (needs its BPE files)
+    OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBEDDING_CHECK_CTX_LENGTH: bool = (
+        os.getenv("EMBEDDING_CHECK_CTX_LENGTH") or ("false" if UPSTREAM_EMULATOR_URL else "true")
+    ).lower() in ("1", "true", "yes")
+
+    # Content-addressed embedding cache: document vectors on disk per model, query vectors in an LRU
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings")
+    EMBEDDING_QUERY_CACHE_SIZE: int = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "2048"))
+
+    # Local sentence-transformers model (multilingual by default), device and optional int8 quantization
+    LOCAL_EMBEDDING_MODEL: str = os.getenv(
+        "LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    )
+    LOCAL_EMBEDDING_DEVICE: str = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+    LOCAL_EMBEDDING_INT8: bool = os.getenv("LOCAL_EMBEDDING_INT8", "false").lower() in ("1", "true", "yes")
+
+    # Whether the embedding model maps Russian and English into one space (empty = infer from the model name)
+    EMBEDDING_MULTILINGUAL: str = os.getenv("EMBEDDING_MULTILINGUAL", "")
+    # Translate Russian queries before retrieval: "auto" (only if the embedding model is not multilingual),
+    # "always" or "never"; a request's translate_queries=false always skips it
+    QUERY_TRANSLATION: str = os.getenv("QUERY_TRANSLATION", "auto").lower()
+
+    # Ingestion pipeline: chunks per embedding batch and batches embedded concurrently (also the
+    # depth of the queues between chunking, embedding and writing, which bounds memory)
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    INGEST_MAX_INFLIGHT_BATCHES: int = int(os.getenv("INGEST_MAX_INFLIGHT_BATCHES", "4"))
+
+    # Shared async HTTP pool for OpenAI calls (kept alive for the process lifetime)
+    OPENAI_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100"))
+    OPENAI_HTTP_MAX_KEEPALIVE: int = int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "20"))
+    OPENAI_HTTP_TIMEOUT_SEC: float = float(os.getenv("OPENAI_HTTP_TIMEOUT_SEC", "60.0"))
     
     # Response token cap to avoid large generations
     RESPONSE_MAX_TOKENS: int = int(os.getenv("RESPONSE_MAX_TOKENS", "600"))
 
-    # Soft prompt size limiter (approx chars; ~4 chars per token)
+    # Tiered model routing: each call purpose maps to a tier (or a model name) and a max_tokens cap
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+    MODEL_TIERS: dict = {
+        "flagship": OPENAI_MODEL,
+        "fast": OPENAI_FAST_MODEL,
+    }
+    LLM_ROUTES: dict = {
+        "chat": (
+            os.getenv("LLM_ROUTE_CHAT_TIER", "flagship"),
+            int(os.getenv("LLM_ROUTE_CHAT_MAX_TOKENS", str(RESPONSE_MAX_TOKENS))),
+        ),
+        "translation": (
+            os.getenv("LLM_ROUTE_TRANSLATION_TIER", "fast"),
+            int(os.getenv("LLM_ROUTE_TRANSLATION_MAX_TOKENS", "200")),
+        ),
+        "related_questions": (
+            os.getenv("LLM_ROUTE_RELATED_QUESTIONS_TIER", "fast"),
+            int(os.getenv("LLM_ROUTE_RELATED_QUESTIONS_MAX_TOKENS", "200")),
+        ),
+        "quick_actions": (
+            os.getenv("LLM_ROUTE_QUICK_ACTIONS_TIER", "fast"),
+            int(os.getenv("LLM_ROUTE_QUICK_ACTIONS_MAX_TOKENS", "200")),
+        ),
+    }
+
+    # Soft prompt size limiter (approx chars; ~4 chars per token).
+    # Deprecated: only used as the default for MAX_PROMPT_TOKENS.
     MAX_PROMPT_CHARS: int = int(os.getenv("MAX_PROMPT_CHARS", "28000"))
 
-    # RAG context size cap in characters
+    # Prompt budget in real tokenizer tokens (counted with tiktoken)
+    MAX_PROMPT_TOKENS: int = int(os.getenv("MAX_PROMPT_TOKENS", str(MAX_PROMPT_CHARS // 4)))
+
+    # Memoized (text, model) -> token count entries
+    TOKEN_COUNT_CACHE_SIZE: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "8192"))
+
+    # Retrieval: "vector", "lexical" (BM25) or "hybrid" (both, fused by reciprocal rank)
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+    # Candidates taken from each retriever before fusion, and the RRF rank constant
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    # In hybrid mode, queries of at most this many terms (e.g. a ticker) are answered by BM25 alone
+    # when it finds enough matches (0 disables the fast path)
+    LEXICAL_FAST_PATH_MAX_TERMS: int = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", "2"))
+    # Maximal marginal relevance: pick k of MMR_FETCH_K candidates; lambda 1.0 = relevance only, 0.0 = diversity only
+    MMR_ENABLED: bool = os.getenv("MMR_ENABLED", "true").lower() in ("1", "true", "yes")
+    MMR_FETCH_K: int = int(os.getenv("MMR_FETCH_K", "20"))
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))
+    # Merge retrieved chunks that are consecutive splits of the same page into one passage
+    MERGE_ADJACENT_CHUNKS: bool = os.getenv("MERGE_ADJACENT_CHUNKS", "true").lower() in ("1", "true", "yes")
+    # Search results cached per (normalized query, k, filter) until this process writes or the
+    # collection size changes; the TTL (0 = none) bounds staleness from other processes' in-place updates
+    RETRIEVAL_CACHE_ENABLED: bool = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))
+    RETRIEVAL_CACHE_TTL_SEC: float = float(os.getenv("RETRIEVAL_CACHE_TTL_SEC", "300"))
+
+    # RAG context size cap in characters.
+    # Deprecated: only used as the default for RAG_CONTEXT_MAX_TOKENS.
     RAG_CONTEXT_MAX_CHARS: int = int(os.getenv("RAG_CONTEXT_MAX_CHARS", "6000"))
+    # RAG context budget in tokenizer tokens; whole chunks or sentences are packed in relevance order
+    RAG_CONTEXT_MAX_TOKENS: int = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", str(RAG_CONTEXT_MAX_CHARS // 4)))
+    # Word-set (Jaccard) similarity at which a retrieved chunk is dropped as a near-duplicate
+    RAG_CONTEXT_DUPLICATE_THRESHOLD: float = float(os.getenv("RAG_CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+    # Optional extractive compression before packing: each retrieved chunk keeps its sentences most similar
+    # to the query (KEEP_RATIO share, at least MIN_SENTENCES); sentences are embedded with the RAG backend
+    CONTEXT_COMPRESSION_ENABLED: bool = os.getenv("CONTEXT_COMPRESSION_ENABLED", "false").lower() in ("1", "true", "yes")
+    CONTEXT_COMPRESSION_KEEP_RATIO: float = float(os.getenv("CONTEXT_COMPRESSION_KEEP_RATIO", "0.4"))
+    CONTEXT_COMPRESSION_MIN_SENTENCES: int = int(os.getenv("CONTEXT_COMPRESSION_MIN_SENTENCES", "2"))
+    # Sentence vectors kept in memory for compression (never written to the embedding disk store)
+    CONTEXT_COMPRESSION_CACHE_SIZE: int = int(os.getenv("CONTEXT_COMPRESSION_CACHE_SIZE", "8192"))
 
     # Conversation history cap (number of messages, excluding injected system)
     MAX_HISTORY_MESSAGES: int = int(os.getenv("MAX_HISTORY_MESSAGES", "16"))
 
-    # Retry policy for rate limits
+    # Retry policy (decorrelated jitter between base and max delay; Retry-After wins for 429s)
     OPENAI_RETRY_MAX_ATTEMPTS: int = int(os.getenv("OPENAI_RETRY_MAX_ATTEMPTS", "3"))
     OPENAI_RETRY_BASE_DELAY_SEC: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY_SEC", "2.0"))
+    OPENAI_RETRY_MAX_DELAY_SEC: float = float(os.getenv("OPENAI_RETRY_MAX_DELAY_SEC", "20.0"))
+
+    # Circuit breaker: open after N consecutive upstream failures, probe again after the reset timeout
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RESET_SEC: float = float(os.getenv("CIRCUIT_BREAKER_RESET_SEC", "30.0"))
 
     # Requests-per-minute throttling (soft client-side limiter)
     OPENAI_RPM_LIMIT: int = int(os.getenv("OPENAI_RPM_LIMIT", "0"))  # 0 disables
@@ -32,16 +147,74 @@ class Config:
     OPENAI_TPM_LIMIT: int = int(os.getenv("OPENAI_TPM_LIMIT", "0"))  # 0 disables
     TPM_WINDOW_SEC: int = int(os.getenv("TPM_WINDOW_SEC", "60"))
     
+    # Deterministic completion cache (opt-in)
+    COMPLETION_CACHE_ENABLED: bool = os.getenv("COMPLETION_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    COMPLETION_CACHE_MAX_ENTRIES: int = int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", "1024"))
+    COMPLETION_CACHE_TTL_SEC: float = float(os.getenv("COMPLETION_CACHE_TTL_SEC", "3600"))
+    # Only calls at or below this temperature are cached
+    COMPLETION_CACHE_MAX_TEMPERATURE: float = float(os.getenv("COMPLETION_CACHE_MAX_TEMPERATURE", "0.3"))
+    # Optional SQLite file so cached completions survive restarts (empty = memory only)
+    COMPLETION_CACHE_PATH: str = os.getenv("COMPLETION_CACHE_PATH", "")
+
+    # Query translation cache: keyed on the normalized query, bounded by entries and age, persisted to SQLite
+    TRANSLATION_CACHE_ENABLED: bool = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    TRANSLATION_CACHE_MAX_ENTRIES: int = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "4096"))
+    TRANSLATION_CACHE_TTL_SEC: float = float(os.getenv("TRANSLATION_CACHE_TTL_SEC", str(30 * 24 * 3600)))
+    TRANSLATION_CACHE_PATH: str = os.getenv("TRANSLATION_CACHE_PATH", "./cache/translations.sqlite3")
+
+    # Semantic answer cache: reuse the answer of a near-duplicate question (cosine >= threshold).
+    # Opt-in; only the first question of a conversation is looked up and stored.
+    # Answers that used tools (live data) live SEMANTIC_CACHE_TOOL_TTL_SEC; 0 never caches them
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_TTL_SEC: float = float(os.getenv("SEMANTIC_CACHE_TTL_SEC", "86400"))
+    SEMANTIC_CACHE_TOOL_TTL_SEC: float = float(os.getenv("SEMANTIC_CACHE_TOOL_TTL_SEC", "0"))
+
+    # Collapse concurrent identical completion requests into one upstream call
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Tool calling loop: max model round trips with tools, and per-step deadline
+    TOOL_MAX_STEPS: int = int(os.getenv("TOOL_MAX_STEPS", "3"))
+    TOOL_STEP_TIMEOUT_SEC: float = float(os.getenv("TOOL_STEP_TIMEOUT_SEC", "20"))
+    # Each tool result is cut to this many tokens before it enters the prompt
+    TOOL_RESULT_MAX_TOKENS: int = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "2000"))
+
     # MCP Server Configuration
     MCP_SERVER_HOST: str = os.getenv("MCP_SERVER_HOST", "localhost")
     MCP_SERVER_PORT: int = int(os.getenv("MCP_SERVER_PORT", "8000"))
     
     # External API Configuration
-    LUNARCRUSH_API_BASE_URL: str = os.getenv("LUNARCRUSH_API_BASE_URL", "")
-    LUNARCRUSH_API_KEY: str = os.getenv("LUNARCRUSH_API_KEY", "")
+    LUNARCRUSH_API_BASE_URL: str = os.getenv("LUNARCRUSH_API_BASE_URL") or (
+        f"{UPSTREAM_EMULATOR_URL}/lunarcrush" if UPSTREAM_EMULATOR_URL else ""
+    )
+    LUNARCRUSH_API_KEY: str = os.getenv("LUNARCRUSH_API_KEY") or ("lc-emulator" if UPSTREAM_EMULATOR_URL else "")
+
+    # News feeds used for quick actions (comma-separated RSS/Atom URLs)
+    RSS_FEED_URLS: list = [
+        url.strip()
+        for url in (
+            os.getenv("RSS_FEED_URLS")
+            or (
+                f"{UPSTREAM_EMULATOR_URL}/rss/coindesk,{UPSTREAM_EMULATOR_URL}/rss/cointelegraph"
+                if UPSTREAM_EMULATOR_URL
+                else "https://www.coindesk.com/arc/outboundfeeds/rss/,https://cointelegraph.com/rss"
+            )
+        ).split(",")
+        if url.strip()
+    ]
     
     # Vector Database Configuration
     CHROMA_DB_PATH: str = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+    # Threads dedicated to (blocking) Chroma calls, so searches never run on the event loop
+    CHROMA_EXECUTOR_WORKERS: int = int(os.getenv("CHROMA_EXECUTOR_WORKERS", "4"))
+    # Optional Chroma server (`chroma run --path ...`); when set, it replaces the embedded PersistentClient
+    CHROMA_SERVER_HOST: str = os.getenv("CHROMA_SERVER_HOST", "")
+    CHROMA_SERVER_PORT: int = int(os.getenv("CHROMA_SERVER_PORT", "8000"))
+
+    # Event-loop lag monitor: sampling interval and the lag that is logged as a warning
+    LOOP_LAG_INTERVAL_SEC: float = float(os.getenv("LOOP_LAG_INTERVAL_SEC", "0.1"))
+    LOOP_LAG_WARN_SEC: float = float(os.getenv("LOOP_LAG_WARN_SEC", "0.25"))
     
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
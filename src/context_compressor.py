@@ -0,0 +1,109 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.context_packer import split_sentences
+
+
+@dataclass
+class CompressionResult:
+    documents: List[Document]
+    original_chars: int
+    compressed_chars: int
+    sentences: int
+    kept_sentences: int
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size over original size (1.0 = nothing removed)."""
+        return self.compressed_chars / self.original_chars if self.original_chars else 1.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "original_chars": self.original_chars,
+            "compressed_chars": self.compressed_chars,
+            "sentences": self.sentences,
+            "kept_sentences": self.kept_sentences,
+            "ratio": round(self.ratio, 3),
+        }
+
+
+def select_sentences(scores: np.ndarray, keep_ratio: float, min_sentences: int) -> List[int]:
+    """Indices of the best-scoring sentences, returned in their original order."""
+    n = scores.shape[0]
+    keep = min(n, max(min_sentences, math.ceil(n * keep_ratio)))
+    if keep >= n:
+        return list(range(n))
+    best = np.argpartition(-scores, keep - 1)[:keep]
+    return sorted(int(i) for i in best)
+
+
+def compress_documents(
+    documents: List[Document],
+    query_vector: List[float],
+    sentence_vectors: List[List[float]],
+    keep_ratio: float,
+    min_sentences: int
+) -> CompressionResult:
+    """
+    Extractive compression: keep the sentences of each chunk closest to the query.
+
+    `sentence_vectors` holds one embedding per sentence of `documents`, in
+    the order produced by `split_sentences` over each document in turn.
+    Cosine similarity to the query is one matrix-vector product over all
+    sentences; each chunk then keeps its top `keep_ratio` share (at least
+    `min_sentences`) in reading order. Chunks keep their rank, id and
+    metadata, so packing and source reporting work unchanged.
+
+    Args:
+        documents: Retrieved chunks, best first
+        query_vector: Embedding of the search query
+        sentence_vectors: Embeddings of every sentence, see above
+        keep_ratio: Share of each chunk's sentences to keep
+        min_sentences: Lower bound of sentences kept per chunk
+
+    Returns:
+        Compressed documents and size statistics
+    """
+    split = [split_sentences(document.page_content) for document in documents]
+    original_chars = sum(len(document.page_content) for document in documents)
+    total = sum(len(sentences) for sentences in split)
+    if not total:
+        return CompressionResult(documents, original_chars, original_chars, 0, 0)
+
+    matrix = np.asarray(sentence_vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    norms[norms == 0] = 1.0
+    scores = (matrix @ query) / norms
+
+    compressed: List[Document] = []
+    kept_total = 0
+    offset = 0
+    for document, sentences in zip(documents, split):
+        chunk_scores = scores[offset:offset + len(sentences)]
+        offset += len(sentences)
+        if not sentences:
+            compressed.append(document)
+            continue
+        kept = select_sentences(chunk_scores, keep_ratio, min_sentences)
+        kept_total += len(kept)
+        if len(kept) == len(sentences):
+            compressed.append(document)
+            continue
+        compressed.append(Document(
+            page_content=" ".join(sentences[i] for i in kept),
+            metadata=dict(document.metadata or {}),
+            id=document.id
+        ))
+
+    compressed_chars = sum(len(document.page_content) for document in compressed)
+    return CompressionResult(compressed, original_chars, compressed_chars, total, kept_total)
+
+
+def sentences_of(documents: List[Document]) -> List[str]:
+    """All sentences of `documents` in the order `compress_documents` expects their vectors."""
+    return [sentence for document in documents for sentence in split_sentences(document.page_content)]
@@ -0,0 +1,141 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+from src.token_counter import count_text_tokens
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n{2,}")
+_WHITESPACE = re.compile(r"\s+")
+
+# Metadata copied into the per-chunk source records
+SOURCE_FIELDS = ("source", "page", "chunk", "split", "merged_splits")
+
+
+@dataclass
+class PackedContext:
+    text: str = ""
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    budget_tokens: int = 0
+    candidates: int = 0
+    dropped_duplicates: int = 0
+    dropped_over_budget: int = 0
+    # Set when extractive compression ran before packing (see context_compressor)
+    compression: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens": self.tokens,
+            "budget_tokens": self.budget_tokens,
+            "candidates": self.candidates,
+            "included": len(self.sources),
+            "dropped_duplicates": self.dropped_duplicates,
+            "dropped_over_budget": self.dropped_over_budget,
+            "compression": self.compression,
+            "sources": self.sources,
+        }
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text at sentence punctuation and paragraph breaks, collapsing whitespace."""
+    sentences = (_WHITESPACE.sub(" ", part).strip() for part in _SENTENCE_END.split(text))
+    return [sentence for sentence in sentences if sentence]
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _header(position: int, metadata: Dict[str, Any]) -> str:
+    label = metadata.get("source")
+    if label and metadata.get("page") is not None:
+        label = f"{label}, page {metadata['page']}"
+    return f"Document {position} ({label}):" if label else f"Document {position}:"
+
+
+def pack_context(
+    documents: List[Document],
+    budget_tokens: int,
+    model: str,
+    duplicate_threshold: float = 0.8
+) -> PackedContext:
+    """
+    Fit retrieved chunks into a token budget without cutting text mid-sentence.
+
+    Chunks are taken in relevance order. A chunk whose word set overlaps an
+    already packed chunk by at least `duplicate_threshold` (Jaccard) is
+    dropped, as are sentences already present in the packed text (e.g. the
+    splitter overlap between neighbouring chunks). A chunk that fits is
+    packed whole; otherwise as many of its whole sentences as fit, in their
+    original order. Later chunks may still fill the remaining budget.
+
+    Args:
+        documents: Retrieved chunks, best first
+        budget_tokens: Maximum tokens of the packed text
+        model: Model name used to pick the tokenizer
+        duplicate_threshold: Word-set similarity at which a chunk counts as a duplicate
+
+    Returns:
+        The packed text and a record (source/page metadata, tokens) per included chunk
+    """
+    packed = PackedContext(budget_tokens=budget_tokens, candidates=len(documents))
+    parts: List[str] = []
+    packed_words: List[Set[str]] = []
+    packed_normalized = ""
+    separator_tokens = count_text_tokens("\n\n", model)
+
+    for document in documents:
+        metadata = document.metadata or {}
+        words = set(_WORD.findall(document.page_content.lower()))
+        if any(_jaccard(words, other) >= duplicate_threshold for other in packed_words):
+            packed.dropped_duplicates += 1
+            continue
+
+        sentences = split_sentences(document.page_content)
+        novel = [sentence for sentence in sentences if _normalize(sentence) not in packed_normalized]
+        if not novel:
+            packed.dropped_duplicates += 1
+            continue
+
+        header = _header(len(parts) + 1, metadata)
+        remaining = budget_tokens - packed.tokens - count_text_tokens(header + "\n", model)
+        if parts:
+            remaining -= separator_tokens
+        body = document.page_content.strip() if len(novel) == len(sentences) else " ".join(novel)
+        cost = count_text_tokens(body, model)
+        partial = len(novel) < len(sentences)
+        if cost > remaining:
+            # Whole sentences only, in reading order; skip any that alone would overflow
+            kept = []
+            for sentence in novel:
+                sentence_cost = count_text_tokens(sentence, model) + 1
+                if sentence_cost <= remaining:
+                    kept.append(sentence)
+                    remaining -= sentence_cost
+            if not kept:
+                packed.dropped_over_budget += 1
+                continue
+            body = " ".join(kept)
+            cost = count_text_tokens(body, model)
+            partial = True
+
+        part = f"{header}\n{body}"
+        packed.tokens += count_text_tokens(part, model) + (separator_tokens if parts else 0)
+        parts.append(part)
+        packed_words.append(words)
+        packed_normalized += "\n" + _normalize(body)
+        record = {key: metadata[key] for key in SOURCE_FIELDS if key in metadata}
+        record.update({"document": len(parts), "id": document.id, "tokens": cost, "partial": partial})
+        packed.sources.append(record)
+
+    packed.text = "\n\n".join(parts)
+    return packed
@@ -0,0 +1,229 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; run a single writer per store there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# sha256 digest size; one index record per stored vector
+_DIGEST_SIZE = 32
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivially different copies share a key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(model_id: str, text: str) -> bytes:
+    """Content address of an embedding: sha256 over the model and the normalized text."""
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class _VectorStore:
+    """
+    Append-only on-disk vectors of one model.
+
+    `vectors.f32` holds float32 rows read through a memory map; `index.bin`
+    holds the sha256 key of each row in the same order. Rows are written
+    before their index record, so a torn write leaves at most an orphan row.
+    Several processes (e.g. the API and upload_pdfs.py) may share a store:
+    appends hold an exclusive lock on `lock` and first pick up the rows
+    other writers added, so the files only ever grow from the true end.
+    """
+
+    def __init__(self, directory: str, model_id: str):
+        self.directory = directory
+        self.model_id = model_id
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "index.bin")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock_path = os.path.join(directory, "lock")
+        self.dimension: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        # Rows on disk, which can exceed len(rows) when writers raced on the same key
+        self.count = 0
+        self._map: Optional[np.memmap] = None
+        self._thread_lock = threading.Lock()
+        self._sync()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # Threads of this process (executor workers), then other processes
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self) -> None:
+        """Index rows appended since the last sync, by this or another process."""
+        if self.dimension is None and os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dimension = int(json.load(f)["dimension"])
+        if self.dimension is None or not os.path.exists(self._index_path):
+            return
+        row_bytes = self.dimension * 4
+        stored_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        count = min(os.path.getsize(self._index_path) // _DIGEST_SIZE, stored_rows)
+        if count <= self.count:
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self.count * _DIGEST_SIZE)
+            index = f.read((count - self.count) * _DIGEST_SIZE)
+        for offset in range(count - self.count):
+            self.rows.setdefault(index[offset * _DIGEST_SIZE:(offset + 1) * _DIGEST_SIZE], self.count + offset)
+        self.count = count
+
+    def _remap(self) -> None:
+        self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dimension))
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if self._map is None or row >= self._map.shape[0]:
+            self._remap()
+        return self._map[row].tolist()
+
+    def put_many(self, keys: List[bytes], vectors: List[List[float]]) -> None:
+        with self._locked():
+            self._sync()
+            pending: Dict[bytes, List[float]] = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self.rows:
+                    pending.setdefault(key, vector)
+            new = list(pending.items())
+            if not new:
+                return
+            if self.dimension is None:
+                self.dimension = len(new[0][1])
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model_id, "dimension": self.dimension, "dtype": "float32"}, f)
+            array = np.asarray([vector for _, vector in new], dtype=np.float32)
+            if array.ndim != 2 or array.shape[1] != self.dimension:
+                logger.warning(f"Not caching embeddings of unexpected shape {array.shape} for {self.model_id}")
+                return
+            # Drop orphan rows from an interrupted write so rows and index stay aligned
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(self.count * self.dimension * 4)
+                f.write(array.tobytes())
+            with open(self._index_path, "ab") as f:
+                f.truncate(self.count * _DIGEST_SIZE)
+                f.write(b"".join(key for key, _ in new))
+            for offset, (key, _) in enumerate(new):
+                self.rows[key] = self.count + offset
+            self.count += len(new)
+
+    @property
+    def bytes_stored(self) -> int:
+        if self.dimension is None:
+            return 0
+        return self.count * (self.dimension * 4 + _DIGEST_SIZE)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache in front of an embedding backend.
+
+    Document vectors are persisted per model under `disk_path` (memory-mapped
+    float32 rows plus a key index). Query vectors are kept in an in-memory
+    LRU only, so arbitrary questions do not grow the disk store; a query that
+    matches a stored document still hits the disk store.
+    """
+
+    def __init__(self, model_id: str, disk_path: Optional[str], query_cache_size: int):
+        self.model_id = model_id
+        self.query_cache_size = max(0, query_cache_size)
+        self._queries: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._store: Optional[_VectorStore] = None
+        if disk_path:
+            safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id)
+            try:
+                self._store = _VectorStore(os.path.join(disk_path, safe_name), model_id)
+            except Exception as e:
+                logger.warning(f"Embedding cache disk store disabled: {str(e)}")
+        self.document_hits = 0
+        self.document_misses = 0
+        self.query_hits = 0
+        self.query_misses = 0
+
+    def get_documents(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector of each text, or None where it is missing."""
+        found: List[Optional[List[float]]] = []
+        for text in texts:
+            vector = self._store.get(embedding_key(self.model_id, text)) if self._store else None
+            found.append(vector)
+        hits = sum(1 for vector in found if vector is not None)
+        self.document_hits += hits
+        self.document_misses += len(texts) - hits
+        return found
+
+    def put_documents(self, texts: List[str], vectors: List[List[float]]) -> None:
+        if self._store is None:
+            return
+        try:
+            self._store.put_many([embedding_key(self.model_id, text) for text in texts], vectors)
+        except Exception as e:
+            logger.warning(f"Failed to persist embeddings: {str(e)}")
+
+    def get_query(self, text: str) -> Optional[List[float]]:
+        key = embedding_key(self.model_id, text)
+        vector = self._queries.get(key)
+        if vector is not None:
+            self._queries.move_to_end(key)
+        elif self._store is not None:
+            vector = self._store.get(key)
+            if vector is not None:
+                self._remember_query(key, vector)
+        if vector is None:
+            self.query_misses += 1
+        else:
+            self.query_hits += 1
+        return vector
+
+    def put_query(self, text: str, vector: List[float]) -> None:
+        self._remember_query(embedding_key(self.model_id, text), vector)
+
+    def _remember_query(self, key: bytes, vector: List[float]) -> None:
+        if self.query_cache_size == 0:
+            return
+        self._queries[key] = vector
+        self._queries.move_to_end(key)
+        while len(self._queries) > self.query_cache_size:
+            self._queries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.document_hits + self.query_hits
+        lookups = hits + self.document_misses + self.query_misses
+        return {
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "document_hits": self.document_hits,
+            "document_misses": self.document_misses,
+            "query_hits": self.query_hits,
+            "query_misses": self.query_misses,
+            "stored_vectors": self._store.count if self._store else 0,
+            "bytes_stored": self._store.bytes_stored if self._store else 0,
+            "query_lru_entries": len(self._queries),
+            "persistent": self._store is not None,
+        }
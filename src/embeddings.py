@@ -0,0 +1,237 @@
+import abc
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from src import metrics
+from src.config import config
+from src.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Known output sizes of OpenAI embedding models
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+# OpenAI models that place Russian and English text in a shared space well enough to skip query translation
+OPENAI_MULTILINGUAL_MODELS = {"text-embedding-3-small", "text-embedding-3-large"}
+# Name fragments of multilingual sentence-transformers models
+LOCAL_MULTILINGUAL_MARKERS = ("multilingual", "labse", "bge-m3", "-e5-", "/e5-")
+
+
+class EmbeddingBackend(Embeddings, abc.ABC):
+    """
+    Base class of embedding backends used by RAGSystem.
+
+    Subclasses implement `_embed_batch`. Texts are embedded in batches of
+    `batch_size`; the async methods run the batches on a bounded thread pool
+    so neither model inference nor blocking HTTP calls stall the event loop.
+    `model_id` identifies the vector space and is recorded on the collection.
+    `multilingual` marks models whose Russian and English vectors are
+    comparable, so Russian queries can be embedded without translation.
+    When `cache` is set, the async methods only embed texts it does not hold.
+    """
+
+    model_id: str = ""
+    multilingual: bool = False
+
+    def __init__(self, batch_size: int, max_workers: int):
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+        self.dimension: Optional[int] = None
+        self.cache: Optional[EmbeddingCache] = None
+        self.texts_embedded = 0
+        self.batches = 0
+        self.total_sec = 0.0
+
+    @abc.abstractmethod
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch of texts synchronously (runs on the worker pool)."""
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        return [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for batch in self._batches(texts):
+            vectors.extend(self._embed_batch(batch))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+    async def aembed_documents(self, texts: List[str], use_cache: bool = True) -> List[List[float]]:
+        """
+        Embed texts, serving cached vectors and embedding only the rest.
+        
+        With `use_cache=False` every text is embedded and nothing is stored, for
+        callers that keep query-time text out of the persistent document store.
+        """
+        if self.cache is None or not use_cache:
+            return await self._aembed_uncached(texts)
+        vectors = self.cache.get_documents(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        metrics.CACHE_REQUESTS.labels("embedding", "hit").inc(len(texts) - len(missing))
+        metrics.CACHE_REQUESTS.labels("embedding", "miss").inc(len(missing))
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embedded = await self._aembed_uncached(missing_texts)
+            # Appending to the disk store takes a file lock; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.cache.put_documents, missing_texts, embedded
+            )
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts on the worker pool; batches run concurrently up to the pool size."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        batches = self._batches(texts)
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, self._embed_batch, batch) for batch in batches
+        ])
+        self._record(len(texts), len(batches), time.perf_counter() - started)
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.cache is not None:
+            vector = self.cache.get_query(text)
+            metrics.CACHE_REQUESTS.labels("embedding", "hit" if vector is not None else "miss").inc()
+            if vector is not None:
+                return vector
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        vectors = await loop.run_in_executor(self._executor, self._embed_batch, [text])
+        self._record(1, 1, time.perf_counter() - started)
+        if self.cache is not None:
+            # Query vectors only enter the in-memory LRU, never the disk store
+            self.cache.put_query(text, vectors[0])
+        return vectors[0]
+
+    def _record(self, texts: int, batches: int, elapsed: float) -> None:
+        self.texts_embedded += texts
+        self.batches += batches
+        self.total_sec += elapsed
+        metrics.STAGE_LATENCY.labels("embedding").observe(elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_id,
+            "dimension": self.dimension,
+            "multilingual": self.multilingual,
+            "batch_size": self.batch_size,
+            "workers": self.max_workers,
+            "texts_embedded": self.texts_embedded,
+            "batches": self.batches,
+            "total_sec": round(self.total_sec, 3),
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the OpenAI API (or a compatible endpoint such as the upstream emulator)."""
+
+    def __init__(self, model: str, batch_size: int, max_workers: int):
+        super().__init__(batch_size, max_workers)
+        self.client = OpenAIEmbeddings(
+            model=model,
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL or None,
+            check_embedding_ctx_length=config.EMBEDDING_CHECK_CTX_LENGTH,
+            chunk_size=self.batch_size,
+        )
+        self.model_id = f"openai:{model}"
+        self.dimension = OPENAI_EMBEDDING_DIMENSIONS.get(model)
+        self.multilingual = model in OPENAI_MULTILINGUAL_MODELS
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    In-process sentence-transformers model.
+
+    With `quantize_int8` the model's Linear layers are dynamically quantized
+    to int8 (CPU only), which is faster at a small accuracy cost. The vector
+    space is unchanged, so the collection's recorded model stays the same.
+    """
+
+    def __init__(self, model_name: str, device: str, quantize_int8: bool, batch_size: int, max_workers: int):
+        super().__init__(batch_size, max_workers)
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=local requires sentence-transformers: pip install sentence-transformers"
+            ) from e
+
+        self.model = SentenceTransformer(model_name, device=device)
+        if quantize_int8:
+            import torch
+
+            if device != "cpu":
+                logger.warning(f"int8 quantization is CPU only; ignoring it on device {device}")
+            else:
+                self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model_id = f"local:{model_name}"
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.multilingual = any(marker in model_name.lower() for marker in LOCAL_MULTILINGUAL_MARKERS)
+        logger.info(f"Loaded local embedding model {model_name} ({self.dimension} dims, int8={quantize_int8})")
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+
+def create_embedding_backend() -> EmbeddingBackend:
+    """Build the embedding backend selected by config.EMBEDDING_BACKEND, with its cache if enabled."""
+    backend = _create_backend(config.EMBEDDING_BACKEND.lower())
+    if config.EMBEDDING_MULTILINGUAL:
+        backend.multilingual = config.EMBEDDING_MULTILINGUAL.lower() in ("1", "true", "yes")
+    if config.EMBEDDING_CACHE_ENABLED:
+        backend.cache = EmbeddingCache(
+            model_id=backend.model_id,
+            disk_path=config.EMBEDDING_CACHE_PATH or None,
+            query_cache_size=config.EMBEDDING_QUERY_CACHE_SIZE,
+        )
+    return backend
+
+
+def _create_backend(backend: str) -> EmbeddingBackend:
+    if backend == "openai":
+        return OpenAIEmbeddingBackend(
+            model=config.OPENAI_EMBEDDING_MODEL,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            max_workers=config.EMBEDDING_WORKERS,
+        )
+    if backend == "local":
+        return LocalEmbeddingBackend(
+            model_name=config.LOCAL_EMBEDDING_MODEL,
+            device=config.LOCAL_EMBEDDING_DEVICE,
+            quantize_int8=config.LOCAL_EMBEDDING_INT8,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            max_workers=config.EMBEDDING_WORKERS,
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {config.EMBEDDING_BACKEND!r} (expected 'openai' or 'local')")
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.embeddings import EmbeddingBackend
+
+logger = logging.getLogger(__name__)
+
+# async (texts, vectors, metadatas) -> None; responsible for keeping blocking I/O off the loop
+WriteFn = Callable[[List[str], List[List[float]], List[Dict[str, Any]]], Awaitable[None]]
+
+
+@dataclass
+class IngestionStats:
+    texts: int = 0
+    chunks: int = 0
+    chunks_written: int = 0
+    chunks_failed: int = 0
+    batches: int = 0
+    embed_sec: float = 0.0
+    max_embed_sec: float = 0.0
+    write_sec: float = 0.0
+    elapsed_sec: float = 0.0
+    max_batches_in_flight: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "texts": self.texts,
+            "chunks": self.chunks,
+            "chunks_written": self.chunks_written,
+            "chunks_failed": self.chunks_failed,
+            "batches": self.batches,
+            "chunks_per_sec": round(self.chunks_written / self.elapsed_sec, 1) if self.elapsed_sec else 0.0,
+            "avg_embed_latency_ms": round(self.embed_sec / self.batches * 1000, 1) if self.batches else 0.0,
+            "max_embed_latency_ms": round(self.max_embed_sec * 1000, 1),
+            "write_sec": round(self.write_sec, 3),
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "max_batches_in_flight": self.max_batches_in_flight,
+        }
+
+
+class IngestionPipeline:
+    """
+    Chunk, embed and write texts as three overlapping stages.
+
+    The chunker splits texts off the event loop and fills batches; up to
+    `max_inflight_batches` batches are embedded concurrently; a single writer
+    stores finished batches. Bounded queues between the stages give
+    backpressure, so a slow embedder or store pauses chunking instead of
+    buffering the whole corpus in memory. A failed batch is logged and
+    counted, and the remaining batches still go through.
+    """
+
+    def __init__(
+        self,
+        splitter,
+        embeddings: EmbeddingBackend,
+        write_fn: WriteFn,
+        batch_size: int,
+        max_inflight_batches: int
+    ):
+        self.splitter = splitter
+        self.embeddings = embeddings
+        self.write_fn = write_fn
+        self.batch_size = max(1, batch_size)
+        self.max_inflight_batches = max(1, max_inflight_batches)
+
+    async def run(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> IngestionStats:
+        """
+        Ingest texts; every chunk inherits the metadata of the text it came from,
+        plus its `split` index within that text.
+
+        Args:
+            texts: Raw texts to split and store
+            metadatas: Optional metadata per text (aligned with `texts`)
+
+        Returns:
+            Throughput and latency statistics of the run
+        """
+        stats = IngestionStats(texts=len(texts))
+        started = time.perf_counter()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_inflight_batches)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_inflight_batches)
+        in_flight = 0
+
+        async def chunker() -> None:
+            batch_texts: List[str] = []
+            batch_metas: List[Dict[str, Any]] = []
+            for i, text in enumerate(texts):
+                metadata = (metadatas[i] if metadatas and i < len(metadatas) else None) or {}
+                chunks = await asyncio.to_thread(self.splitter.split_text, text)
+                for split, chunk in enumerate(chunks):
+                    batch_texts.append(chunk)
+                    # The split index lets retrieval recognise and merge neighbouring chunks
+                    batch_metas.append({**metadata, "split": split} if metadata else {})
+                    if len(batch_texts) >= self.batch_size:
+                        await embed_queue.put((batch_texts, batch_metas))
+                        batch_texts, batch_metas = [], []
+                stats.chunks += len(chunks)
+            if batch_texts:
+                await embed_queue.put((batch_texts, batch_metas))
+
+        async def embedder() -> None:
+            nonlocal in_flight
+            while True:
+                item = await embed_queue.get()
+                if item is None:
+                    return
+                batch_texts, batch_metas = item
+                in_flight += 1
+                stats.max_batches_in_flight = max(stats.max_batches_in_flight, in_flight)
+                batch_started = time.perf_counter()
+                try:
+                    vectors = await self.embeddings.aembed_documents(batch_texts)
+                except Exception as e:
+                    logger.error(f"Embedding batch of {len(batch_texts)} chunks failed: {str(e)}")
+                    stats.chunks_failed += len(batch_texts)
+                    continue
+                finally:
+                    in_flight -= 1
+                elapsed = time.perf_counter() - batch_started
+                stats.batches += 1
+                stats.embed_sec += elapsed
+                stats.max_embed_sec = max(stats.max_embed_sec, elapsed)
+                await write_queue.put((batch_texts, vectors, batch_metas))
+
+        async def writer() -> None:
+            while True:
+                item = await write_queue.get()
+                if item is None:
+                    return
+                batch_texts, vectors, batch_metas = item
+                write_started = time.perf_counter()
+                try:
+                    await self.write_fn(batch_texts, vectors, batch_metas)
+                    stats.chunks_written += len(batch_texts)
+                except Exception as e:
+                    logger.error(f"Writing batch of {len(batch_texts)} chunks failed: {str(e)}")
+                    stats.chunks_failed += len(batch_texts)
+                stats.write_sec += time.perf_counter() - write_started
+
+        embedders = [asyncio.create_task(embedder()) for _ in range(self.max_inflight_batches)]
+        writer_task = asyncio.create_task(writer())
+        try:
+            await chunker()
+            for _ in embedders:
+                await embed_queue.put(None)
+            await asyncio.gather(*embedders)
+            await write_queue.put(None)
+            await writer_task
+        except BaseException:
+            for task in embedders + [writer_task]:
+                task.cancel()
+            raise
+
+        stats.elapsed_sec = time.perf_counter() - started
+        logger.info(
+            f"Ingested {stats.chunks_written}/{stats.chunks} chunks from {stats.texts} texts "
+            f"in {stats.elapsed_sec:.2f}s ({stats.as_dict()['chunks_per_sec']} chunks/s)"
+        )
+        return stats
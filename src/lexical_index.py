@@ -0,0 +1,207 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[0-9a-zа-я]+")
+_CYRILLIC = re.compile(r"[а-я]")
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in into is it its me my of on or
+so that the their then there these this to was we were what when where which who why will with you your
+а без бы был была были было быть в вам вас весь во вот все всего всех вы где да для до его ее если есть
+еще же за и из или им их к как ко когда кто ли либо меня мне мы на над не него нет ни но ну о об однако
+он она они оно от по под при с со так также такой там те тем то того тоже той только том ты у уже хотя
+чего чей чем что чтобы чье чья эта эти это я такое какой какая какие почему зачем сколько
+""".split())
+
+# Light suffix stripping so inflected forms share a term; longest suffix first
+_RU_SUFFIXES = tuple(sorted("""
+иями ями ами ого его ому ему ыми ими ться тся ешь ете ует уют ает ают яет яют ать ять ить еть
+ая яя ое ее ые ие ый ий ой ом ем ам ям ах ях ов ев ей ию ия ью ья ет ют ит ят ал ил ла ли ло
+ы и а я о е у ю ь
+""".split(), key=len, reverse=True))
+_EN_PLURALS = (("ies", "y"), ("s", ""))
+_EN_VERB_ENDINGS = ("ing", "ed")
+
+
+def _stem(token: str) -> str:
+    if len(token) <= 4 or token.isdigit():
+        return token
+    if _CYRILLIC.search(token):
+        for suffix in _RU_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[:-len(suffix)]
+        return token
+    # "halvings" -> "halving" -> "halv"; "currencies" -> "currency"
+    if not token.endswith(("ss", "us", "is")):
+        for suffix, replacement in _EN_PLURALS:
+            if token.endswith(suffix):
+                token = token[:-len(suffix)] + replacement
+                break
+    for suffix in _EN_VERB_ENDINGS:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased Russian/English terms without stopwords, lightly stemmed (ё folds to е)."""
+    text = text.lower().replace("ё", "е")
+    return [_stem(token) for token in _TOKEN.findall(text) if token not in _STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Document]:
+    """
+    Fuse ranked document lists by reciprocal rank: score = sum of 1 / (k + rank).
+
+    Documents are matched by `id`; the first list's copy of a document wins.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, 1):
+            key = document.id or document.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring over the stored chunks.
+
+    Documents are identified by their vector-store ids; the index keeps only
+    term statistics, so results are resolved to text through the vector
+    store. Mutations happen on the Chroma executor while searches may run
+    concurrently, hence the lock. `save()` writes the whole index atomically
+    to `path` (JSON) when it changed.
+    """
+
+    def __init__(self, path: Optional[str], k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._dirty = False
+        self.searches = 0
+        if path and os.path.exists(path):
+            try:
+                self._load()
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable BM25 index {path}: {str(e)}")
+                self.clear()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            data = json.load(f)
+        self._ids = data["ids"]
+        self._lengths = data["lengths"]
+        self._slots = {doc_id: slot for slot, doc_id in enumerate(self._ids)}
+        self._postings = {term: {slot: tf for slot, tf in entries} for term, entries in data["postings"].items()}
+        self._total_length = sum(self._lengths)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Serialize whole saves so an older snapshot never replaces a newer one
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {
+                    "version": 1,
+                    "ids": list(self._ids),
+                    "lengths": list(self._lengths),
+                    "postings": {term: list(entries.items()) for term, entries in self._postings.items()},
+                }
+                self._dirty = False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        """Index chunks; an id that is already indexed is skipped."""
+        tokenized = [(doc_id, tokenize(text)) for doc_id, text in zip(ids, texts)]
+        with self._lock:
+            for doc_id, terms in tokenized:
+                if doc_id in self._slots:
+                    continue
+                slot = len(self._ids)
+                self._ids.append(doc_id)
+                self._slots[doc_id] = slot
+                self._lengths.append(len(terms))
+                self._total_length += len(terms)
+                counts: Dict[str, int] = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, tf in counts.items():
+                    self._postings.setdefault(term, {})[slot] = tf
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids, self._slots, self._lengths, self._postings = [], {}, [], {}
+            self._total_length = 0
+            self._dirty = True
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Score documents containing any query term.
+
+        Args:
+            query: Free-text query
+            k: Number of results to return
+
+        Returns:
+            (document id, BM25 score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self.searches += 1
+            n = len(self._ids)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for slot, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[slot] / avg_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._ids[slot], score) for slot, score in best]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._ids),
+            "terms": len(self._postings),
+            "avg_document_terms": round(self._total_length / len(self._ids), 1) if self._ids else 0.0,
+            "searches": self.searches,
+            "path": self.path,
+        }
@@ -1,6 +1,8 @@
 import logging
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langchain_community.callbacks.manager import get_openai_callback
@@ -8,30 +10,92 @@ import asyncio
 import time
 
 from src.config import config
+from src import metrics
+from src.completion_cache import get_shared_completion_cache, make_cache_key
+from src.model_router import get_shared_router
+from src.rate_limiter import get_shared_limiter
+from src.retry_policy import (
+    CONTEXT_SIZE,
+    FATAL,
+    RATE_LIMIT,
+    TRANSIENT,
+    DecorrelatedJitterBackoff,
+    classify_error,
+    get_shared_circuit_breaker,
+    retry_after_seconds,
+)
+from src.single_flight import SingleFlight
+from src.token_counter import count_messages_tokens, trim_messages_to_budget
 
 logger = logging.getLogger(__name__)
 
+# Process-wide async OpenAI client backed by a pooled keep-alive HTTP client
+_shared_async_client: Optional[AsyncOpenAI] = None
+
+# Coalesces identical in-flight completions across all LLMClient instances
+_completion_flight = SingleFlight()
+
+
+def get_shared_async_client() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client, creating it on first use."""
+    global _shared_async_client
+    if _shared_async_client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=config.OPENAI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.OPENAI_HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(config.OPENAI_HTTP_TIMEOUT_SEC),
+        )
+        _shared_async_client = AsyncOpenAI(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL or None,
+            http_client=http_client,
+            # Retries are handled by LLMClient's own policy (see retry_policy.py)
+            max_retries=0,
+        )
+    return _shared_async_client
+
+
+async def close_shared_async_client() -> None:
+    """Close the shared client and its connection pool (call on shutdown)."""
+    global _shared_async_client
+    if _shared_async_client is not None:
+        await _shared_async_client.close()
+        _shared_async_client = None
+
+
 class LLMClient:
     """Client for interacting with OpenAI LLM APIs."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.client = get_shared_async_client()
         self.chat_model = ChatOpenAI(
             model=config.OPENAI_MODEL,
             temperature=0.7,
             api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL or None,
         )
-        # Simple RPM limiter state
-        self._request_timestamps: list[float] = []
-        # Simple TPM limiter state: list of (timestamp, tokens)
-        self._token_timestamps: list[tuple[float, int]] = []
+        # RPM/TPM limiter shared by all clients in the process
+        self.rate_limiter = get_shared_limiter()
+        # Optional completion cache for low-temperature calls (None when disabled)
+        self.completion_cache = get_shared_completion_cache()
+        # Identical concurrent requests share one upstream call (None when disabled)
+        self.single_flight = _completion_flight if config.SINGLE_FLIGHT_ENABLED else None
+        # Maps call purposes to model tiers and collects per-purpose stats
+        self.router = get_shared_router()
+        # Fails fast while the upstream is down
+        self.circuit_breaker = get_shared_circuit_breaker()
     
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
-        functions: Optional[List[Dict]] = None
+        functions: Optional[List[Dict]] = None,
+        use_cache: bool = True,
+        tool_choice: Optional[str] = None,
+        purpose: str = "chat"
     ) -> Dict[str, Any]:
         """
         Send a chat completion request to OpenAI.
@@ -41,94 +105,181 @@ class LLMClient:
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
             functions: List of function definitions for function calling
+            use_cache: Allow serving this call from the completion cache
+            tool_choice: Optional tool choice ("auto", "none", "required")
+            purpose: Call purpose used to pick the model tier and default max_tokens
             
         Returns:
             OpenAI API response
         """
-        # Default response token cap from config
+        route = self.router.resolve(purpose)
+        # Default response token cap from the route
         if max_tokens is None:
-            max_tokens = config.RESPONSE_MAX_TOKENS
+            max_tokens = route.max_tokens
 
-        attempt = 0
-        last_error: Optional[Exception] = None
-        while attempt < config.OPENAI_RETRY_MAX_ATTEMPTS:
-            try:
-                # Pre-trim messages to stay within prompt budget
-                messages = self._shrink_messages(messages)
-                # Throttle based on RPM/TPM before making the call
-                await self._throttle_if_needed()
-                await self._throttle_tokens_if_needed(
-                    self._estimate_message_tokens(messages) + (max_tokens or 0)
-                )
-                params = {
-                    "model": config.OPENAI_MODEL,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                }
-                if functions:
-                    # Convert functions to tools format for newer API
-                    tools = []
-                    for func in functions:
-                        tools.append({
-                            "type": "function",
-                            "function": func
-                        })
-                    params["tools"] = tools
+        # Pre-trim messages to stay within prompt budget
+        params: Dict[str, Any] = {
+            "model": route.model,
+            "messages": self._shrink_messages(messages, route.model),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if functions:
+            params["tools"] = self._build_tools(functions)
+            if tool_choice:
+                params["tool_choice"] = tool_choice
 
-                response = self.client.chat.completions.create(**params)
-                logger.info(f"Chat completion successful: {len(response.choices)} choices")
-                self._record_request()
-                # Record token usage for TPM limiter when available
-                try:
-                    if response.usage and hasattr(response.usage, "total_tokens"):
-                        total_tokens_used = int(response.usage.total_tokens)
-                    else:
-                        total_tokens_used = self._estimate_message_tokens(messages) + (max_tokens or 0)
-                    self._record_tokens(total_tokens_used)
-                except Exception:
-                    pass
-                # Handle both old function_call and new tool_calls format
-                function_call = None
-                if hasattr(response.choices[0].message, 'function_call') and response.choices[0].message.function_call:
-                    function_call = response.choices[0].message.function_call
-                elif hasattr(response.choices[0].message, 'tool_calls') and response.choices[0].message.tool_calls:
-                    # Convert tool_calls to function_call format for compatibility
-                    tool_call = response.choices[0].message.tool_calls[0]
-                    function_call = type('FunctionCall', (), {
-                        'name': tool_call.function.name,
-                        'arguments': tool_call.function.arguments
-                    })()
-                
-                return {
-                    "content": response.choices[0].message.content,
-                    "function_call": function_call,
-                    "usage": response.usage.dict() if response.usage else None,
-                    "model": response.model,
-                    "id": response.id
+        cacheable = (
+            use_cache
+            and self.completion_cache is not None
+            and temperature <= config.COMPLETION_CACHE_MAX_TEMPERATURE
+        )
+        request_key = make_cache_key(params) if cacheable or self.single_flight is not None else None
+        started = time.perf_counter()
+        if cacheable:
+            cached = self.completion_cache.get(request_key)
+            metrics.CACHE_REQUESTS.labels("completion", "hit" if cached is not None else "miss").inc()
+            if cached is not None:
+                logger.info("Chat completion served from cache")
+                self._record_call(purpose, started, cache_hit=True)
+                return cached
+
+        async def call_upstream() -> Dict[str, Any]:
+            upstream_started = time.perf_counter()
+            result = await self._create_with_retries(params)
+            # Tokens are spent once per upstream call, however many waiters share the result
+            self._record_usage(purpose, result.get("usage"))
+            if cacheable:
+                self.completion_cache.set(request_key, result, (time.perf_counter() - upstream_started) * 1000)
+            return result
+
+        if self.single_flight is not None:
+            result = await self.single_flight.do(request_key, call_upstream)
+        else:
+            result = await call_upstream()
+        self._record_call(purpose, started)
+        return result
+
+    def _record_call(self, purpose: str, started: float, cache_hit: bool = False) -> None:
+        """Feed the latency of one finished call, as its caller saw it, into the router stats and metrics."""
+        elapsed = time.perf_counter() - started
+        self.router.record(purpose, elapsed * 1000, cache_hit)
+        metrics.LLM_LATENCY.labels(purpose).observe(elapsed)
+
+    def _record_usage(self, purpose: str, usage: Optional[Dict[str, Any]]) -> None:
+        """Feed the token usage of one upstream call into the router stats and metrics."""
+        self.router.record_usage(purpose, usage)
+        if usage:
+            metrics.LLM_TOKENS.labels(purpose, "in").inc(usage.get("prompt_tokens") or 0)
+            metrics.LLM_TOKENS.labels(purpose, "out").inc(usage.get("completion_tokens") or 0)
+            details = usage.get("prompt_tokens_details") or {}
+            metrics.LLM_TOKENS.labels(purpose, "cached").inc(details.get("cached_tokens") or 0)
+
+    async def _create_with_retries(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the completions API (see `_create_raw`) and return the response as a plain dict."""
+        response, reservation = await self._create_raw(params)
+        logger.info(f"Chat completion successful: {len(response.choices)} choices")
+        # Refund the unused part of the token reservation
+        total_tokens_used = None
+        if response.usage and getattr(response.usage, "total_tokens", None) is not None:
+            total_tokens_used = int(response.usage.total_tokens)
+        self.rate_limiter.settle(reservation, total_tokens_used)
+        message = response.choices[0].message
+        # Keep every tool call the model requested, as plain dicts
+        tool_calls = [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments
                 }
+            }
+            for tool_call in (getattr(message, "tool_calls", None) or [])
+        ]
+        # Legacy single function_call view for older callers
+        function_call = None
+        if tool_calls:
+            function_call = dict(tool_calls[0]["function"])
+        elif getattr(message, "function_call", None):
+            function_call = {
+                "name": message.function_call.name,
+                "arguments": message.function_call.arguments
+            }
+        
+        return {
+            "content": message.content,
+            "tool_calls": tool_calls,
+            "function_call": function_call,
+            "usage": response.usage.dict() if response.usage else None,
+            "model": response.model,
+            "id": response.id
+        }
+
+    async def _create_raw(self, params: Dict[str, Any]):
+        """
+        Call the completions API with rate limiting and a typed retry policy.
+
+        Rate limits wait for the server's Retry-After (or jittered backoff) and
+        resend unchanged; only context-size errors shrink the prompt. Transient
+        upstream failures feed the circuit breaker, which fails fast while open.
+        With `stream=True` in params only opening the stream is retried.
+
+        Returns:
+            (response or stream, rate limiter reservation); the caller settles
+            the reservation once the real token usage is known
+        """
+        backoff = DecorrelatedJitterBackoff(config.OPENAI_RETRY_BASE_DELAY_SEC, config.OPENAI_RETRY_MAX_DELAY_SEC)
+        attempt = 0
+        while True:
+            attempt += 1
+            self.circuit_breaker.before_call()
+            # Reserve RPM/TPM capacity before making the call
+            reservation = await self.rate_limiter.acquire(
+                self._estimate_message_tokens(params["messages"], params["model"]) + (params["max_tokens"] or 0)
+            )
+            metrics.LLM_UPSTREAM_REQUESTS.labels(params["model"]).inc()
+            try:
+                response = await self.client.chat.completions.create(**params)
             except Exception as e:
-                message = str(e)
-                # On rate limit or token errors, backoff and try to reduce size
-                if "rate_limit" in message or "429" in message or "tokens per min" in message or "Request too large" in message:
-                    attempt += 1
-                    last_error = e
-                    backoff = config.OPENAI_RETRY_BASE_DELAY_SEC * (2 ** (attempt - 1))
-                    logger.warning(f"Retrying after rate/token error (attempt {attempt}/{config.OPENAI_RETRY_MAX_ATTEMPTS}) in {backoff:.1f}s: {message}")
-                    # Reduce max_tokens and shrink prompt roughly by dropping oldest messages
-                    max_tokens = max(128, int(max_tokens * 0.8))
-                    messages = self._shrink_messages(messages)
-                    # Add a small extra delay to respect TPM soft limits
-                    await self._throttle_tokens_if_needed(
-                        self._estimate_message_tokens(messages) + (max_tokens or 0)
+                # Rejected calls do not consume tokens; keep only the request slot
+                self.rate_limiter.settle(reservation, 0)
+                kind = classify_error(e)
+                metrics.LLM_UPSTREAM_ERRORS.labels(kind).inc()
+                if kind == TRANSIENT:
+                    self.circuit_breaker.record_failure()
+                else:
+                    # The upstream answered, so it is reachable
+                    self.circuit_breaker.record_success()
+                if kind == FATAL or attempt >= config.OPENAI_RETRY_MAX_ATTEMPTS:
+                    logger.error(f"Error in chat completion ({kind}, attempt {attempt}): {str(e)}")
+                    raise
+                
+                delay = retry_after_seconds(e) if kind == RATE_LIMIT else None
+                if delay is None:
+                    delay = backoff.next_delay()
+                if kind == CONTEXT_SIZE:
+                    # Only size errors justify sending less: drop a quarter of the prompt and output budget
+                    prompt_tokens = self._estimate_message_tokens(params["messages"], params["model"])
+                    params["messages"] = trim_messages_to_budget(
+                        params["messages"],
+                        budget_tokens=int(prompt_tokens * 0.75),
+                        model=params["model"],
                     )
-                    await asyncio.sleep(backoff)
-                    continue
-                logger.error(f"Error in chat completion: {message}")
-                raise
-        # If we exit loop without returning, raise last error
-        logger.error(f"Exceeded retry attempts for chat completion: {last_error}")
-        raise last_error if last_error else RuntimeError("Chat completion failed")
+                    params["max_tokens"] = max(128, int(params["max_tokens"] * 0.75))
+                    if isinstance(e, openai.BadRequestError):
+                        # Context window overflow is not time-based; resend right away
+                        delay = 0.0
+                logger.warning(
+                    f"Retrying after {kind} error (attempt {attempt}/{config.OPENAI_RETRY_MAX_ATTEMPTS}) "
+                    f"in {delay:.1f}s: {str(e)}"
+                )
+                metrics.LLM_RETRIES.labels(kind).inc()
+                await asyncio.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            return response, reservation
     
     async def chat_with_langchain(
         self,
@@ -161,7 +312,7 @@ class LLMClient:
                     langchain_messages.append(SystemMessage(content=msg["content"]))
             
             with get_openai_callback() as cb:
-                response = self.chat_model.invoke(langchain_messages)
+                response = await self.chat_model.ainvoke(langchain_messages)
                 logger.info(f"LangChain chat successful. Tokens used: {cb.total_tokens}")
             
             return response.content
@@ -195,7 +346,8 @@ class LLMClient:
             )
             
             if response.get("function_call"):
-                logger.info(f"Function call detected: {response['function_call'].name}")
+                names = [tool_call["function"]["name"] for tool_call in response.get("tool_calls") or []]
+                logger.info(f"Function call detected: {', '.join(names) or response['function_call']['name']}")
                 return response
             else:
                 logger.warning("No function call detected in response")
@@ -220,135 +372,110 @@ class LLMClient:
         Yields:
             Streaming response chunks
         """
+        async for event in self.stream_completion(messages, temperature=temperature):
+            if event["type"] == "token":
+                yield event["content"]
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        functions: Optional[List[Dict]] = None,
+        tool_choice: Optional[str] = None,
+        purpose: str = "chat"
+    ):
+        """
+        Stream a chat completion, including tool calls, as events.
+        
+        Args:
+            messages: List of message dictionaries
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            functions: List of function definitions for function calling
+            tool_choice: Optional tool choice ("auto", "none", "required")
+            purpose: Call purpose used to pick the model tier and default max_tokens
+            
+        Yields:
+            {"type": "token", "content": str} for each content delta, then
+            {"type": "tool_calls", "tool_calls": [...]} if the model requested
+            tools, and finally {"type": "usage", "usage": dict | None, "model": str}
+        """
+        route = self.router.resolve(purpose)
+        if max_tokens is None:
+            max_tokens = route.max_tokens
+        started = time.perf_counter()
         try:
             # Ensure prompt is within limits before streaming
-            trimmed = self._shrink_messages(messages)
-            await self._throttle_if_needed()
-            await self._throttle_tokens_if_needed(
-                self._estimate_message_tokens(trimmed) + config.RESPONSE_MAX_TOKENS
-            )
-            stream = self.client.chat.completions.create(
-                model=config.OPENAI_MODEL,
-                messages=trimmed,
-                temperature=temperature,
-                stream=True
-            )
-            self._record_request()
-            # Best-effort token accounting for stream: count input + expected output cap
+            trimmed = self._shrink_messages(messages, route.model)
+            params: Dict[str, Any] = {
+                "model": route.model,
+                "messages": trimmed,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": True,
+                # Final chunk carries usage so the reservation can be settled
+                "stream_options": {"include_usage": True},
+            }
+            if functions:
+                params["tools"] = self._build_tools(functions)
+                if tool_choice:
+                    params["tool_choice"] = tool_choice
+
+            # Opening the stream is retried like /chat; nothing has been yielded yet
+            stream, reservation = await self._create_raw(params)
+            usage = None
+            model = route.model
+            # Tool call fragments arrive spread over many chunks, keyed by index
+            tool_calls: Dict[int, Dict[str, Any]] = {}
             try:
-                self._record_tokens(self._estimate_message_tokens(trimmed) + config.RESPONSE_MAX_TOKENS)
-            except Exception:
-                pass
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+                async for chunk in stream:
+                    model = chunk.model or model
+                    if chunk.usage is not None:
+                        usage = chunk.usage.dict()
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        yield {"type": "token", "content": delta.content}
+                    for fragment in delta.tool_calls or []:
+                        call = tool_calls.setdefault(fragment.index, {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if fragment.id:
+                            call["id"] = fragment.id
+                        if fragment.function is not None:
+                            call["function"]["name"] += fragment.function.name or ""
+                            call["function"]["arguments"] += fragment.function.arguments or ""
+            finally:
+                # Release the pooled connection and stop upstream generation if the client left early
+                await stream.close()
+                self.rate_limiter.settle(reservation, usage["total_tokens"] if usage else None)
+            self._record_usage(purpose, usage)
+            self._record_call(purpose, started)
+            if tool_calls:
+                yield {"type": "tool_calls", "tool_calls": [tool_calls[i] for i in sorted(tool_calls)]}
+            yield {"type": "usage", "usage": usage, "model": model}
         except Exception as e:
             logger.error(f"Error in streaming chat: {str(e)}")
             raise
 
-    def _shrink_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Prefer newest messages and RAG-augmented user turn; keep system, drop oldest first, truncate last if needed."""
-        if not messages:
-            return messages
-        system_msg = messages[0] if messages and messages[0].get("role") == "system" else None
-        history = messages[1:] if system_msg else messages[:]
-        # Prefer the newest turns
-        history = history[-max(1, config.MAX_HISTORY_MESSAGES):]
-        budget = config.MAX_PROMPT_CHARS
-        kept_reversed: List[Dict[str, Any]] = []
-        used = 0
-        for msg in reversed(history):
-            content = msg.get("content") or ""
-            length = len(content)
-            if used + length <= budget:
-                kept_reversed.append(msg)
-                used += length
-            else:
-                if not kept_reversed and length > 0:
-                    # Include partial newest message
-                    part = max(0, budget)
-                    new_msg = dict(msg)
-                    new_msg["content"] = content[:part]
-                    kept_reversed.append(new_msg)
-                    used += len(new_msg["content"]) 
-                break
-        kept_history = list(reversed(kept_reversed))
-        if system_msg:
-            remaining = max(0, budget - sum(len((m.get("content") or "")) for m in kept_history))
-            sys_content = system_msg.get("content") or ""
-            if len(sys_content) > remaining and remaining > 0:
-                sys_copy = dict(system_msg)
-                sys_copy["content"] = sys_content[:remaining]
-                return [sys_copy] + kept_history
-            elif remaining <= 0:
-                sys_copy = dict(system_msg)
-                sys_copy["content"] = sys_content[:128]
-                return [sys_copy] + kept_history
-            else:
-                return [system_msg] + kept_history
-        return kept_history
-
-    async def _throttle_if_needed(self) -> None:
-        """Throttle requests to stay under an RPM ceiling if configured."""
-        rpm = config.OPENAI_RPM_LIMIT
-        if not rpm or rpm <= 0:
-            return
-        now = time.time()
-        window_start = now - config.RPM_WINDOW_SEC
-        # Drop timestamps outside window
-        self._request_timestamps = [t for t in self._request_timestamps if t >= window_start]
-        if len(self._request_timestamps) >= rpm:
-            # Sleep until the oldest request rolls out of the window
-            oldest = self._request_timestamps[0]
-            sleep_for = max(0.0, oldest + config.RPM_WINDOW_SEC - now)
-            if sleep_for > 0:
-                logger.info(f"Throttling to respect RPM limit; sleeping {sleep_for:.2f}s")
-                await asyncio.sleep(sleep_for)
+    @staticmethod
+    def _build_tools(functions: List[Dict]) -> List[Dict[str, Any]]:
+        """Convert function definitions to the tools format of the newer API."""
+        return [{"type": "function", "function": func} for func in functions]
 
-    def _record_request(self) -> None:
-        self._request_timestamps.append(time.time())
-
-    async def _throttle_tokens_if_needed(self, requested_tokens: int) -> None:
-        """Throttle to stay under a soft TPM ceiling if configured."""
-        tpm = config.OPENAI_TPM_LIMIT
-        if not tpm or tpm <= 0:
-            return
-        now = time.time()
-        window = config.TPM_WINDOW_SEC
-        window_start = now - window
-        # Drop entries outside window
-        self._token_timestamps = [(t, tok) for (t, tok) in self._token_timestamps if t >= window_start]
-        used = sum(tok for (_t, tok) in self._token_timestamps)
-        if used + requested_tokens > tpm:
-            # Need to sleep until enough tokens roll out
-            # Compute when enough tokens will expire
-            cumulative = used
-            # Sort by oldest first
-            sorted_entries = sorted(self._token_timestamps, key=lambda x: x[0])
-            sleep_for = 0.0
-            for ts, tok in sorted_entries:
-                cumulative -= tok
-                # Time when this entry exits the window
-                exit_time = ts + window
-                if cumulative + requested_tokens <= tpm:
-                    sleep_for = max(0.0, exit_time - now)
-                    break
-            if sleep_for > 0:
-                logger.info(f"Throttling to respect TPM limit; sleeping {sleep_for:.2f}s")
-                await asyncio.sleep(sleep_for)
-
-    def _record_tokens(self, tokens_used: int) -> None:
-        self._token_timestamps.append((time.time(), int(tokens_used)))
+    def _shrink_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Prefer newest messages and RAG-augmented user turn; keep system, drop oldest first, truncate last if needed."""
+        return trim_messages_to_budget(
+            messages,
+            budget_tokens=config.MAX_PROMPT_TOKENS,
+            model=model or config.OPENAI_MODEL,
+            max_history=config.MAX_HISTORY_MESSAGES,
+        )
 
-    def _estimate_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
-        """Very rough token estimate: ~4 chars per token including role markers."""
-        if not messages:
-            return 0
-        total_chars = 0
-        for msg in messages:
-            content = msg.get("content") or ""
-            total_chars += len(content)
-            # Add small overhead for role and structure
-            total_chars += 20
-        # 1 token per 4 chars heuristic
-        return max(1, total_chars // 4)
+    def _estimate_message_tokens(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+        """Count prompt tokens with the model's tokenizer (memoized per message)."""
+        return count_messages_tokens(messages, model or config.OPENAI_MODEL)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+from src import metrics
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """
+    Measure event-loop responsiveness.
+
+    A background task sleeps for `interval_sec` and records how late it woke
+    up. Any blocking call on the loop (a synchronous vector search, PDF
+    parsing, a large JSON dump) shows up directly as lag, both in the
+    `eraai_event_loop_lag_seconds` histogram and in `get_stats()`.
+    """
+
+    def __init__(self, interval_sec: float = 0.1, warn_sec: float = 0.25, window: int = 1024):
+        self.interval_sec = interval_sec
+        self.warn_sec = warn_sec
+        self._recent = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_sec
+            await asyncio.sleep(self.interval_sec)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag: float) -> None:
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self._recent.append(lag)
+        metrics.EVENT_LOOP_LAG.observe(lag)
+        if lag >= self.warn_sec:
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        return {
+            "samples": self.samples,
+            "interval_ms": round(self.interval_sec * 1000, 1),
+            "avg_lag_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            "p99_lag_ms": round(p99 * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+_shared_monitor: Optional[EventLoopLagMonitor] = None
+
+
+def get_shared_loop_monitor() -> EventLoopLagMonitor:
+    """Process-wide monitor; started by the web API on startup."""
+    global _shared_monitor
+    if _shared_monitor is None:
+        _shared_monitor = EventLoopLagMonitor(
+            interval_sec=config.LOOP_LAG_INTERVAL_SEC,
+            warn_sec=config.LOOP_LAG_WARN_SEC
+        )
+    return _shared_monitor
@@ -0,0 +1,253 @@
+import bisect
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Default latency buckets in seconds (LLM calls dominate the upper end)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """
+    Base of a labelled metric family.
+
+    Children are created once per label combination and cached, so the hot
+    path is a dict lookup plus plain attribute updates. Updates take no locks:
+    every instrumented call site runs on the event loop thread.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def labels(self, *labelvalues: str):
+        """Return the child for a label combination, creating it on first use."""
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+            child = self._new_child()
+            self._children[labelvalues] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        # Unlabelled metrics have a single child under the empty label tuple
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labelvalues, child in list(self._children.items()):
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.value)}"]
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus +Inf, allocated once
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Histogram with fixed, preallocated buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self) -> _Timer:
+        return self._default().time()
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.upper_bounds + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Chat pipeline stages: translation, retrieval, tools (LLM calls have their own histogram)
+STAGE_LATENCY = Histogram(
+    "eraai_stage_duration_seconds",
+    "Time spent in each stage of the chat pipeline.",
+    ["stage"],
+)
+LLM_LATENCY = Histogram(
+    "eraai_llm_request_duration_seconds",
+    "End-to-end latency of LLM calls per purpose, including cache hits and retries.",
+    ["purpose"],
+)
+LLM_TOKENS = Counter(
+    "eraai_llm_tokens_total",
+    "LLM tokens per purpose; direction is in, out or cached (prompt tokens served from the provider cache).",
+    ["purpose", "direction"],
+)
+LLM_UPSTREAM_REQUESTS = Counter(
+    "eraai_llm_upstream_requests_total",
+    "Requests sent to the LLM upstream, counting each retry attempt.",
+    ["model"],
+)
+LLM_UPSTREAM_ERRORS = Counter(
+    "eraai_llm_upstream_errors_total",
+    "Failed LLM upstream requests by error class.",
+    ["kind"],
+)
+LLM_RETRIES = Counter(
+    "eraai_llm_retries_total",
+    "LLM request retries by error class.",
+    ["kind"],
+)
+LIMITER_WAIT = Histogram(
+    "eraai_rate_limiter_wait_seconds",
+    "Time requests waited for RPM/TPM capacity.",
+)
+CACHE_REQUESTS = Counter(
+    "eraai_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+CACHE_SAVED_SECONDS = Counter(
+    "eraai_cache_saved_seconds_total",
+    "Upstream latency avoided by cache hits (the original call's duration), by cache.",
+    ["cache"],
+)
+SINGLE_FLIGHT_COALESCED = Counter(
+    "eraai_single_flight_coalesced_total",
+    "Calls that joined an identical in-flight call instead of executing.",
+)
+TOOL_CALLS = Counter(
+    "eraai_tool_calls_total",
+    "Tool (function) calls by function and status.",
+    ["function", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "eraai_http_request_duration_seconds",
+    "HTTP request latency per route until the response headers are sent.",
+    ["method", "path", "status"],
+)
+VECTOR_STORE_LATENCY = Histogram(
+    "eraai_vector_store_duration_seconds",
+    "Vector store calls by operation, measured on the Chroma executor (excludes queueing).",
+    ["operation"],
+)
+VECTOR_STORE_QUEUE_WAIT = Histogram(
+    "eraai_vector_store_queue_wait_seconds",
+    "Time vector store calls waited for a free Chroma executor thread.",
+)
+RETRIEVALS = Counter(
+    "eraai_retrievals_total",
+    "Document retrievals by path: vector, lexical (BM25 only, no embedding call) or hybrid (rank fusion).",
+    ["path"],
+)
+CONTEXT_COMPRESSION_RATIO = Histogram(
+    "eraai_context_compression_ratio",
+    "Retrieved context size after extractive compression relative to before (1.0 = nothing removed).",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+EVENT_LOOP_LAG = Histogram(
+    "eraai_event_loop_lag_seconds",
+    "How late the event loop woke a periodic timer; high values mean blocking calls on the loop.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
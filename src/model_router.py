@@ -0,0 +1,100 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelRoute:
+    """Model and response cap used for one call purpose."""
+    purpose: str
+    model: str
+    max_tokens: int
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    cache_hits: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class ModelRouter:
+    """
+    Map call purposes (chat, translation, quick_actions, ...) to model tiers.
+
+    Tiers are named in config.MODEL_TIERS; a route may also name a model
+    directly. Unknown purposes use the "chat" route.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, ModelRoute] = {}
+        for purpose, (tier, max_tokens) in config.LLM_ROUTES.items():
+            model = config.MODEL_TIERS.get(tier, tier)
+            self.routes[purpose] = ModelRoute(purpose=purpose, model=model, max_tokens=max_tokens)
+        self.stats: Dict[str, RouteStats] = {}
+
+    def resolve(self, purpose: str) -> ModelRoute:
+        """Return the route for a purpose, falling back to the chat route."""
+        route = self.routes.get(purpose)
+        if route is None:
+            route = self.routes["chat"]
+        return route
+
+    def record(self, purpose: str, latency_ms: float, cache_hit: bool = False) -> None:
+        """Record the latency of one call as seen by its caller (coalesced waiters and cache hits included)."""
+        stats = self.stats.setdefault(purpose, RouteStats())
+        stats.calls += 1
+        stats.total_latency_ms += latency_ms
+        stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+        if cache_hit:
+            stats.cache_hits += 1
+
+    def record_usage(self, purpose: str, usage: Optional[Dict[str, Any]]) -> None:
+        """Record token usage of one upstream call; call once per request actually sent."""
+        if not usage:
+            return
+        stats = self.stats.setdefault(purpose, RouteStats())
+        stats.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+        # Prompt tokens served from the provider's prefix cache
+        details = usage.get("prompt_tokens_details") or {}
+        stats.cached_prompt_tokens += int(details.get("cached_tokens") or 0)
+        stats.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-purpose model, latency and token statistics."""
+        result = {}
+        for purpose, stats in self.stats.items():
+            route = self.resolve(purpose)
+            result[purpose] = {
+                "model": route.model,
+                "max_tokens": route.max_tokens,
+                "calls": stats.calls,
+                "cache_hits": stats.cache_hits,
+                "avg_latency_ms": round(stats.total_latency_ms / stats.calls, 1) if stats.calls else 0.0,
+                "max_latency_ms": round(stats.max_latency_ms, 1),
+                "prompt_tokens": stats.prompt_tokens,
+                "cached_prompt_tokens": stats.cached_prompt_tokens,
+                "prompt_cache_hit_ratio": round(stats.cached_prompt_tokens / stats.prompt_tokens, 3) if stats.prompt_tokens else 0.0,
+                "completion_tokens": stats.completion_tokens,
+            }
+        return result
+
+
+# Process-wide router so stats aggregate across LLMClient instances
+_shared_router: Optional[ModelRouter] = None
+
+
+def get_shared_router() -> ModelRouter:
+    """Return the process-wide model router."""
+    global _shared_router
+    if _shared_router is None:
+        _shared_router = ModelRouter()
+    return _shared_router
@@ -6,6 +6,8 @@ class ChatRequest(BaseModel):
     use_functions: bool = True
     temperature: float = 0.7
     translate_queries: bool = True
+    # The message opens the client's conversation; only such messages use the semantic answer cache
+    new_conversation: bool = False
 
 class KnowledgeRequest(BaseModel):
     texts: list[str]
\ No newline at end of file
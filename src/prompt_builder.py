@@ -0,0 +1,46 @@
+from typing import List, Dict, Any
+
+
+def build_prompt_messages(
+    instructions: str,
+    history: List[Dict[str, Any]],
+    question: str,
+    summary: str = "",
+    context: str = ""
+) -> List[Dict[str, Any]]:
+    """
+    Assemble chat messages with stable parts first and volatile parts last.
+
+    Providers cache prompts by exact prefix, so the order is:
+    1. system instructions (identical on every turn; tool schemas are sent
+       separately and precede the messages upstream),
+    2. prior turns exactly as stored in the conversation history,
+    3. the current user turn carrying everything that changes per request:
+       running summary, retrieved context, then the question. Tool results
+       (live data) are appended after it by the tool loop.
+
+    Args:
+        instructions: Stable system prompt
+        history: Prior conversation turns (without the current question)
+        question: Current user message
+        summary: Running summary of the conversation
+        context: Retrieved knowledge base context
+
+    Returns:
+        List of chat messages
+    """
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": instructions}]
+    messages.extend(history)
+
+    sections = []
+    if summary:
+        sections.append(f"Running summary of prior conversation (for context preservation):\n{summary}")
+    if context:
+        sections.append(f"Context:\n{context}")
+    if sections:
+        sections.append(f"User question: {question}")
+        content = "\n\n".join(sections)
+    else:
+        content = question
+    messages.append({"role": "user", "content": content})
+    return messages
@@ -1,63 +1,245 @@
+import asyncio
 import logging
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_community.document_loaders import TextLoader, DirectoryLoader
 from langchain_core.documents import Document
 
+from src import metrics
 from src.config import config
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import create_embedding_backend
+from src.ingestion import IngestionPipeline
+from src.context_compressor import CompressionResult, compress_documents, sentences_of
+from src.context_packer import PackedContext, pack_context
+from src.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.reranking import merge_adjacent_chunks, mmr_select
+from src.retrieval_cache import RetrievalCache, retrieval_cache_key
 
 logger = logging.getLogger(__name__)
 
+# Collection metadata key recording which embedding model built the collection
+EMBEDDING_MODEL_KEY = "embedding_model"
+# Collections created before the model was recorded were always built with this one
+LEGACY_EMBEDDING_MODEL = "openai:text-embedding-ada-002"
+# BM25 index file, stored inside CHROMA_DB_PATH next to the Chroma database
+LEXICAL_INDEX_FILE = "bm25_index.json"
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
 class RAGSystem:
     """Retrieval-Augmented Generation system using ChromaDB and LangChain."""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(api_key=config.OPENAI_API_KEY)
+        if config.RETRIEVAL_MODE not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RETRIEVAL_MODE: {config.RETRIEVAL_MODE!r} (expected one of {RETRIEVAL_MODES})")
+        self.embeddings = create_embedding_backend()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
         )
         
-        # Initialize ChromaDB
-        os.makedirs(config.CHROMA_DB_PATH, exist_ok=True)
-        self.chroma_client = chromadb.PersistentClient(
-            path=config.CHROMA_DB_PATH,
-            settings=Settings(anonymized_telemetry=False)
+        # Initialize ChromaDB: a Chroma server if configured, otherwise the embedded database
+        if config.CHROMA_SERVER_HOST:
+            self.chroma_client = chromadb.HttpClient(
+                host=config.CHROMA_SERVER_HOST,
+                port=config.CHROMA_SERVER_PORT,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        else:
+            os.makedirs(config.CHROMA_DB_PATH, exist_ok=True)
+            self.chroma_client = chromadb.PersistentClient(
+                path=config.CHROMA_DB_PATH,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        # Every Chroma call after startup runs here, never on the event loop
+        self._chroma_executor = ThreadPoolExecutor(
+            max_workers=max(1, config.CHROMA_EXECUTOR_WORKERS),
+            thread_name_prefix="chroma"
         )
         
         # Initialize vector store
         self.vectorstore = Chroma(
             client=self.chroma_client,
             collection_name="documents",
-            embedding_function=self.embeddings
+            embedding_function=self.embeddings,
+            collection_metadata={EMBEDDING_MODEL_KEY: self.embeddings.model_id}
+        )
+        self._check_embedding_model()
+        self.lexical_index = BM25Index(os.path.join(config.CHROMA_DB_PATH, LEXICAL_INDEX_FILE))
+        # Held while a write or an index sync runs, so a sync never sees a chunk in
+        # the collection that its writer has not indexed yet
+        self._write_lock = threading.Lock()
+        self._sync_lexical_index()
+        self.ingestion = IngestionPipeline(
+            splitter=self.text_splitter,
+            embeddings=self.embeddings,
+            write_fn=self._awrite_chunks,
+            batch_size=config.INGEST_BATCH_SIZE,
+            max_inflight_batches=config.INGEST_MAX_INFLIGHT_BATCHES
         )
+        self.last_ingestion: Optional[Dict[str, Any]] = None
+        # Bumped on every write or delete; cached search results carry the generation they saw
+        self.generation = 0
+        self.retrieval_cache = (
+            RetrievalCache(config.RETRIEVAL_CACHE_MAX_ENTRIES, config.RETRIEVAL_CACHE_TTL_SEC)
+            if config.RETRIEVAL_CACHE_ENABLED else None
+        )
+        # Sentence vectors for context compression live in memory only; query-time text must not
+        # grow the persistent document store
+        self.sentence_cache = EmbeddingCache(self.embeddings.model_id, None, config.CONTEXT_COMPRESSION_CACHE_SIZE)
+
+    def _check_embedding_model(self) -> None:
+        """Refuse to mix vectors from different embedding models in one collection."""
+        collection = self.chroma_client.get_collection("documents")
+        metadata = collection.metadata or {}
+        recorded = metadata.get(EMBEDDING_MODEL_KEY)
+        if recorded is None:
+            recorded = LEGACY_EMBEDDING_MODEL if collection.count() else self.embeddings.model_id
+            if recorded == self.embeddings.model_id:
+                collection.modify(metadata={**metadata, EMBEDDING_MODEL_KEY: recorded})
+        if recorded != self.embeddings.model_id:
+            raise ValueError(
+                f"Collection 'documents' in {config.CHROMA_DB_PATH} was built with {recorded}, "
+                f"but the configured embedding model is {self.embeddings.model_id}. "
+                f"Point CHROMA_DB_PATH at a new directory and re-ingest, or restore the previous embedding settings."
+            )
+
+    def _sync_lexical_index(self) -> int:
+        """
+        Bring the BM25 index in line with the collection and return the collection size.
+        
+        Chunks written by other processes are indexed incrementally; when chunks
+        were deleted (or the index is missing), it is rebuilt from scratch.
+        """
+        with self._write_lock:
+            collection = self.chroma_client.get_collection("documents")
+            count = collection.count()
+            if len(self.lexical_index) == count:
+                return count
+            page_size = 5000
+            ids = []
+            for offset in range(0, count, page_size):
+                ids += collection.get(include=[], limit=page_size, offset=offset)["ids"]
+            missing = [doc_id for doc_id in ids if doc_id not in self.lexical_index]
+            if len(self.lexical_index) + len(missing) != count:
+                logger.info(f"Rebuilding BM25 index from {count} stored chunks")
+                self.lexical_index.clear()
+                missing = ids
+            else:
+                logger.info(f"Adding {len(missing)} chunks written elsewhere to the BM25 index")
+            for start in range(0, len(missing), page_size):
+                page = collection.get(ids=missing[start:start + page_size], include=["documents"])
+                self.lexical_index.add(page["ids"], [text or "" for text in page["documents"]])
+            self.lexical_index.save()
+            return count
+
+    async def _run_in_chroma(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking Chroma/LangChain call on the dedicated Chroma executor."""
+        submitted = time.perf_counter()
+        timings = []
+
+        def call():
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings.extend((started, time.perf_counter()))
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._chroma_executor, call)
+        finally:
+            # Observed on the loop thread; the metric types are not thread-safe
+            if timings:
+                metrics.VECTOR_STORE_QUEUE_WAIT.observe(timings[0] - submitted)
+                metrics.VECTOR_STORE_LATENCY.labels(operation).observe(timings[1] - timings[0])
+
+    def _write_chunks(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """Write embedded chunks to the collection (blocking; runs on the Chroma executor)."""
+        if not texts:
+            return
+        ids = [str(uuid.uuid4()) for _ in texts]
+        collection = self.chroma_client.get_collection("documents")
+        # Pad like LangChain's Chroma.add_texts; chunks without metadata are written separately
+        metadatas = list(metadatas or [])
+        metadatas += [{}] * (len(texts) - len(metadatas))
+        with_meta = [i for i, meta in enumerate(metadatas) if meta]
+        without_meta = [i for i, meta in enumerate(metadatas) if not meta]
+        with self._write_lock:
+            if with_meta:
+                collection.upsert(
+                    ids=[ids[i] for i in with_meta],
+                    embeddings=[vectors[i] for i in with_meta],
+                    documents=[texts[i] for i in with_meta],
+                    metadatas=[metadatas[i] for i in with_meta],
+                )
+            if without_meta:
+                collection.upsert(
+                    ids=[ids[i] for i in without_meta],
+                    embeddings=[vectors[i] for i in without_meta],
+                    documents=[texts[i] for i in without_meta],
+                )
+            self.lexical_index.add(ids, texts)
+
+    async def _awrite_chunks(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        await self._run_in_chroma("upsert", self._write_chunks, texts, vectors, metadatas)
+        self.generation += 1
+
+    async def _ingest(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Split, embed and write texts through the concurrent ingestion pipeline."""
+        stats = await self.ingestion.run(texts, metadatas)
+        self.last_ingestion = stats.as_dict()
+        await self._run_in_chroma("lexical_save", self.lexical_index.save)
+        if stats.chunks and not stats.chunks_written:
+            raise RuntimeError(f"Failed to ingest any of {stats.chunks} chunks")
+        return self.last_ingestion
     
     async def add_documents(
         self,
         documents: List[Document],
         collection_name: str = "documents"
-    ) -> None:
+    ) -> Dict[str, Any]:
         """
         Add documents to the vector store.
         
         Args:
             documents: List of LangChain Document objects
             collection_name: Name of the collection to store documents
+            
+        Returns:
+            Ingestion statistics (chunks written, chunks/s, embedding latency)
         """
         try:
-            # Split documents into chunks
-            texts = self.text_splitter.split_documents(documents)
-            
-            # Add to vector store
-            self.vectorstore.add_documents(texts)
+            stats = await self._ingest(
+                [doc.page_content for doc in documents],
+                [doc.metadata for doc in documents]
+            )
             
-            logger.info(f"Added {len(texts)} document chunks to vector store")
+            logger.info(f"Added {stats['chunks_written']} document chunks to vector store")
+            return stats
             
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}")
@@ -67,24 +249,24 @@ class RAGSystem:
         self,
         texts: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None
-    ) -> None:
+    ) -> Dict[str, Any]:
         """
         Add raw texts to the vector store.
         
+        Every chunk split from a text keeps that text's metadata.
+        
         Args:
             texts: List of text strings
-            metadatas: Optional list of metadata dictionaries
+            metadatas: Optional list of metadata dictionaries, one per text
+            
+        Returns:
+            Ingestion statistics (chunks written, chunks/s, embedding latency)
         """
         try:
-            # Split texts into chunks
-            split_texts = []
-            for text in texts:
-                split_texts.extend(self.text_splitter.split_text(text))
+            stats = await self._ingest(texts, metadatas)
             
-            # Add to vector store
-            self.vectorstore.add_texts(split_texts, metadatas=metadatas)
-            
-            logger.info(f"Added {len(split_texts)} text chunks to vector store")
+            logger.info(f"Added {stats['chunks_written']} text chunks to vector store")
+            return stats
             
         except Exception as e:
             logger.error(f"Error adding texts: {str(e)}")
@@ -94,25 +276,43 @@ class RAGSystem:
         self,
         query: str,
         k: int = 5,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Document]:
         """
         Search for similar documents in the vector store.
         
+        RETRIEVAL_MODE selects embedding search, BM25 or both fused by
+        reciprocal rank; in hybrid mode short queries try BM25 alone first.
+        Results are cached per (normalized query, k, filter) until the
+        collection changes. Every search reads the collection size, so chunks
+        written by other processes invalidate the cache and reach the BM25
+        index too.
+        
         Args:
             query: Search query
             k: Number of results to return
             filter_dict: Optional filter criteria
+            query_embedding: Embedding of `query` if the caller already has it
             
         Returns:
             List of similar documents
         """
         try:
-            results = self.vectorstore.similarity_search(
-                query,
-                k=k,
-                filter=filter_dict
-            )
+            # Local writes bump the generation; the size covers writers elsewhere
+            count = await self._run_in_chroma("sync_lexical", self._sync_lexical_index)
+            generation = (self.generation, count)
+            cache_key = None
+            if self.retrieval_cache is not None:
+                cache_key = retrieval_cache_key(query, k, filter_dict, config.RETRIEVAL_MODE)
+                cached = self.retrieval_cache.get(cache_key, generation)
+                metrics.CACHE_REQUESTS.labels("retrieval", "hit" if cached is not None else "miss").inc()
+                if cached is not None:
+                    return cached
+            
+            results = await self._search(query, k, filter_dict, query_embedding)
+            if cache_key is not None:
+                self.retrieval_cache.set(cache_key, generation, results)
             
             logger.info(f"Found {len(results)} similar documents for query: {query}")
             return results
@@ -120,12 +320,160 @@ class RAGSystem:
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
             raise
+
+    async def _search(
+        self,
+        query: str,
+        k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        query_embedding: Optional[List[float]]
+    ) -> List[Document]:
+        mode = config.RETRIEVAL_MODE
+        path = mode
+        results = None
+        if mode == "lexical" or (mode == "hybrid" and self._use_lexical_fast_path(query)):
+            # Exact term matches answer short queries (tickers, names) without an embedding call
+            results = await self._lexical_search(query, k, filter_dict)
+            if mode == "hybrid" and len(results) < k:
+                results = None
+            else:
+                path = "lexical"
+        if results is None:
+            # Embed once; vector search and MMR share the vector
+            if query_embedding is None:
+                query_embedding = await self.embeddings.aembed_query(query)
+            # MMR chooses k from a larger candidate pool
+            fetch_k = max(k, config.MMR_FETCH_K) if config.MMR_ENABLED else k
+            # The stored vectors come back with the candidates for MMR to use
+            rerank = fetch_k > k
+            if mode == "hybrid":
+                candidates = max(fetch_k, config.HYBRID_CANDIDATES)
+                (vector_results, vectors), lexical_results = await asyncio.gather(
+                    self._vector_search(query, candidates, filter_dict, query_embedding, include_vectors=rerank),
+                    self._lexical_search(query, candidates, filter_dict)
+                )
+                results = reciprocal_rank_fusion([vector_results, lexical_results], k=config.RRF_K)[:fetch_k]
+            else:
+                results, vectors = await self._vector_search(
+                    query, fetch_k, filter_dict, query_embedding, include_vectors=rerank
+                )
+            if len(results) > k:
+                results = await self._rerank_mmr(results, k, query_embedding, vectors)
+        metrics.RETRIEVALS.labels(path).inc()
+        if config.MERGE_ADJACENT_CHUNKS:
+            results = merge_adjacent_chunks(results)
+        return results
+
+    async def _rerank_mmr(
+        self,
+        candidates: List[Document],
+        k: int,
+        query_embedding: List[float],
+        vectors: Dict[str, np.ndarray]
+    ) -> List[Document]:
+        """
+        Select k diverse candidates by maximal marginal relevance over their stored embeddings.
+        
+        `vectors` holds the embeddings returned by the vector search; only
+        candidates it lacks (BM25-only hits in hybrid mode) are fetched.
+        """
+        missing = [doc.id for doc in candidates if doc.id not in vectors]
+        if missing:
+            vectors = {**vectors, **await self._run_in_chroma("get_embeddings", self._get_embeddings, missing)}
+        usable = [i for i, doc in enumerate(candidates) if doc.id in vectors]
+        if len(usable) <= k:
+            return candidates[:k]
+        order = mmr_select(
+            np.asarray(query_embedding, dtype=np.float32),
+            np.stack([vectors[candidates[i].id] for i in usable]),
+            k,
+            config.MMR_LAMBDA
+        )
+        return [candidates[usable[i]] for i in order]
+
+    def _get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        result = self.chroma_client.get_collection("documents").get(ids=ids, include=["embeddings"])
+        return {
+            doc_id: np.asarray(vector, dtype=np.float32)
+            for doc_id, vector in zip(result["ids"], result["embeddings"])
+        }
+    
+    def _use_lexical_fast_path(self, query: str) -> bool:
+        return 0 < len(tokenize(query)) <= config.LEXICAL_FAST_PATH_MAX_TERMS
+
+    async def _vector_search(
+        self,
+        query: str,
+        k: int,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        include_vectors: bool = False
+    ) -> Tuple[List[Document], Dict[str, np.ndarray]]:
+        """Nearest chunks by embedding, plus their stored vectors by id when `include_vectors` is set."""
+        embedding = query_embedding if query_embedding is not None else await self.embeddings.aembed_query(query)
+        return await self._run_in_chroma("search", self._query_collection, embedding, k, filter_dict, include_vectors)
+
+    def _query_collection(
+        self,
+        embedding: List[float],
+        k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include_vectors: bool
+    ) -> Tuple[List[Document], Dict[str, np.ndarray]]:
+        include = ["documents", "metadatas"] + (["embeddings"] if include_vectors else [])
+        result = self.chroma_client.get_collection("documents").query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=filter_dict,
+            include=include
+        )
+        ids, texts, metadatas = result["ids"][0], result["documents"][0], result["metadatas"][0]
+        documents = [
+            Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+            if text is not None
+        ]
+        vectors = {}
+        if include_vectors:
+            vectors = {
+                doc_id: np.asarray(vector, dtype=np.float32)
+                for doc_id, vector in zip(ids, result["embeddings"][0])
+            }
+        return documents, vectors
+
+    async def _lexical_search(
+        self,
+        query: str,
+        k: int,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """BM25 search resolved to documents through the collection (no embedding call)."""
+        # A metadata filter is applied after scoring, so over-fetch to still fill k
+        hits = await self._run_in_chroma("lexical_search", self.lexical_index.search, query, k * 4 if filter_dict else k)
+        if not hits:
+            return []
+        return await self._run_in_chroma("get", self._get_documents, [doc_id for doc_id, _ in hits], filter_dict, k)
+
+    def _get_documents(self, ids: List[str], filter_dict: Optional[Dict[str, Any]], limit: int) -> List[Document]:
+        """Fetch chunks by id, keeping the order of `ids`."""
+        result = self.chroma_client.get_collection("documents").get(
+            ids=ids,
+            where=filter_dict,
+            include=["documents", "metadatas"]
+        )
+        found = {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+            if text is not None
+        }
+        return [found[doc_id] for doc_id in ids if doc_id in found][:limit]
     
     async def search_with_score(
         self,
         query: str,
         k: int = 5,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[tuple[Document, float]]:
         """
         Search for similar documents with similarity scores.
@@ -134,13 +482,17 @@ class RAGSystem:
             query: Search query
             k: Number of results to return
             filter_dict: Optional filter criteria
+            query_embedding: Embedding of `query` if the caller already has it
             
         Returns:
             List of tuples containing (document, score)
         """
         try:
-            results = self.vectorstore.similarity_search_with_score(
-                query,
+            embedding = query_embedding if query_embedding is not None else await self.embeddings.aembed_query(query)
+            results = await self._run_in_chroma(
+                "search",
+                self.vectorstore.similarity_search_by_vector_with_relevance_scores,
+                embedding,
                 k=k,
                 filter=filter_dict
             )
@@ -155,7 +507,8 @@ class RAGSystem:
     async def get_relevant_context(
         self,
         query: str,
-        k: int = 3
+        k: int = 3,
+        query_embedding: Optional[List[float]] = None
     ) -> str:
         """
         Get relevant context for a query to use in RAG.
@@ -163,32 +516,97 @@ class RAGSystem:
         Args:
             query: User query
             k: Number of documents to retrieve
+            query_embedding: Embedding of `query` if the caller already has it
             
         Returns:
             Formatted context string
         """
+        packed = await self.pack_relevant_context(query, k=k, query_embedding=query_embedding)
+        return packed.text
+
+    async def pack_relevant_context(
+        self,
+        query: str,
+        k: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> PackedContext:
+        """
+        Retrieve documents for a query and pack them into the RAG token budget.
+        
+        Args:
+            query: User query
+            k: Number of documents to retrieve
+            query_embedding: Embedding of `query` if the caller already has it
+            
+        Returns:
+            Packed context with the included chunks' source records
+        """
         try:
-            documents = await self.search_similar(query, k=k)
+            documents = await self.search_similar(query, k=k, query_embedding=query_embedding)
             
             if not documents:
-                return ""
+                return PackedContext(budget_tokens=config.RAG_CONTEXT_MAX_TOKENS)
             
-            context_parts = []
-            for i, doc in enumerate(documents, 1):
-                context_parts.append(f"Document {i}:\n{doc.page_content}")
+            compression = None
+            if config.CONTEXT_COMPRESSION_ENABLED:
+                with metrics.STAGE_LATENCY.labels("compression").time():
+                    compression = await self._compress(query, documents, query_embedding)
+                documents = compression.documents
+                metrics.CONTEXT_COMPRESSION_RATIO.observe(compression.ratio)
             
-            context = "\n\n".join(context_parts)
-            # Hard cap context size to avoid prompt bloat
-            if len(context) > config.RAG_CONTEXT_MAX_CHARS:
-                context = context[:config.RAG_CONTEXT_MAX_CHARS]
-            logger.info(f"Retrieved context with {len(documents)} documents")
+            packed = pack_context(
+                documents,
+                budget_tokens=config.RAG_CONTEXT_MAX_TOKENS,
+                model=config.OPENAI_MODEL,
+                duplicate_threshold=config.RAG_CONTEXT_DUPLICATE_THRESHOLD
+            )
+            if compression is not None:
+                packed.compression = compression.as_dict()
+            logger.info(
+                f"Packed {len(packed.sources)}/{len(documents)} documents into "
+                f"{packed.tokens}/{packed.budget_tokens} context tokens "
+                f"({packed.dropped_duplicates} duplicates dropped)"
+            )
             
-            return context
+            return packed
             
         except Exception as e:
             logger.error(f"Error getting relevant context: {str(e)}")
-            return ""
+            return PackedContext(budget_tokens=config.RAG_CONTEXT_MAX_TOKENS)
     
+    async def _compress(
+        self,
+        query: str,
+        documents: List[Document],
+        query_embedding: Optional[List[float]]
+    ) -> CompressionResult:
+        """Keep only the sentences of each chunk closest to the query (see context_compressor)."""
+        if query_embedding is None:
+            query_embedding = await self.embeddings.aembed_query(query)
+        sentences = sentences_of(documents)
+        # Sentences recur across turns; the bounded in-memory cache absorbs most of the embedding work
+        sentence_vectors = [self.sentence_cache.get_query(sentence) for sentence in sentences]
+        missing = [i for i, vector in enumerate(sentence_vectors) if vector is None]
+        metrics.CACHE_REQUESTS.labels("sentence", "hit").inc(len(sentences) - len(missing))
+        metrics.CACHE_REQUESTS.labels("sentence", "miss").inc(len(missing))
+        if missing:
+            embedded = await self.embeddings.aembed_documents([sentences[i] for i in missing], use_cache=False)
+            for i, vector in zip(missing, embedded):
+                self.sentence_cache.put_query(sentences[i], vector)
+                sentence_vectors[i] = vector
+        result = compress_documents(
+            documents,
+            query_embedding,
+            sentence_vectors,
+            keep_ratio=config.CONTEXT_COMPRESSION_KEEP_RATIO,
+            min_sentences=config.CONTEXT_COMPRESSION_MIN_SENTENCES
+        )
+        logger.info(
+            f"Compressed context {result.original_chars} -> {result.compressed_chars} chars "
+            f"({result.kept_sentences}/{result.sentences} sentences, ratio {result.ratio:.2f})"
+        )
+        return result
+
     async def load_documents_from_directory(
         self,
         directory_path: str,
@@ -207,7 +625,7 @@ class RAGSystem:
                 glob=glob_pattern,
                 loader_cls=TextLoader
             )
-            documents = loader.load()
+            documents = await asyncio.to_thread(loader.load)
             
             await self.add_documents(documents)
             
@@ -225,7 +643,11 @@ class RAGSystem:
             collection_name: Name of the collection to delete
         """
         try:
-            self.chroma_client.delete_collection(collection_name)
+            await self._run_in_chroma("delete_collection", self.chroma_client.delete_collection, collection_name)
+            self.generation += 1
+            if collection_name == "documents":
+                self.lexical_index.clear()
+                await self._run_in_chroma("lexical_save", self.lexical_index.save)
             logger.info(f"Deleted collection: {collection_name}")
             
         except Exception as e:
@@ -240,15 +662,27 @@ class RAGSystem:
             Dictionary with collection statistics
         """
         try:
-            collection = self.chroma_client.get_collection("documents")
-            count = collection.count()
+            collection = await self._run_in_chroma("get_collection", self.chroma_client.get_collection, "documents")
+            count = await self._run_in_chroma("count", collection.count)
             
             return {
                 "total_documents": count,
                 "collection_name": "documents",
-                "embedding_dimension": 1536  # OpenAI embeddings dimension
+                "embedding_model": (collection.metadata or {}).get(EMBEDDING_MODEL_KEY),
+                "embedding_dimension": self.embeddings.dimension,
+                "embeddings": self.embeddings.get_stats(),
+                "last_ingestion": self.last_ingestion,
+                "retrieval_mode": config.RETRIEVAL_MODE,
+                "generation": self.generation,
+                "retrieval_cache": self.retrieval_cache.get_stats() if self.retrieval_cache else None,
+                "lexical_index": self.lexical_index.get_stats()
             }
             
         except Exception as e:
             logger.error(f"Error getting collection stats: {str(e)}")
             return {"error": str(e)}
+
+    def close(self) -> None:
+        """Release the embedding and Chroma worker threads."""
+        self.embeddings.close()
+        self._chroma_executor.shutdown(wait=False)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src import metrics
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Continuously refilling token bucket; every operation is O(1)."""
+
+    def __init__(self, capacity: float, window_sec: float):
+        self.capacity = float(capacity)
+        self.refill_rate = self.capacity / max(window_sec, 1e-6)  # units per second
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_rate)
+            self._updated = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Seconds to wait until `amount` units can be taken (0 if available now)."""
+        self._refill(now)
+        deficit = amount - self.available
+        return deficit / self.refill_rate if deficit > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        self.available -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.available = min(self.capacity, self.available + amount)
+
+
+@dataclass
+class Reservation:
+    """Capacity held by one request until its real token usage is known."""
+    tokens: int
+    wait_sec: float
+    settled: bool = False
+
+
+class AsyncRateLimiter:
+    """
+    Shared RPM/TPM limiter for concurrent coroutines.
+
+    Capacity is reserved atomically under a FIFO lock, so concurrent callers
+    cannot all observe the same free budget. The token reservation is an
+    upper bound (prompt estimate + max_tokens); `settle` refunds the unused
+    part once the real `usage.total_tokens` is known.
+    """
+
+    def __init__(self, rpm_limit: int, tpm_limit: int, rpm_window_sec: float, tpm_window_sec: float):
+        self.rpm_bucket = TokenBucket(rpm_limit, rpm_window_sec) if rpm_limit > 0 else None
+        self.tpm_bucket = TokenBucket(tpm_limit, tpm_window_sec) if tpm_limit > 0 else None
+        self._lock = asyncio.Lock()
+        # Observability
+        self.queue_depth = 0
+        self.total_acquired = 0
+        self.total_waited = 0
+        self.total_wait_sec = 0.0
+        self.max_wait_sec = 0.0
+        self.last_wait_sec = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm_bucket is not None or self.tpm_bucket is not None
+
+    async def acquire(self, tokens: int) -> Reservation:
+        """
+        Wait until one request slot and `tokens` tokens are free, then reserve them.
+
+        Args:
+            tokens: Upper bound of tokens the request may consume
+
+        Returns:
+            Reservation to pass to `settle` when the request finishes
+        """
+        if not self.enabled:
+            return Reservation(tokens=0, wait_sec=0.0)
+        # A request larger than the whole bucket could never be admitted
+        if self.tpm_bucket is not None:
+            tokens = int(min(tokens, self.tpm_bucket.capacity))
+        else:
+            tokens = 0
+
+        started = time.monotonic()
+        self.queue_depth += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    delay = 0.0
+                    if self.rpm_bucket is not None:
+                        delay = self.rpm_bucket.time_until_available(1, now)
+                    if self.tpm_bucket is not None:
+                        delay = max(delay, self.tpm_bucket.time_until_available(tokens, now))
+                    if delay <= 0:
+                        break
+                    logger.info(f"Throttling to respect RPM/TPM limits; sleeping {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                if self.rpm_bucket is not None:
+                    self.rpm_bucket.take(1)
+                if self.tpm_bucket is not None:
+                    self.tpm_bucket.take(tokens)
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - started
+        metrics.LIMITER_WAIT.observe(waited)
+        self.total_acquired += 1
+        self.last_wait_sec = waited
+        if waited > 0.001:
+            self.total_waited += 1
+            self.total_wait_sec += waited
+            self.max_wait_sec = max(self.max_wait_sec, waited)
+        return Reservation(tokens=tokens, wait_sec=waited)
+
+    def settle(self, reservation: Reservation, actual_tokens: Optional[int]) -> None:
+        """
+        Reconcile a reservation with the tokens actually used.
+
+        Args:
+            reservation: Reservation returned by `acquire`
+            actual_tokens: Real total tokens (None keeps the full reservation)
+        """
+        if reservation.settled or self.tpm_bucket is None or actual_tokens is None:
+            reservation.settled = True
+            return
+        reservation.settled = True
+        difference = reservation.tokens - int(actual_tokens)
+        if difference > 0:
+            self.tpm_bucket.give_back(difference)
+        elif difference < 0:
+            # Under-estimated: charge the overshoot so later requests wait for it
+            self.tpm_bucket.take(-difference)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth and wait statistics."""
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self.queue_depth,
+            "requests_admitted": self.total_acquired,
+            "requests_delayed": self.total_waited,
+            "total_wait_sec": round(self.total_wait_sec, 3),
+            "max_wait_sec": round(self.max_wait_sec, 3),
+            "last_wait_sec": round(self.last_wait_sec, 3),
+            "rpm_available": round(self.rpm_bucket.available, 2) if self.rpm_bucket else None,
+            "tpm_available": round(self.tpm_bucket.available, 2) if self.tpm_bucket else None,
+        }
+
+
+# Process-wide limiter shared by every LLMClient instance
+_shared_limiter: Optional[AsyncRateLimiter] = None
+
+
+def get_shared_limiter() -> AsyncRateLimiter:
+    """Return the process-wide limiter configured from RPM/TPM settings."""
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = AsyncRateLimiter(
+            rpm_limit=config.OPENAI_RPM_LIMIT,
+            tpm_limit=config.OPENAI_TPM_LIMIT,
+            rpm_window_sec=config.RPM_WINDOW_SEC,
+            tpm_window_sec=config.TPM_WINDOW_SEC,
+        )
+    return _shared_limiter
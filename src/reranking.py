@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Longest overlap searched when stitching neighbouring chunks (the splitter uses 200 chars)
+MAX_STITCH_OVERLAP = 400
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr_select(query_vector: np.ndarray, candidate_vectors: np.ndarray, k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Maximal marginal relevance: pick k candidates balancing relevance and novelty.
+
+    Each step takes the candidate maximizing
+    lambda * cos(query, c) - (1 - lambda) * max cos(c, already selected).
+    Relevance and the pairwise similarity matrix are computed once; each step
+    only updates a running max, so selection is O(n * k) on top of one n x n
+    matrix product.
+
+    Args:
+        query_vector: Query embedding, shape (dim,)
+        candidate_vectors: Candidate embeddings in relevance order, shape (n, dim)
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+
+    Returns:
+        Indices into the candidates, in selection order
+    """
+    n = candidate_vectors.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    candidates = _unit_rows(candidate_vectors.astype(np.float32, copy=False))
+    query = _unit_rows(query_vector.astype(np.float32, copy=False).reshape(1, -1))[0]
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+
+def _stitch(first: str, second: str) -> str:
+    """Join consecutive chunks, dropping the text the splitter repeated as overlap."""
+    for length in range(min(len(first), len(second), MAX_STITCH_OVERLAP), 0, -1):
+        if first.endswith(second[:length]):
+            return first + second[length:]
+    return f"{first}\n{second}"
+
+
+def _adjacency_key(document: Document) -> Optional[Tuple]:
+    metadata = document.metadata or {}
+    if "source" not in metadata or "split" not in metadata:
+        return None
+    return metadata.get("source"), metadata.get("page"), metadata.get("chunk")
+
+
+def merge_adjacent_chunks(documents: List[Document]) -> List[Document]:
+    """
+    Merge retrieved chunks that are consecutive splits of the same page.
+
+    Chunks are adjacent when they share source/page/chunk metadata and their
+    `split` indices differ by one. A merged run takes the position of its
+    best-ranked member and records its splits under `merged_splits`.
+    Documents without that metadata pass through unchanged.
+    """
+    groups: Dict[Tuple, List[int]] = {}
+    for position, document in enumerate(documents):
+        key = _adjacency_key(document)
+        if key is not None:
+            groups.setdefault(key, []).append(position)
+
+    replaced: Dict[int, Document] = {}
+    dropped = set()
+    for positions in groups.values():
+        if len(positions) < 2:
+            continue
+        positions.sort(key=lambda p: documents[p].metadata["split"])
+        run = [positions[0]]
+        for position in positions[1:] + [None]:
+            if position is not None and documents[position].metadata["split"] == documents[run[-1]].metadata["split"] + 1:
+                run.append(position)
+                continue
+            if len(run) > 1:
+                text = documents[run[0]].page_content
+                for member in run[1:]:
+                    text = _stitch(text, documents[member].page_content)
+                anchor = min(run)
+                metadata = dict(documents[run[0]].metadata)
+                metadata["merged_splits"] = [documents[member].metadata["split"] for member in run]
+                replaced[anchor] = Document(page_content=text, metadata=metadata, id=documents[run[0]].id)
+                dropped.update(member for member in run if member != anchor)
+            if position is not None:
+                run = [position]
+
+    return [replaced.get(position, document) for position, document in enumerate(documents) if position not in dropped]
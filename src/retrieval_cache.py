@@ -0,0 +1,70 @@
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.completion_cache import make_cache_key, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def retrieval_cache_key(query: str, k: int, filter_dict: Optional[Dict[str, Any]], mode: str) -> str:
+    """Key of a retrieval: normalized query, result count, metadata filter and retrieval mode."""
+    return make_cache_key({"query": normalize_query(query), "k": k, "filter": filter_dict or {}, "mode": mode})
+
+
+class RetrievalCache:
+    """
+    LRU cache of search results tagged with the collection generation.
+
+    RAGSystem tags entries with its own write counter and the collection
+    size; an entry stored under another generation is treated as a miss and
+    dropped on lookup, so results never outlive the knowledge base they were
+    computed from and no explicit eviction is needed. The optional TTL bounds
+    staleness from changes the size does not reveal, such as another process
+    replacing chunks one for one.
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float = 0.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_sec = ttl_sec
+        # key -> (generation, stored_at, documents)
+        self._entries: "OrderedDict[str, Tuple[Hashable, float, List[Document]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get(self, key: str, generation: Hashable) -> Optional[List[Document]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_generation, stored_at, documents = entry
+            if stored_generation != generation or (self.ttl_sec > 0 and time.time() - stored_at >= self.ttl_sec):
+                del self._entries[key]
+                self.invalidated += 1
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers may annotate documents; keep the cached copies pristine
+        return copy.deepcopy(documents)
+
+    def set(self, key: str, generation: Hashable, documents: List[Document]) -> None:
+        self._entries[key] = (generation, time.time(), copy.deepcopy(documents))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
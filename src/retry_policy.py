@@ -0,0 +1,159 @@
+import email.utils
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import openai
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+# Error classes that drive the retry decision
+RATE_LIMIT = "rate_limit"        # 429 on RPM/TPM: wait (Retry-After) and resend as is
+CONTEXT_SIZE = "context_size"    # prompt or request too large: shrink, then resend
+TRANSIENT = "transient"          # timeouts, connection errors, 5xx: back off, counts toward the breaker
+FATAL = "fatal"                  # auth, validation, etc.: fail immediately
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+def classify_error(error: Exception) -> str:
+    """Classify an OpenAI SDK exception into RATE_LIMIT, CONTEXT_SIZE, TRANSIENT or FATAL."""
+    message = str(error)
+    if isinstance(error, openai.RateLimitError):
+        # "Request too large for gpt-4o ... tokens per min" can only succeed smaller
+        if "Request too large" in message:
+            return CONTEXT_SIZE
+        return RATE_LIMIT
+    if isinstance(error, openai.BadRequestError):
+        if getattr(error, "code", None) == "context_length_exceeded" or "maximum context length" in message:
+            return CONTEXT_SIZE
+        return FATAL
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return TRANSIENT
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return TRANSIENT
+    return FATAL
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's Retry-After hint (retry-after-ms or retry-after) from an API error."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            # HTTP-date form
+            retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+            return max(0.0, retry_at - time.time())
+    except Exception:
+        return None
+
+
+class DecorrelatedJitterBackoff:
+    """Decorrelated jitter: sleep = min(cap, uniform(base, previous * 3))."""
+
+    def __init__(self, base_sec: float, cap_sec: float):
+        self.base_sec = base_sec
+        self.cap_sec = cap_sec
+        self._previous = base_sec
+
+    def next_delay(self) -> float:
+        self._previous = min(self.cap_sec, random.uniform(self.base_sec, self._previous * 3))
+        return self._previous
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the upstream is down.
+
+    After `failure_threshold` consecutive transient failures the circuit
+    opens and calls raise CircuitOpenError immediately. After
+    `reset_timeout_sec` one probe call is let through (half-open); its
+    success closes the circuit, its failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout_sec: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_sec = reset_timeout_sec
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach the upstream."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout_sec:
+                self.rejected_calls += 1
+                raise CircuitOpenError("OpenAI circuit breaker is open; upstream considered unavailable")
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # A probe that never reported back (e.g. cancelled) is replaced after the reset timeout
+        if self._probe_in_flight and time.monotonic() - self._probe_started_at < self.reset_timeout_sec:
+            self.rejected_calls += 1
+            raise CircuitOpenError("OpenAI circuit breaker is half-open; probe request in flight")
+        self._probe_in_flight = True
+        self._probe_started_at = time.monotonic()
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("OpenAI circuit breaker closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"OpenAI circuit breaker opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+        }
+
+
+# Process-wide breaker shared by every LLMClient instance
+_shared_breaker: Optional[CircuitBreaker] = None
+
+
+def get_shared_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide OpenAI circuit breaker."""
+    global _shared_breaker
+    if _shared_breaker is None:
+        _shared_breaker = CircuitBreaker(
+            failure_threshold=config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout_sec=config.CIRCUIT_BREAKER_RESET_SEC,
+        )
+    return _shared_breaker
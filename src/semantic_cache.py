@@ -0,0 +1,176 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SemanticCacheHit:
+    answer: str
+    payload: Dict[str, Any]
+    similarity: float
+    saved_latency_ms: float
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question meaning rather than exact text.
+
+    Question embeddings are L2-normalized into one preallocated float32
+    matrix, so a lookup is a single matrix-vector product over the live rows
+    (cosine similarity) followed by an argmax. Every entry carries its own
+    expiry, which lets answers built from live tool data expire sooner than
+    plain ones. Entries are also scoped (e.g. by the RAG/tool flags of the
+    request) so an answer is only reused for a request of the same kind.
+    When full, expired rows are reused first, then the least recently used.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._scopes = np.full(self.max_entries, -1, dtype=np.int32)
+        self._scope_ids: Dict[str, int] = {}
+        self._answers: List[Optional[str]] = [None] * self.max_entries
+        self._payloads: List[Dict[str, Any]] = [{} for _ in range(self.max_entries)]
+        self._latency_ms = np.zeros(self.max_entries, dtype=np.float64)
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.saved_latency_ms = 0.0
+        self.hit_similarity_sum = 0.0
+
+    def _normalize(self, vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return None
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, array.shape[0]), dtype=np.float32)
+        elif array.shape[0] != self._vectors.shape[1]:
+            return None
+        return array / norm
+
+    def _live_mask(self, scope_id: int, now: float) -> np.ndarray:
+        return (self._scopes[:self._size] == scope_id) & (self._expires_at[:self._size] > now)
+
+    def lookup(self, vector: List[float], scope: str) -> Optional[SemanticCacheHit]:
+        """
+        Find the stored answer whose question is most similar to `vector`.
+
+        Args:
+            vector: Embedding of the incoming question
+            scope: Request kind; only entries stored under the same scope match
+
+        Returns:
+            The hit if its cosine similarity reaches the threshold, else None
+        """
+        query = self._normalize(vector)
+        scope_id = self._scope_ids.get(scope)
+        best = -1
+        similarity = 0.0
+        if query is not None and scope_id is not None and self._size:
+            now = time.time()
+            scores = self._vectors[:self._size] @ query
+            scores[~self._live_mask(scope_id, now)] = -np.inf
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+        if best < 0 or similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.hit_similarity_sum += similarity
+        self.saved_latency_ms += float(self._latency_ms[best])
+        self._last_used[best] = time.time()
+        return SemanticCacheHit(
+            answer=self._answers[best],
+            payload=dict(self._payloads[best]),
+            similarity=similarity,
+            saved_latency_ms=float(self._latency_ms[best]),
+        )
+
+    def store(
+        self,
+        vector: List[float],
+        scope: str,
+        answer: str,
+        ttl_sec: float,
+        latency_ms: float,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store an answer; a near-duplicate question already in the cache is overwritten."""
+        if ttl_sec <= 0:
+            return
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+        now = time.time()
+        scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+        row = self._pick_row(normalized, scope_id, now)
+        self._vectors[row] = normalized
+        self._scopes[row] = scope_id
+        self._expires_at[row] = now + ttl_sec
+        self._last_used[row] = now
+        self._latency_ms[row] = latency_ms
+        self._answers[row] = answer
+        self._payloads[row] = dict(payload or {})
+        self.stores += 1
+
+    def _pick_row(self, vector: np.ndarray, scope_id: int, now: float) -> int:
+        if self._size:
+            live = self._live_mask(scope_id, now)
+            scores = self._vectors[:self._size] @ vector
+            scores[~live] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return best
+        if self._size < self.max_entries:
+            self._size += 1
+            return self._size - 1
+        expired = np.flatnonzero(self._expires_at <= now)
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self._last_used))
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        now = time.time()
+        return {
+            "entries": int(np.count_nonzero(self._expires_at[:self._size] > now)),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "avg_hit_similarity": round(self.hit_similarity_sum / self.hits, 4) if self.hits else None,
+            "saved_latency_ms": round(self.saved_latency_ms, 1),
+            "bytes": int(self._vectors.nbytes) if self._vectors is not None else 0,
+        }
+
+
+# Process-wide cache shared by every AIAssistant instance
+_shared_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_shared_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide semantic answer cache, or None when it is disabled."""
+    global _shared_semantic_cache
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _shared_semantic_cache is None:
+        _shared_semantic_cache = SemanticCache(
+            max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+        )
+    return _shared_semantic_cache
@@ -0,0 +1,84 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _InFlightCall:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into a single execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task and receive a copy of its result (or
+    its exception). Waiters are shielded from each other: a cancelled waiter
+    only detaches itself, and the shared task is cancelled only when the last
+    waiter has gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `factory()` once per key at a time and share the result.
+
+        Args:
+            key: Identity of the call; identical keys are coalesced
+            factory: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            A deep copy of the shared result
+        """
+        call = self._calls.get(key)
+        if call is not None and call.task.cancelled():
+            # Cancelled but its done-callback has not run yet; never hand that to a new caller
+            call = None
+        if call is None:
+            call = _InFlightCall(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task, k=key, c=call: self._finish(k, c, task))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            metrics.SINGLE_FLIGHT_COALESCED.inc()
+            logger.info(f"Coalesced identical in-flight request ({call.waiters} already waiting)")
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is interested in the result any more; a caller arriving now starts afresh
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+        # Each waiter gets its own copy so callers can mutate results freely
+        return copy.deepcopy(result)
+
+    def _finish(self, key: str, call: _InFlightCall, task: asyncio.Task) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return execution and coalescing counters."""
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,180 @@
+import functools
+import logging
+from typing import List, Dict, Any, Optional
+
+from src.config import config
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is listed in requirements.txt
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing overhead used by OpenAI chat models (role, separators)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+# Every reply is primed with <|start|>assistant<|message|>
+TOKENS_PER_REPLY = 3
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Return the tiktoken encoding for a model, cached per model name.
+
+    Falls back to o200k_base for unknown models and to None (character
+    heuristic) when tiktoken or its BPE files are unavailable.
+    """
+    if tiktoken is None:
+        logger.warning("tiktoken not installed; falling back to ~4 chars per token")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model}: {str(e)}")
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load fallback tokenizer: {str(e)}")
+        return None
+
+
+@functools.lru_cache(maxsize=config.TOKEN_COUNT_CACHE_SIZE)
+def count_text_tokens(text: str, model: str) -> int:
+    """Count tokens in a string; memoized so repeated history turns are free."""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_text_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut a string down to at most `max_tokens` tokens."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def count_message_tokens(message: Dict[str, Any], model: str) -> int:
+    """Count tokens of a single chat message including framing overhead."""
+    total = TOKENS_PER_MESSAGE + count_text_tokens(message.get("content") or "", model)
+    if message.get("name"):
+        total += TOKENS_PER_NAME + count_text_tokens(message["name"], model)
+    calls = [tool_call.get("function") or {} for tool_call in message.get("tool_calls") or []]
+    if isinstance(message.get("function_call"), dict):
+        calls.append(message["function_call"])
+    for call in calls:
+        total += count_text_tokens(call.get("name") or "", model)
+        total += count_text_tokens(call.get("arguments") or "", model)
+    return total
+
+
+def count_messages_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """Count prompt tokens for a list of chat messages."""
+    if not messages:
+        return 0
+    return sum(count_message_tokens(msg, model) for msg in messages) + TOKENS_PER_REPLY
+
+
+def trim_messages_to_budget(
+    messages: List[Dict[str, Any]],
+    budget_tokens: int,
+    model: str,
+    max_history: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fit messages into a prompt token budget.
+
+    The current exchange (the last user turn plus any assistant tool-call
+    turns and tool replies after it) always survives; if it alone exceeds
+    the budget, its tool results are shortened first, then the user turn.
+    Older history fills the remaining budget newest first, and the leading
+    system message gets what is left.
+
+    Args:
+        messages: Chat messages, optionally starting with a system message
+        budget_tokens: Maximum prompt tokens
+        model: Model name used to pick the tokenizer
+        max_history: Optional cap on the number of non-system messages
+
+    Returns:
+        Trimmed list of messages (input messages are never mutated)
+    """
+    if not messages:
+        return messages
+    system_msg = messages[0] if messages[0].get("role") == "system" else None
+    history = messages[1:] if system_msg else messages[:]
+    user_turns = [i for i, msg in enumerate(history) if msg.get("role") == "user"]
+    split = user_turns[-1] if user_turns else max(0, len(history) - 1)
+    older, current = history[:split], history[split:]
+    if max_history is not None:
+        room = max(0, max_history - len(current))
+        older = older[-room:] if room else []
+
+    budget = budget_tokens - TOKENS_PER_REPLY
+    # Leave room for the system message so the exchange is not shortened only for it to overflow
+    reserved = min(count_message_tokens(system_msg, model), budget // 2) if system_msg else 0
+    current = _fit_current_exchange(current, budget - reserved, model)
+    used = sum(count_message_tokens(msg, model) for msg in current)
+
+    kept_reversed: List[Dict[str, Any]] = []
+    for msg in reversed(older):
+        cost = count_message_tokens(msg, model)
+        if used + cost > budget:
+            # Older messages are dropped first
+            break
+        kept_reversed.append(msg)
+        used += cost
+    kept_older = list(reversed(kept_reversed))
+    # Tool results are only valid right after the assistant turn that requested them
+    while kept_older and kept_older[0].get("role") == "tool":
+        used -= count_message_tokens(kept_older.pop(0), model)
+    kept_history = kept_older + current
+
+    if not system_msg:
+        return kept_history
+    remaining = budget - used
+    sys_content = system_msg.get("content") or ""
+    if count_message_tokens(system_msg, model) <= remaining:
+        return [system_msg] + kept_history
+    sys_copy = dict(system_msg)
+    if remaining > TOKENS_PER_MESSAGE:
+        sys_copy["content"] = truncate_text_to_tokens(sys_content, remaining - TOKENS_PER_MESSAGE, model)
+    else:
+        # No room; still include a very short system prefix to keep role context
+        sys_copy["content"] = truncate_text_to_tokens(sys_content, 32, model)
+    return [sys_copy] + kept_history
+
+
+def _fit_current_exchange(current: List[Dict[str, Any]], budget: int, model: str) -> List[Dict[str, Any]]:
+    """Shorten the current exchange to the budget: tool results proportionally, then the user turn."""
+    over = sum(count_message_tokens(msg, model) for msg in current) - budget
+    if over <= 0:
+        return current
+    current = [dict(msg) for msg in current]
+    for roles in (("tool",), ("user",)):
+        shrinkable = [msg for msg in current if msg.get("role") in roles and msg.get("content")]
+        total = sum(count_text_tokens(msg["content"], model) for msg in shrinkable)
+        if not total:
+            continue
+        # Every message of this kind gives up the same share of its tokens
+        keep_share = max(0.0, 1 - over / total)
+        for msg in shrinkable:
+            before = count_text_tokens(msg["content"], model)
+            msg["content"] = truncate_text_to_tokens(msg["content"], int(before * keep_share), model)
+            over -= before - count_text_tokens(msg["content"], model)
+        if over <= 0:
+            break
+    return current
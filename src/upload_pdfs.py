@@ -54,6 +54,9 @@ async def upload_pdfs_from_directory(pdf_directory: str = "pdfs"):
                 print(f"✅ Successfully uploaded: {pdf_file.name}")
                 print(f"   📊 {result.get('pages_processed', 0)} pages processed")
                 print(f"   📝 {result.get('chunks_added', 0)} text chunks added")
+                ingestion = result.get('ingestion') or {}
+                print(f"   ⚡ {ingestion.get('chunks_per_sec', 0)} chunks/s, "
+                      f"avg embedding batch {ingestion.get('avg_embed_latency_ms', 0)} ms")
             else:
                 print(f"❌ Failed to upload: {pdf_file.name}")
                 print(f"   Error: {result.get('error', 'Unknown error')}")
@@ -100,6 +103,9 @@ async def upload_single_pdf(pdf_path: str):
             print(f"✅ Successfully uploaded: {pdf_file.name}")
             print(f"   📊 {result.get('pages_processed', 0)} pages processed")
             print(f"   📝 {result.get('chunks_added', 0)} text chunks added")
+            ingestion = result.get('ingestion') or {}
+            print(f"   ⚡ {ingestion.get('chunks_per_sec', 0)} chunks/s, "
+                  f"avg embedding batch {ingestion.get('avg_embed_latency_ms', 0)} ms")
         else:
             print(f"❌ Failed to upload: {pdf_file.name}")
             print(f"   Error: {result.get('error', 'Unknown error')}")
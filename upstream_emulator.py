@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Offline emulator of the upstream services EraAI talks to.
+
+Serves, on one port:
+  POST /v1/chat/completions                 OpenAI chat completions (JSON or SSE stream, tool_calls)
+  POST /v1/embeddings                       OpenAI embeddings (float or base64)
+  GET  /lunarcrush/public/...               LunarCrush coins list/by id/meta, topic creators, news
+  GET  /rss/{feed}                          RSS 2.0 feed with a handful of items
+  GET  /_emulator/stats                     Request, error and latency counters
+
+Payloads are deterministic: they are derived from a hash of the request
+(messages, input text, coin id), so identical requests get identical answers
+across runs. Latency and fault injection draw from a seeded RNG.
+
+Point the app at it with a single setting:
+    UPSTREAM_EMULATOR_URL=http://127.0.0.1:9100 python web_api.py
+
+Usage:
+    python upstream_emulator.py --port 9100 \\
+        --openai-latency lognormal:0.8,0.5 --token-interval 0.02 \\
+        --embeddings-latency uniform:0.05,0.15 --rate-limit-rate 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "bitcoin ethereum рынок ликвидность волатильность объем тренд поддержка сопротивление "
+    "капитализация стейкинг протокол сеть комиссия халвинг индекс настроение инвесторы "
+    "фонды регулятор блокчейн токен альткоины доминация деривативы спрос предложение"
+).split()
+
+COINS = [
+    ("bitcoin", "BTC", "Bitcoin", 65000.0),
+    ("ethereum", "ETH", "Ethereum", 3200.0),
+    ("tether", "USDT", "Tether", 1.0),
+    ("solana", "SOL", "Solana", 150.0),
+    ("binancecoin", "BNB", "BNB", 580.0),
+    ("ripple", "XRP", "XRP", 0.55),
+    ("cardano", "ADA", "Cardano", 0.45),
+    ("dogecoin", "DOGE", "Dogecoin", 0.12),
+    ("toncoin", "TON", "Toncoin", 6.5),
+    ("tron", "TRX", "TRON", 0.12),
+]
+
+
+class LatencyDistribution:
+    """
+    Latency in seconds parsed from "fixed:S", "uniform:LO,HI", "normal:MEAN,STD",
+    "lognormal:MEDIAN,SIGMA" or "exponential:MEAN". Negative draws clamp to 0.
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+        if self.kind not in expected or len(self.args) != expected[self.kind]:
+            raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        a = self.args
+        if self.kind == "fixed":
+            value = a[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(a[0], a[1])
+        elif self.kind == "normal":
+            value = rng.gauss(a[0], a[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(max(a[0], 1e-9)), a[1])
+        else:
+            value = rng.expovariate(1.0 / a[0]) if a[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+@dataclass
+class EmulatorOptions:
+    """Behaviour of the emulator; defaults answer instantly and never fail."""
+    openai_latency: str = "fixed:0"          # time to first byte of a chat completion
+    token_interval: float = 0.0              # delay between streamed chunks
+    embeddings_latency: str = "fixed:0"
+    lunarcrush_latency: str = "fixed:0"
+    rss_latency: str = "fixed:0"
+    error_rate: float = 0.0                  # share of requests answered with a 500
+    rate_limit_rate: float = 0.0             # share of OpenAI requests answered with a 429
+    retry_after_sec: float = 1.0             # Retry-After sent with injected 429s
+    completion_tokens: int = 120             # answer length, capped by the request's max_tokens
+    tool_call_rate: float = 1.0              # share of tool-enabled requests that call a tool
+    embedding_dim: int = 1536
+    seed: int = 0
+
+
+@dataclass
+class _EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    latency_sec: float = 0.0
+
+
+@dataclass
+class EmulatorState:
+    options: EmulatorOptions
+    rng: random.Random = field(init=False)
+    latencies: Dict[str, LatencyDistribution] = field(init=False)
+    stats: Dict[str, _EndpointStats] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.options.seed)
+        self.latencies = {
+            "chat": LatencyDistribution(self.options.openai_latency),
+            "embeddings": LatencyDistribution(self.options.embeddings_latency),
+            "lunarcrush": LatencyDistribution(self.options.lunarcrush_latency),
+            "rss": LatencyDistribution(self.options.rss_latency),
+        }
+
+
+def _digest(*parts: Any) -> bytes:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).digest()
+
+
+def _seeded(*parts: Any) -> random.Random:
+    return random.Random(int.from_bytes(_digest(*parts)[:8], "big"))
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def _openai_error(status: int, message: str, error_type: str, code: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    return web.json_response(
+        {"error": {"message": message, "type": error_type, "param": None, "code": code}},
+        status=status,
+        headers=headers,
+    )
+
+
+async def _admit(state: EmulatorState, endpoint: str, openai_style: bool) -> Optional[web.Response]:
+    """Count the request, sleep for the sampled latency and maybe inject a fault."""
+    stats = state.stats.setdefault(endpoint, _EndpointStats())
+    stats.requests += 1
+    options = state.options
+    roll = state.rng.random()
+    delay = state.latencies[endpoint].sample(state.rng)
+    stats.latency_sec += delay
+    if openai_style and roll < options.rate_limit_rate:
+        # Rate limits are rejected quickly, like the real API
+        stats.rate_limited += 1
+        return _openai_error(
+            429,
+            "Rate limit reached for requests (emulated).",
+            "requests",
+            "rate_limit_exceeded",
+            headers={
+                "retry-after": str(options.retry_after_sec),
+                "retry-after-ms": str(int(options.retry_after_sec * 1000)),
+            },
+        )
+    await asyncio.sleep(delay)
+    if roll < options.rate_limit_rate + options.error_rate:
+        stats.errors += 1
+        if openai_style:
+            return _openai_error(500, "The server had an error while processing your request (emulated).", "server_error")
+        return web.json_response({"error": "internal error (emulated)"}, status=500)
+    return None
+
+
+# --- OpenAI chat completions -------------------------------------------------
+
+def _placeholder_argument(name: str, schema: Dict[str, Any]) -> Any:
+    kind = schema.get("type")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind in ("integer", "number"):
+        return schema.get("default", 3)
+    if kind == "boolean":
+        return False
+    if kind == "array":
+        return []
+    if name in ("coin_id", "topic", "symbol", "coin"):
+        return "bitcoin"
+    return schema.get("default", "bitcoin")
+
+
+def _plan_tool_calls(body: Dict[str, Any], options: EmulatorOptions, rng: random.Random) -> List[Dict[str, Any]]:
+    """Pick tool calls for a request, or none if tools are off or already answered."""
+    tools = body.get("tools") or []
+    messages = body.get("messages") or []
+    if not tools or body.get("tool_choice") == "none":
+        return []
+    # Answer in text once tool results are in the conversation
+    if messages and messages[-1].get("role") == "tool":
+        return []
+    if body.get("tool_choice") != "required" and rng.random() >= options.tool_call_rate:
+        return []
+    tool = tools[rng.randrange(len(tools))]["function"]
+    properties = (tool.get("parameters") or {}).get("properties") or {}
+    required = (tool.get("parameters") or {}).get("required") or []
+    arguments = {name: _placeholder_argument(name, properties.get(name, {})) for name in required}
+    return [{
+        "id": f"call_{rng.getrandbits(64):016x}",
+        "type": "function",
+        "function": {"name": tool["name"], "arguments": json.dumps(arguments)},
+    }]
+
+
+def _answer_text(rng: random.Random, n_tokens: int) -> List[str]:
+    """Deterministic answer split into ~1-token pieces."""
+    pieces = []
+    for i in range(max(1, n_tokens)):
+        word = WORDS[rng.randrange(len(WORDS))]
+        pieces.append(word if i == 0 else " " + word)
+    pieces.append(".")
+    return pieces
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        # Pretend the provider cached the prompt in 128-token blocks beyond the first 1024
+        "prompt_tokens_details": {"cached_tokens": (prompt_tokens // 128) * 128 if prompt_tokens >= 1024 else 0},
+    }
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    state: EmulatorState = request.app["state"]
+    body = await request.json()
+    fault = await _admit(state, "chat", openai_style=True)
+    if fault is not None:
+        return fault
+
+    messages = body.get("messages") or []
+    model = body.get("model", "gpt-4o")
+    rng = _seeded(model, messages, body.get("tools"), body.get("tool_choice"))
+    prompt_tokens = sum(_approx_tokens(json.dumps(m, ensure_ascii=False)) for m in messages)
+    tool_calls = _plan_tool_calls(body, state.options, rng)
+    max_tokens = body.get("max_tokens") or state.options.completion_tokens
+    pieces = [] if tool_calls else _answer_text(rng, min(state.options.completion_tokens, max_tokens))
+    completion_tokens = len(pieces) + sum(_approx_tokens(c["function"]["arguments"]) for c in tool_calls)
+    completion_id = f"chatcmpl-emu{rng.getrandbits(48):012x}"
+    created = int(time.time())
+    finish_reason = "tool_calls" if tool_calls else "stop"
+
+    if not body.get("stream"):
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(pieces) or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": _usage(prompt_tokens, completion_tokens),
+        })
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+
+    async def send(delta: Dict[str, Any], finish: Optional[str] = None, usage: Optional[Dict[str, Any]] = None) -> None:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if usage is not None else [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        if usage is not None:
+            chunk["usage"] = usage
+        await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    await send({"role": "assistant", "content": ""})
+    for piece in pieces:
+        if state.options.token_interval:
+            await asyncio.sleep(state.options.token_interval)
+        await send({"content": piece})
+    for index, call in enumerate(tool_calls):
+        # Real streams send the id and name first, then the arguments in fragments
+        await send({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                    "function": {"name": call["function"]["name"], "arguments": ""}}]})
+        arguments = call["function"]["arguments"]
+        for start in range(0, len(arguments), 8):
+            await send({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 8]}}]})
+    await send({}, finish=finish_reason)
+    if (body.get("stream_options") or {}).get("include_usage"):
+        await send({}, usage=_usage(prompt_tokens, completion_tokens))
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+# --- OpenAI embeddings -------------------------------------------------------
+
+def _embedding(item: Any, model: str, dim: int) -> List[float]:
+    """Deterministic unit vector; texts sharing words land close to each other."""
+    text = item if isinstance(item, str) else " ".join(str(t) for t in item)
+    vector = [0.0] * dim
+    for word in text.lower().split() or [""]:
+        rng = _seeded(model, word)
+        for _ in range(8):
+            vector[rng.randrange(dim)] += rng.choice((-1.0, 1.0))
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+async def embeddings(request: web.Request) -> web.Response:
+    state: EmulatorState = request.app["state"]
+    body = await request.json()
+    fault = await _admit(state, "embeddings", openai_style=True)
+    if fault is not None:
+        return fault
+
+    model = body.get("model", "text-embedding-ada-002")
+    dim = int(body.get("dimensions") or state.options.embedding_dim)
+    inputs = body.get("input")
+    # A single string, a single token array, or a batch of either
+    if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    data = []
+    prompt_tokens = 0
+    for index, item in enumerate(inputs or []):
+        vector = _embedding(item, model, dim)
+        prompt_tokens += len(item) if isinstance(item, list) else _approx_tokens(item)
+        if body.get("encoding_format") == "base64":
+            encoded: Any = base64.b64encode(struct.pack(f"<{dim}f", *vector)).decode("ascii")
+        else:
+            encoded = vector
+        data.append({"object": "embedding", "index": index, "embedding": encoded})
+    return web.json_response({
+        "object": "list",
+        "data": data,
+        "model": model,
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    })
+
+
+# --- LunarCrush --------------------------------------------------------------
+
+def _coin_record(rank: int, coin_id: str, symbol: str, name: str, base_price: float) -> Dict[str, Any]:
+    rng = _seeded("coin", coin_id)
+    price = round(base_price * (1 + rng.uniform(-0.05, 0.05)), 6)
+    market_cap = price * rng.uniform(1e8, 2e10) / max(base_price, 1e-6) * 1000
+    return {
+        "id": rank,
+        "symbol": symbol,
+        "name": name,
+        "price": price,
+        "price_btc": price / 65000.0,
+        "close": price,
+        "percent_change_1h": round(rng.uniform(-2, 2), 2),
+        "percent_change_24h": round(rng.uniform(-8, 8), 2),
+        "percent_change_7d": round(rng.uniform(-15, 15), 2),
+        "percent_change_30d": round(rng.uniform(-30, 30), 2),
+        "volume_24h": round(market_cap * rng.uniform(0.02, 0.1), 2),
+        "market_cap": round(market_cap, 2),
+        "market_cap_rank": rank,
+        "circulating_supply": round(market_cap / price, 0),
+        "max_supply": 21_000_000 if symbol == "BTC" else None,
+        "galaxy_score": round(rng.uniform(30, 80), 1),
+        "alt_rank": rng.randint(1, 500),
+        "volatility": round(rng.uniform(0.001, 0.05), 4),
+        "sentiment": rng.randint(40, 90),
+        "social_volume_24h": rng.randint(1_000, 100_000),
+        "social_dominance": round(rng.uniform(0.1, 30), 2),
+    }
+
+
+def _find_coin(coin_id: str):
+    key = coin_id.lower()
+    for rank, (cid, symbol, name, price) in enumerate(COINS, 1):
+        if key in (cid, symbol.lower(), str(rank)):
+            return rank, cid, symbol, name, price
+    return None
+
+
+def _lunarcrush_config(**extra: Any) -> Dict[str, Any]:
+    return {"generated": 1_700_000_000, **extra}
+
+
+async def lunarcrush(request: web.Request) -> web.Response:
+    state: EmulatorState = request.app["state"]
+    fault = await _admit(state, "lunarcrush", openai_style=False)
+    if fault is not None:
+        return fault
+
+    parts = [p for p in request.match_info["path"].split("/") if p]
+    # public/coins/list/v1
+    if parts[:3] == ["public", "coins", "list"]:
+        return web.json_response({
+            "config": _lunarcrush_config(),
+            "data": [_coin_record(rank, *coin) for rank, coin in enumerate(COINS, 1)],
+        })
+    # public/coins/{id}/v1 and public/coins/{id}/meta/v1
+    if parts[:2] == ["public", "coins"] and len(parts) >= 3:
+        coin = _find_coin(parts[2])
+        if coin is None:
+            return web.json_response({"error": f"coin {parts[2]} not found"}, status=404)
+        rank, cid, symbol, name, price = coin
+        if len(parts) >= 4 and parts[3] == "meta":
+            return web.json_response({
+                "config": _lunarcrush_config(),
+                "data": {
+                    "id": rank,
+                    "name": name,
+                    "symbol": symbol,
+                    "market_categories": "layer-1",
+                    "short_summary": f"{name} ({symbol}) is a cryptocurrency.",
+                    "description": f"{name} is an emulated asset used for offline testing.",
+                    "website_link": f"https://{cid}.example.org",
+                    "github_link": f"https://github.com/{cid}",
+                    "whitepaper_link": f"https://{cid}.example.org/whitepaper.pdf",
+                    "twitter_link": f"https://twitter.com/{cid}",
+                    "reddit_link": f"https://reddit.com/r/{cid}",
+                    "coingecko_link": f"https://www.coingecko.com/en/coins/{cid}",
+                    "coinmarketcap_link": f"https://coinmarketcap.com/currencies/{cid}/",
+                    "blockchain": [{"network": cid, "address": f"0x{_digest(cid).hex()[:40]}", "decimals": 18, "type": "native"}],
+                    "updated": 1_700_000_000,
+                },
+            })
+        return web.json_response({
+            "config": _lunarcrush_config(topic=cid),
+            "data": _coin_record(rank, cid, symbol, name, price),
+        })
+    # public/topic/{topic}/creators/v1
+    if parts[:2] == ["public", "topic"] and len(parts) >= 4 and parts[3] == "creators":
+        rng = _seeded("creators", parts[2])
+        return web.json_response({
+            "config": _lunarcrush_config(topic=parts[2]),
+            "data": [
+                {
+                    "creator_id": f"twitter::{rng.getrandbits(40)}",
+                    "creator_name": f"{parts[2]}_analyst_{i}",
+                    "creator_followers": rng.randint(10_000, 2_000_000),
+                    "creator_rank": i,
+                    "interactions_24h": rng.randint(1_000, 500_000),
+                }
+                for i in range(1, 11)
+            ],
+        })
+    # public/category/{category}/news/v1
+    if parts[:2] == ["public", "category"] and len(parts) >= 4 and parts[3] == "news":
+        rng = _seeded("news", parts[2])
+        return web.json_response({
+            "config": _lunarcrush_config(category=parts[2], type="news"),
+            "data": [
+                {
+                    "id": f"news-{i}",
+                    "post_type": "news",
+                    "post_title": f"{COINS[i % len(COINS)][2]}: {' '.join(rng.sample(WORDS, 5))}",
+                    "post_link": f"https://news.example.org/{parts[2]}/{i}",
+                    "post_image": None,
+                    "post_created": 1_700_000_000 - i * 3600,
+                    "post_sentiment": round(rng.uniform(1, 5), 2),
+                    "creator_id": f"twitter::{rng.getrandbits(40)}",
+                    "creator_name": f"newsdesk{i}",
+                    "creator_display_name": f"News Desk {i}",
+                    "creator_followers": rng.randint(10_000, 2_000_000),
+                    "creator_avatar": None,
+                    "interactions_24h": rng.randint(100, 100_000),
+                    "interactions_total": rng.randint(100_000, 1_000_000),
+                }
+                for i in range(10)
+            ],
+        })
+    return web.json_response({"error": f"unknown endpoint /{'/'.join(parts)}"}, status=404)
+
+
+# --- RSS ---------------------------------------------------------------------
+
+async def rss_feed(request: web.Request) -> web.Response:
+    state: EmulatorState = request.app["state"]
+    fault = await _admit(state, "rss", openai_style=False)
+    if fault is not None:
+        return fault
+
+    feed = request.match_info["feed"]
+    rng = _seeded("rss", feed)
+    items = "".join(
+        f"<item><title>{COINS[rng.randrange(len(COINS))][2]}: {' '.join(rng.sample(WORDS, 6))}</title>"
+        f"<link>https://{feed}.example.org/{i}</link><guid>{feed}-{i}</guid></item>"
+        for i in range(10)
+    )
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<rss version="2.0"><channel><title>{feed}</title><link>https://{feed}.example.org</link>'
+        f"<description>Emulated feed</description>{items}</channel></rss>"
+    )
+    return web.Response(text=xml, content_type="application/rss+xml")
+
+
+async def emulator_stats(request: web.Request) -> web.Response:
+    state: EmulatorState = request.app["state"]
+    return web.json_response({
+        endpoint: {
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "rate_limited": stats.rate_limited,
+            "avg_latency_sec": round(stats.latency_sec / stats.requests, 4) if stats.requests else 0.0,
+        }
+        for endpoint, stats in state.stats.items()
+    })
+
+
+def create_app(options: Optional[EmulatorOptions] = None) -> web.Application:
+    """Build the emulator application (use with aiohttp's AppRunner to embed it)."""
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["state"] = EmulatorState(options or EmulatorOptions())
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_get("/lunarcrush/{path:.*}", lunarcrush)
+    app.router.add_get("/rss/{feed}", rss_feed)
+    app.router.add_get("/_emulator/stats", emulator_stats)
+    return app
+
+
+def main() -> None:
+    defaults = EmulatorOptions()
+    parser = argparse.ArgumentParser(description="Offline emulator of OpenAI, LunarCrush and RSS upstreams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--openai-latency", default=defaults.openai_latency,
+                        help="chat completion latency, e.g. fixed:0.5, uniform:0.2,1.0, lognormal:0.8,0.5")
+    parser.add_argument("--token-interval", type=float, default=defaults.token_interval,
+                        help="seconds between streamed chunks")
+    parser.add_argument("--embeddings-latency", default=defaults.embeddings_latency)
+    parser.add_argument("--lunarcrush-latency", default=defaults.lunarcrush_latency)
+    parser.add_argument("--rss-latency", default=defaults.rss_latency)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate,
+                        help="share of OpenAI requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after_sec,
+                        help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--tool-call-rate", type=float, default=defaults.tool_call_rate,
+                        help="share of tool-enabled requests answered with a tool call")
+    parser.add_argument("--embedding-dim", type=int, default=defaults.embedding_dim)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    options = EmulatorOptions(
+        openai_latency=args.openai_latency,
+        token_interval=args.token_interval,
+        embeddings_latency=args.embeddings_latency,
+        lunarcrush_latency=args.lunarcrush_latency,
+        rss_latency=args.rss_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_sec=args.retry_after,
+        completion_tokens=args.completion_tokens,
+        tool_call_rate=args.tool_call_rate,
+        embedding_dim=args.embedding_dim,
+        seed=args.seed,
+    )
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Upstream emulator on http://{args.host}:{args.port} (set UPSTREAM_EMULATOR_URL to this address)")
+    web.run_app(create_app(options), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
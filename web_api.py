@@ -1,11 +1,14 @@
 import logging
 import asyncio
+import json
 import os
 import sys
+import time
 from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import aiohttp
 import xml.etree.ElementTree as ET
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,6 +16,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from src.ai_assistant import AIAssistant
 from src.models import ChatRequest, KnowledgeRequest
 from src.api_clients.lunarcrush import LunarCrushClient
+from src.llm_client import close_shared_async_client
+from src.loop_monitor import get_shared_loop_monitor
+from src.single_flight import SingleFlight
+from src import metrics
+from src.config import config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,15 +29,26 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 assistant = None
 
+# Shares one market/news fetch between concurrent /quick_actions requests
+_quick_actions_flight = SingleFlight()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global assistant
+    loop_monitor = get_shared_loop_monitor()
+    loop_monitor.start()
     try:
         assistant = AIAssistant()
         logger.info("AI Assistant initialized")
         yield
     except Exception as e:
         logger.error(f"Failed to initialize AI Assistant: {e}")
+    finally:
+        if assistant is not None:
+            await assistant.cleanup()
+        # Release the pooled keep-alive connections shared by all LLM clients
+        await close_shared_async_client()
+        await loop_monitor.stop()
 
 app = FastAPI(title="EraAI API", version="1.0.0", lifespan=lifespan)
 
@@ -51,6 +70,20 @@ app.add_middleware(
 #     allow_headers=["Authorization", "Content-Type"],
 # )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.HTTP_LATENCY.labels(request.method, path, status).observe(time.perf_counter() - started)
+
 @app.get("/")
 async def root():
     return {
@@ -66,6 +99,10 @@ async def health_check():
         "assistant_initialized": assistant is not None
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     if assistant is None:
@@ -77,7 +114,8 @@ async def chat(request: ChatRequest):
             use_rag=request.use_rag,
             use_functions=request.use_functions,
             temperature=request.temperature,
-            translate_queries=request.translate_queries
+            translate_queries=request.translate_queries,
+            first_turn=request.new_conversation
         )
         
         if "error" in result:
@@ -97,71 +135,99 @@ async def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/quick_actions")
-async def get_quick_actions():
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
     if assistant is None:
         raise HTTPException(status_code=500, detail="AI Assistant not initialized")
+
+    async def event_stream():
+        # Server-Sent Events: one JSON event per "data:" frame
+        async for event in assistant.stream_chat(
+            user_message=request.message,
+            use_rag=request.use_rag,
+            use_functions=request.use_functions,
+            temperature=request.temperature,
+            translate_queries=request.translate_queries,
+            first_turn=request.new_conversation
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering so tokens reach the browser immediately
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+async def _gather_quick_actions_context() -> str:
+    """Collect market metrics and news headlines for the quick-actions prompt."""
+    # Market metrics (non-fatal best-effort)
+    market_lines = []
     try:
-        # 1) Gather real-time context (non-fatal best-effort)
-        market_lines = []
-        try:
-            # Reuse assistant's FunctionCaller/LunarCrush if configured is complex; use direct client here
-            from src.config import config as app_config
-            if app_config.LUNARCRUSH_API_BASE_URL and app_config.LUNARCRUSH_API_KEY:
-                async with LunarCrushClient() as lc:
-                    coins_resp = await lc.get_coin_metrics()
-                coins = coins_resp.get("data", []) if isinstance(coins_resp, dict) else []
-                def rank_key(c):
-                    r = c.get("market_cap_rank")
-                    return r if isinstance(r, (int, float)) else float("inf")
-                top = sorted(coins, key=rank_key)[:6]
-                for c in top:
-                    sym = c.get("symbol") or "?"
-                    ch24 = c.get("percent_change_24h")
-                    ch7 = c.get("percent_change_7d")
-                    price = c.get("price")
-                    market_lines.append(f"{sym}: price={price}, 24h={ch24}%, 7d={ch7}%")
-        except Exception:
-            pass
-
-        async def fetch_rss_titles(session: aiohttp.ClientSession, url: str, limit: int = 5):
-            try:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                    text = await resp.text()
-                    root = ET.fromstring(text)
-                    # Try RSS 2.0 structure
-                    items = root.findall('.//item')
-                    titles = [it.findtext('title') for it in items if it.findtext('title')]
-                    if not titles:
-                        # Try Atom
-                        entries = root.findall('.//{http://www.w3.org/2005/Atom}entry')
-                        titles = [e.findtext('{http://www.w3.org/2005/Atom}title') for e in entries if e.findtext('{http://www.w3.org/2005/Atom}title')]
-                    return [t.strip() for t in titles[:limit]]
-            except Exception:
-                return []
-
-        news_titles: list[str] = []  # type: ignore
-        rss_urls = [
-            "https://www.coindesk.com/arc/outboundfeeds/rss/",
-            "https://cointelegraph.com/rss"
-        ]
+        # Reuse assistant's FunctionCaller/LunarCrush if configured is complex; use direct client here
+        from src.config import config as app_config
+        if app_config.LUNARCRUSH_API_BASE_URL and app_config.LUNARCRUSH_API_KEY:
+            async with LunarCrushClient() as lc:
+                coins_resp = await lc.get_coin_metrics()
+            coins = coins_resp.get("data", []) if isinstance(coins_resp, dict) else []
+            def rank_key(c):
+                r = c.get("market_cap_rank")
+                return r if isinstance(r, (int, float)) else float("inf")
+            top = sorted(coins, key=rank_key)[:6]
+            for c in top:
+                sym = c.get("symbol") or "?"
+                ch24 = c.get("percent_change_24h")
+                ch7 = c.get("percent_change_7d")
+                price = c.get("price")
+                market_lines.append(f"{sym}: price={price}, 24h={ch24}%, 7d={ch7}%")
+    except Exception:
+        pass
+
+    async def fetch_rss_titles(session: aiohttp.ClientSession, url: str, limit: int = 5):
         try:
-            async with aiohttp.ClientSession() as session:
-                results = await asyncio.gather(*[fetch_rss_titles(session, u, 3) for u in rss_urls], return_exceptions=True)
-                for r in results:
-                    if isinstance(r, list):
-                        news_titles.extend(r)
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                text = await resp.text()
+                root = ET.fromstring(text)
+                # Try RSS 2.0 structure
+                items = root.findall('.//item')
+                titles = [it.findtext('title') for it in items if it.findtext('title')]
+                if not titles:
+                    # Try Atom
+                    entries = root.findall('.//{http://www.w3.org/2005/Atom}entry')
+                    titles = [e.findtext('{http://www.w3.org/2005/Atom}title') for e in entries if e.findtext('{http://www.w3.org/2005/Atom}title')]
+                return [t.strip() for t in titles[:limit]]
         except Exception:
-            pass
+            return []
 
-        # 2) Prompt the LLM with enriched context to produce 4 starters
-        context_sections = []
-        if market_lines:
-            context_sections.append("Рынок:\n" + "\n".join(market_lines))
-        if news_titles:
-            context_sections.append("Заголовки новостей:\n" + "\n".join(news_titles[:8]))
-        context_blob = "\n\n".join(context_sections)
+    news_titles: list[str] = []  # type: ignore
+    try:
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(*[fetch_rss_titles(session, u, 3) for u in config.RSS_FEED_URLS], return_exceptions=True)
+            for r in results:
+                if isinstance(r, list):
+                    news_titles.extend(r)
+    except Exception:
+        pass
+
+    context_sections = []
+    if market_lines:
+        context_sections.append("Рынок:\n" + "\n".join(market_lines))
+    if news_titles:
+        context_sections.append("Заголовки новостей:\n" + "\n".join(news_titles[:8]))
+    return "\n\n".join(context_sections)
+
+@app.post("/quick_actions")
+async def get_quick_actions():
+    if assistant is None:
+        raise HTTPException(status_code=500, detail="AI Assistant not initialized")
+    try:
+        # 1) Gather real-time context; concurrent page loads share one fetch
+        context_blob = await _quick_actions_flight.do("context", _gather_quick_actions_context)
 
+        # 2) Prompt the LLM with enriched context to produce 4 starters
         prompt = f"""
         Сгенерируй 4 короткие подсказки (quick actions) для стартового экрана крипто-ассистента на русском языке, основываясь на текущих событиях и рынке.
         Требования:
@@ -176,13 +242,8 @@ async def get_quick_actions():
         {context_blob}
         """
 
-        result = await assistant.chat(
-            user_message=prompt,
-            use_rag=False,
-            use_functions=False,
-            temperature=0.5,
-            translate_queries=False
-        )
+        # Stateless call: identical concurrent prompts are coalesced by LLMClient
+        result = await assistant.complete(prompt, temperature=0.5, purpose="quick_actions")
 
         if "error" in result:
             raise HTTPException(status_code=500, detail=result.get("error", "Unknown error"))
@@ -284,12 +345,24 @@ async def get_system_info():
         if "error" in info:
             raise HTTPException(status_code=500, detail=info["error"])
         
+        routing_text = "; ".join(
+            f"{purpose}: {stats['model']}, {stats['calls']} calls, avg {stats['avg_latency_ms']}ms, "
+            f"{stats['prompt_tokens']}+{stats['completion_tokens']} tokens, "
+            f"{stats['prompt_cache_hit_ratio']:.0%} prompt cached"
+            for purpose, stats in info['routing'].items()
+        ) or "no calls yet"
+        
         content_text = f"""
         System Information:
         Model: {info['model']}
         RAG System: {info['rag_system']['total_documents']} documents in collection '{info['rag_system']['collection_name']}'
         Functions: {info['functions']['available']} available, {len(info['functions']['registered'])} registered
         Conversation: {info['conversation']['history_length']} messages in history
+        Routing: {routing_text}
+        Rate limiter: {info['rate_limiter']['queue_depth']} queued, {info['rate_limiter']['requests_delayed']} delayed, {info['rate_limiter']['total_wait_sec']}s total wait (max {info['rate_limiter']['max_wait_sec']}s)
+        Semantic cache: {(info['semantic_cache'] or {}).get('hit_ratio', 0):.0%} hit ratio, {(info['semantic_cache'] or {}).get('saved_latency_ms', 0)}ms saved
+        Translation cache: {info['translation_cache'].get('hit_ratio', 0):.0%} hit ratio, {info['translation_cache'].get('saved_latency_ms', 0)}ms saved, {info['translation_cache']['coalesced']} coalesced
+        Event loop lag: avg {info['event_loop']['avg_lag_ms']}ms, p99 {info['event_loop']['p99_lag_ms']}ms, max {info['event_loop']['max_lag_ms']}ms
         """
         
         return {
@@ -407,14 +480,8 @@ async def get_related_questions():
         Generate exactly 4 SHORT questions, one per line, in Russian:
         """
         
-        # Use the assistant to generate related questions
-        result = await assistant.chat(
-            user_message=prompt,
-            use_rag=False,  # Don't use RAG for this
-            use_functions=False,  # Don't use functions for this
-            temperature=0.7,
-            translate_queries=False
-        )
+        # Stateless call on the fast tier; does not add to the conversation history
+        result = await assistant.complete(prompt, temperature=0.7, purpose="related_questions")
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result.get("error", "Unknown error"))